@@ -0,0 +1,193 @@
+# acervo.py
+
+import gzip
+import hashlib
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+import weakref
+import zipfile
+
+# --- Uploads Gravados em Disco ---
+
+DIRETORIO_ACERVOS = os.path.join(tempfile.gettempdir(), "comparador_acervos")
+BYTES_POR_COPIA = 8 * 1024 ** 2  # o upload é copiado (e o hash calculado) em pedaços deste tamanho
+HORAS_ACERVO_ORFAO = 24  # diretórios de sessões que o servidor não encerrou (ex: queda) são apagados depois disso
+
+
+class ArquivoEmDisco:
+    """
+    Upload gravado no diretório da sessão: em memória ficam só o nome, o caminho, o tamanho e o
+    SHA-256 do conteúdo, calculado uma única vez na chegada. A leitura abre o arquivo em disco.
+    """
+
+    def __init__(self, name, caminho, tamanho, sha256):
+        self.name = name
+        self.caminho = caminho
+        self.tamanho = tamanho
+        self.sha256 = sha256
+
+    def abrir(self):
+        return open(self.caminho, "rb")
+
+
+class AcervoEmDisco:
+    """
+    Arquivos enviados numa sessão, gravados num diretório temporário próprio assim que chegam
+    (nome -> ArquivoEmDisco). O diretório é apagado ao limpar o acervo e, quando a sessão expira,
+    junto com o objeto (ou ao fim do servidor).
+    """
+
+    def __init__(self, diretorio_base=DIRETORIO_ACERVOS):
+        os.makedirs(diretorio_base, exist_ok=True)
+        self.diretorio = tempfile.mkdtemp(prefix="acervo_", dir=diretorio_base)
+        self._arquivos = {}
+        self._sequencia = 0
+        self._finalizador = weakref.finalize(self, shutil.rmtree, self.diretorio, ignore_errors=True)
+
+    def adicionar(self, file):
+        """Copia o upload (objeto de arquivo com `name`) para o disco, calculando o SHA-256 no caminho."""
+        file.seek(0)
+        arquivo = self._gravar(file.name, file)
+        file.seek(0)
+        return arquivo
+
+    def adicionar_pacote(self, file):
+        """
+        Grava cada planilha de um pacote (.zip, .tar.gz ou .gz) como um arquivo próprio do acervo,
+        "pacote/membro", descompactando um membro por vez direto para o disco. Devolve os arquivos
+        gravados e os nomes dos membros ignorados (outros formatos).
+        """
+        gravados, ignorados = [], []
+        file.seek(0)
+        for nome_membro, conteudo in membros_pacote(file, file.name):
+            if nome_membro.lower().endswith(EXTENSOES_PLANILHA):
+                gravados.append(self._gravar(f"{file.name}/{nome_membro}", conteudo))
+            else:
+                ignorados.append(nome_membro)
+        file.seek(0)
+        return gravados, ignorados
+
+    def _gravar(self, nome, origem):
+        self._sequencia += 1
+        # Nome em disco sequencial: o nome enviado pode ter caracteres inválidos ou repetir-se após remoções
+        caminho = os.path.join(self.diretorio, f"{self._sequencia:05d}{os.path.splitext(nome)[1].lower()}")
+        resumo, tamanho = hashlib.sha256(), 0
+        with open(caminho, "wb") as destino:
+            while True:
+                pedaco = origem.read(BYTES_POR_COPIA)
+                if not pedaco:
+                    break
+                resumo.update(pedaco)
+                destino.write(pedaco)
+                tamanho += len(pedaco)
+        self.remover(nome)
+        self._arquivos[nome] = ArquivoEmDisco(nome, caminho, tamanho, resumo.hexdigest())
+        return self._arquivos[nome]
+
+    def remover(self, nome):
+        arquivo = self._arquivos.pop(nome, None)
+        if arquivo is not None and os.path.exists(arquivo.caminho):
+            os.remove(arquivo.caminho)
+
+    def limpar(self):
+        for nome in list(self._arquivos):
+            self.remover(nome)
+
+    def encerrar(self):
+        """Apaga o diretório da sessão (o acervo não deve mais ser usado)."""
+        self._arquivos = {}
+        self._finalizador()
+
+    def tamanho(self):
+        return sum(arquivo.tamanho for arquivo in self._arquivos.values())
+
+    def keys(self):
+        return self._arquivos.keys()
+
+    def __getitem__(self, nome):
+        return self._arquivos[nome]
+
+    def __delitem__(self, nome):
+        if nome not in self._arquivos:
+            raise KeyError(nome)
+        self.remover(nome)
+
+    def __contains__(self, nome):
+        return nome in self._arquivos
+
+    def __iter__(self):
+        return iter(self._arquivos)
+
+    def __len__(self):
+        return len(self._arquivos)
+
+
+# --- Pacotes Compactados ---
+
+EXTENSOES_PLANILHA = (".csv", ".xlsx", ".xls")
+EXTENSOES_PACOTE = (".zip", ".tar.gz", ".tgz", ".tar", ".gz")
+
+
+def e_pacote(nome):
+    return nome.lower().endswith(EXTENSOES_PACOTE)
+
+
+def _nome_membro_zip(info):
+    """Nome do membro do ZIP; sem a marca de UTF-8, ferramentas do Windows gravam na página de código OEM (cp850)."""
+    if info.flag_bits & 0x800:
+        return info.filename
+    bruto = info.filename.encode("cp437")
+    try:
+        return bruto.decode("utf-8")
+    except UnicodeDecodeError:
+        return bruto.decode("cp850")
+
+
+def membros_pacote(file, nome):
+    """
+    Gera (nome do membro, objeto de arquivo) de um pacote, um membro por vez e sem extrair o pacote
+    inteiro: cada objeto deve ser lido antes de pedir o próximo. Pastas, arquivos ocultos e os
+    metadados do macOS ficam de fora; um .gz simples tem um único membro, o nome sem ".gz".
+    """
+    extensao = nome.lower()
+    if extensao.endswith(".zip"):
+        with zipfile.ZipFile(file) as pacote:
+            for info in pacote.infolist():
+                membro = _nome_membro_zip(info)
+                if info.is_dir() or _oculto(membro):
+                    continue
+                with pacote.open(info) as conteudo:
+                    yield membro, conteudo
+    elif extensao.endswith((".tar.gz", ".tgz", ".tar")):
+        # Modo "r|*": leitura sequencial do tar (compactado ou não), sem voltar no arquivo
+        with tarfile.open(fileobj=file, mode="r|*") as pacote:
+            for info in pacote:
+                if not info.isfile() or _oculto(info.name):
+                    continue
+                yield info.name, pacote.extractfile(info)
+    elif extensao.endswith(".gz"):
+        with gzip.GzipFile(fileobj=file) as conteudo:
+            yield os.path.basename(nome)[:-3], conteudo
+    else:
+        raise ValueError(f"Formato de pacote não suportado: {nome}")
+
+
+def _oculto(membro):
+    partes = membro.replace("\\", "/").split("/")
+    return "__MACOSX" in partes or partes[-1].startswith(".")
+
+
+def remover_acervos_orfaos(diretorio_base=DIRETORIO_ACERVOS, horas=HORAS_ACERVO_ORFAO):
+    """Apaga diretórios de acervo não modificados há mais de `horas` (sessões de um servidor que caiu)."""
+    if not os.path.isdir(diretorio_base):
+        return 0
+    limite, removidos = time.time() - horas * 3600, 0
+    for nome in os.listdir(diretorio_base):
+        caminho = os.path.join(diretorio_base, nome)
+        if nome.startswith("acervo_") and os.path.isdir(caminho) and os.path.getmtime(caminho) < limite:
+            shutil.rmtree(caminho, ignore_errors=True)
+            removidos += 1
+    return removidos
@@ -0,0 +1,221 @@
+# alvos.py
+
+import json
+import os
+import re
+import shutil
+import tempfile
+import uuid
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from leitura import ler_planilha_em_blocos
+from normalizacao import CacheNormalizacao, classificar_colunas
+from registros import empacotar_valores
+
+# --- Listas de Alvos (watchlists) ---
+
+DIRETORIO_LISTAS = "listas"
+COLUNA_ALVOS = "listas_alvos"  # coluna acrescentada aos cruzamentos e registros: listas em que o valor consta
+ARQUIVO_METADADOS = "lista.json"
+# Chave fixa do hash de 64 bits dos valores em texto (16 bytes): o mesmo valor gera o mesmo hash em qualquer sessão
+CHAVE_HASH = "comparador_alvos"
+
+
+def _hash_textos(textos):
+    """Hash de 64 bits (uint64) de cada valor em texto, vetorizado."""
+    return pd.util.hash_array(np.asarray(textos, dtype=object), encoding="utf8", hash_key=CHAVE_HASH,
+                              categorize=False)
+
+
+def _em_ordenado(ordenado, consultas):
+    """Máscara das consultas presentes no array ordenado (busca binária vetorizada)."""
+    if not len(ordenado) or not len(consultas):
+        return np.zeros(len(consultas), dtype=bool)
+    posicoes = np.searchsorted(ordenado, consultas)
+    return ordenado[np.minimum(posicoes, len(ordenado) - 1)] == consultas
+
+
+def _nome_diretorio(nome):
+    return re.sub(r"[^\w-]+", "_", nome.strip()).strip("_") or "lista"
+
+
+def _descartar_diretorio(diretorio):
+    """
+    Renomeia a lista para um diretório oculto e o apaga. Se algum arquivo estiver em uso (no
+    Windows, uma consulta em andamento), a renomeação falha com OSError e a lista fica intacta;
+    o que não puder ser apagado depois é removido por listar_listas_alvos.
+    """
+    descartado = os.path.join(os.path.dirname(diretorio), f".removida_{uuid.uuid4().hex}")
+    os.replace(diretorio, descartado)
+    shutil.rmtree(descartado, ignore_errors=True)
+
+
+class ListaAlvos:
+    """
+    Lista de alvos gravada em disco e consultada em modo mmap: nada é carregado na memória de cada
+    sessão, e as páginas lidas são compartilhadas pelos processos do servidor. Por tipo de dado,
+    os valores que cabem num int64 (telefones, IMEIs; empacotados como nos registros) ficam num
+    array ordenado e os demais (e-mails, hashes, IDs), como hashes de 64 bits ordenados. A busca é
+    binária e vetorizada sobre os valores já normalizados. Os arrays só ficam mapeados durante a
+    consulta: no Windows, um arquivo mapeado não pode ser apagado nem substituído.
+    """
+
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        with open(os.path.join(diretorio, ARQUIVO_METADADOS), encoding="utf-8") as f:
+            metadados = json.load(f)
+        self.nome = metadados["nome"]
+        self.origem = metadados["origem"]
+        self.criada_em = metadados["criada_em"]
+        self.contagens = metadados["tipos"]  # tipo -> valores distintos
+        # Verificação do hash: uma mudança no algoritmo do pandas tornaria a lista inútil sem aviso
+        amostra = metadados.get("amostra_hash")
+        if amostra and int(_hash_textos([amostra[0]])[0]) != int(amostra[1]):
+            raise ValueError(f"Lista de alvos '{self.nome}' gravada com outro algoritmo de hash; carregue-a de novo.")
+        self._arrays = {}  # (tipo, "numeros" ou "hashes") -> caminho do .npy
+        for tipo in self.contagens:
+            for sufixo in ("numeros", "hashes"):
+                caminho = os.path.join(diretorio, f"{tipo}.{sufixo}.npy")
+                if os.path.exists(caminho):
+                    self._arrays[(tipo, sufixo)] = caminho
+
+    @property
+    def tipos(self):
+        return list(self.contagens)
+
+    def __len__(self):
+        return sum(self.contagens.values())
+
+    def contem(self, tipo, valores):
+        """Máscara dos valores normalizados (do `tipo`) presentes na lista."""
+        valores = np.asarray(valores, dtype=object)
+        achados = np.zeros(len(valores), dtype=bool)
+        if tipo not in self.contagens or not len(valores):
+            return achados
+        numeros, textos = empacotar_valores(valores)
+        com_numero = numeros != 0
+        if com_numero.any():
+            achados[com_numero] = self._buscar(tipo, "numeros", numeros[com_numero])
+        if len(textos):
+            achados[textos.index.to_numpy()] = self._buscar(tipo, "hashes", _hash_textos(textos.to_numpy()))
+        return achados
+
+    def _buscar(self, tipo, sufixo, consultas):
+        caminho = self._arrays.get((tipo, sufixo))
+        if caminho is None:
+            return np.zeros(len(consultas), dtype=bool)
+        ordenado = np.load(caminho, mmap_mode="r")
+        achados = _em_ordenado(ordenado, consultas)
+        del ordenado  # última referência: o mapeamento é desfeito aqui
+        return achados
+
+
+def criar_lista_alvos(file, nome_arquivo, nome, tipos, map_primario, diretorio_base=DIRETORIO_LISTAS,
+                      strict=False, dialeto=None, aba=None):
+    """
+    Lê a planilha de referência uma única vez, em blocos, com a mesma classificação de colunas e
+    normalização das análises, e grava a lista `nome` (substituindo outra de mesmo nome) em
+    `diretorio_base`. Devolve a ListaAlvos já aberta. Como nas análises, a planilha precisa de uma
+    linha de cabeçalho: numa lista sem cabeçalho, a primeira linha é tomada como nomes de coluna.
+    """
+    cache = CacheNormalizacao()
+    numeros = {tipo: [] for tipo in tipos}
+    hashes = {tipo: [] for tipo in tipos}
+    colunas_por_tipo = None
+
+    def _guardar(tipo, valores):
+        empacotados, textos = empacotar_valores(valores)
+        numeros[tipo].append(np.unique(empacotados[empacotados != 0]))
+        if len(textos):
+            hashes[tipo].append(np.unique(_hash_textos(textos.to_numpy())))
+
+    for df in ler_planilha_em_blocos(file, nome_arquivo, dialeto=dialeto, aba=aba):
+        df = df.fillna("")
+        df.columns = [str(col).strip().lower() for col in df.columns]
+        if colunas_por_tipo is None:
+            colunas_por_tipo, _ = classificar_colunas(df, tipos, map_primario, strict)
+        for tipo, posicoes in colunas_por_tipo.items():
+            for i in posicoes:
+                valores, _ = cache.normalizar(tipo, df.iloc[:, i], strict)
+                _guardar(tipo, valores.dropna().to_numpy(dtype=object))
+
+    if not colunas_por_tipo or not any(colunas_por_tipo.values()):
+        raise ValueError(f"Nenhuma coluna de {', '.join(tipos)} encontrada em {nome_arquivo}.")
+
+    # Gravada num diretório temporário e movida no fim: uma lista pela metade nunca fica visível
+    os.makedirs(diretorio_base, exist_ok=True)
+    temporario = tempfile.mkdtemp(prefix=".lista_", dir=diretorio_base)
+    try:
+        contagens = {}
+        for tipo in tipos:
+            partes = {"numeros": (numeros[tipo], np.int64), "hashes": (hashes[tipo], np.uint64)}
+            contagens[tipo] = 0
+            for sufixo, (blocos, dtype) in partes.items():
+                ordenado = np.unique(np.concatenate(blocos)).astype(dtype) if blocos else np.empty(0, dtype)
+                if len(ordenado):
+                    np.save(os.path.join(temporario, f"{tipo}.{sufixo}.npy"), ordenado)
+                    contagens[tipo] += len(ordenado)
+        metadados = {"nome": nome, "origem": nome_arquivo, "criada_em": datetime.now().isoformat(timespec="seconds"),
+                     "tipos": contagens, "amostra_hash": [nome, str(int(_hash_textos([nome])[0]))]}
+        with open(os.path.join(temporario, ARQUIVO_METADADOS), "w", encoding="utf-8") as f:
+            json.dump(metadados, f, ensure_ascii=False, indent=2)
+        destino = os.path.join(diretorio_base, _nome_diretorio(nome))
+        if os.path.isdir(destino):
+            _descartar_diretorio(destino)
+        os.replace(temporario, destino)
+    except BaseException:
+        shutil.rmtree(temporario, ignore_errors=True)
+        raise
+    return ListaAlvos(destino)
+
+
+def listar_listas_alvos(diretorio_base=DIRETORIO_LISTAS):
+    """Listas gravadas em `diretorio_base`, por nome; listas ilegíveis são ignoradas."""
+    listas = []
+    if os.path.isdir(diretorio_base):
+        for nome in sorted(os.listdir(diretorio_base)):
+            diretorio = os.path.join(diretorio_base, nome)
+            if nome.startswith(".removida_"):
+                shutil.rmtree(diretorio, ignore_errors=True)  # sobras de remoções com arquivos ainda em uso
+                continue
+            if nome.startswith(".") or not os.path.isfile(os.path.join(diretorio, ARQUIVO_METADADOS)):
+                continue
+            try:
+                listas.append(ListaAlvos(diretorio))
+            except (OSError, ValueError, KeyError):
+                continue
+    return sorted(listas, key=lambda lista: lista.nome.lower())
+
+
+def remover_lista_alvos(diretorio):
+    """Apaga a lista; levanta OSError se ela estiver em uso (a lista continua disponível)."""
+    _descartar_diretorio(diretorio)
+
+
+def marcar_alvos(listas, valores, tipos):
+    """
+    Para cada (valor, tipo), os nomes das listas em que o valor consta, separados por vírgula
+    ("" quando em nenhuma). Uma busca vetorizada por lista e tipo.
+    """
+    valores = np.asarray(valores, dtype=object)
+    tipos = np.asarray(tipos, dtype=object)
+    marcas = np.full(len(valores), "", dtype=object)
+    for lista in listas:
+        achados = np.zeros(len(valores), dtype=bool)
+        for tipo in lista.tipos:
+            do_tipo = tipos == tipo
+            if do_tipo.any():
+                achados[do_tipo] = lista.contem(tipo, valores[do_tipo])
+        if achados.any():
+            marcas[achados] = np.where(marcas[achados] == "", lista.nome, marcas[achados] + ", " + lista.nome)
+    return marcas
+
+
+def anotar_blocos(listas, blocos):
+    """Acrescenta a coluna COLUNA_ALVOS a cada bloco de registros (gerador, para a exportação)."""
+    for bloco in blocos:
+        yield bloco.assign(**{COLUNA_ALVOS: marcar_alvos(listas, bloco["valor"].to_numpy(dtype=object),
+                                                         bloco["tipo"].to_numpy(dtype=object))})
@@ -0,0 +1,307 @@
+# analise.py
+
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from alvos import COLUNA_ALVOS, ListaAlvos, marcar_alvos
+from caso import BaseCaso
+from colocalizacao import detectar_colocalizacoes
+from cruzamento import AcumuladorCruzamentos, VisualizadorCruzamentos, detectar_cruzamentos, detectar_cruzamentos_por_sufixo
+from grafo import GrafoVinculos, reduzir_arestas_linha
+from indice import IndiceInvertido
+from instrumentacao import MedidorEtapas, Perfilador, registrar_execucao, rss_atual_mib, tabela_etapas
+from leitura import nome_fonte
+from normalizacao import COLUNA_MAP_HEURISTICO, COLUNAS_REGISTRO, CacheNormalizacao
+from processamento import (CacheArquivos, RegistrosEmDisco, chave_arquivo, juntar_registros, processar_arquivo,
+                           processar_em_paralelo)
+from registros import ArmazemRegistros
+
+# --- Execução Completa da Análise ---
+
+# Fração da barra de progresso ocupada pela leitura dos arquivos; o restante cobre cruzamento e extras
+FRACAO_LEITURA = 0.6
+
+
+def fontes_do_acervo(arquivos, abas):
+    """Fontes lógicas: cada aba de uma pasta com várias abas é cruzada como uma fonte própria, "arquivo [aba]"."""
+    fontes = {}
+    for nome_arquivo in arquivos:
+        abas_arquivo = abas.get(nome_arquivo) or []
+        for aba in (abas_arquivo if len(abas_arquivo) > 1 else [None]):
+            fontes[nome_fonte(nome_arquivo, aba)] = (nome_arquivo, aba)
+    return fontes
+
+
+def _remover_temporarios(caminhos):
+    for caminho in caminhos:
+        if caminho and os.path.exists(caminho):
+            os.remove(caminho)
+
+
+def executar_analise(trabalho, arquivos, analysis_type, tipos, dialetos=None, abas=None, strict=False,
+                     niveis_confianca=("baixa", "média", "alta"), modo_streaming=False, cruzar_por_sufixo=False,
+                     colocalizacao=None, janela_minutos=15, montar_grafo=False, vinculos_linha=False, workers=1,
+                     caminho_base_caso=None, motor_perfil=None, cache_arquivos=None, listas_alvos=None):
+    """
+    Leitura, cruzamento e extras de todo o acervo (`arquivos`: nome -> ArquivoEmDisco), sem depender
+    da interface: o progresso é informado ao `trabalho` e o cancelamento é verificado entre arquivos,
+    blocos e etapas. Devolve o que a sessão guarda (índice, cruzamentos, co-localizações, grafo,
+    desempenho) e, em "execucao", o resumo, o mapeamento de colunas e as mensagens a exibir.
+    Com `listas_alvos` (diretórios de ListaAlvos), cruzamentos e registros ganham a coluna COLUNA_ALVOS.
+    """
+    dialetos, abas = dialetos or {}, abas or {}
+    cache_arquivos = cache_arquivos if cache_arquivos is not None else CacheArquivos()
+    saida = {"indice": None, "resultados": None, "colocalizacoes": None, "grafo": None, "desempenho": None}
+    execucao = {"resumo": None, "mapeamentos": [], "tipos": list(tipos), "mensagens": [], "erros": [], "caso": None}
+    saida["execucao"] = execucao
+
+    # Tempo e memória por etapa: as etapas de cada arquivo vêm no resultado; as da execução são medidas aqui
+    inicio_execucao = time.perf_counter()
+    rss_inicio = rss_atual_mib()
+    medidor = MedidorEtapas()
+    perfilador = Perfilador(motor_perfil) if motor_perfil else None
+    if perfilador:
+        perfilador.iniciar()
+    total_cruzamentos = 0
+    contador, arquivos_lidos = 0, 0
+    map_primario = COLUNA_MAP_HEURISTICO[analysis_type]
+    fontes = fontes_do_acervo(arquivos, abas)
+    listas = [ListaAlvos(diretorio) for diretorio in listas_alvos or []]
+    total_arquivos = len(fontes)
+    acumulador = AcumuladorCruzamentos()
+    resultados, chaves, tarefas = {}, {}, []
+    execucao_arquivos, arquivo_registros, concluida = None, None, False
+
+    try:
+        # Arquivos já processados com o mesmo conteúdo, tipo de análise e rigor vêm do cache
+        cache_arquivos.acertos = cache_arquivos.falhas = 0
+        for fonte, (nome_arquivo, aba) in fontes.items():
+            file = arquivos[nome_arquivo]
+            with medidor.medir("cache"):
+                chaves[fonte] = chave_arquivo(None, nome_arquivo, analysis_type, strict, colocalizacao,
+                                              vinculos_linha, aba, sha256=file.sha256)
+                resultado = None if modo_streaming else cache_arquivos.obter(chaves[fonte])
+            if resultado is not None:
+                resultados[fonte] = resultado
+                contador += 1
+                arquivos_lidos += 1
+                continue
+            # Cada arquivo é lido do disco, normalizado e reduzido por inteiro (em paralelo, se configurado);
+            # os registros ficam em memória ou, no modo streaming, gravados em disco
+            tarefas.append({
+                "file": file.caminho, "nome_arquivo": nome_arquivo, "tipos": tipos, "map_primario": map_primario,
+                "strict": strict, "dialeto": dialetos.get(nome_arquivo), "gravar_registros": modo_streaming,
+                "colocalizacao": colocalizacao, "vinculos_linha": vinculos_linha, "aba": aba,
+                "listas_alvos": list(listas_alvos or []) if modo_streaming else None
+            })
+        processados = {nome_fonte(tarefa["nome_arquivo"], tarefa["aba"]) for tarefa in tarefas}
+        if workers > 1 and len(tarefas) > 1:
+            trabalho.informar(mensagem=f"Processando {len(tarefas)} arquivos em {workers} processos paralelos...")
+            execucao_arquivos = processar_em_paralelo(tarefas, workers)
+        else:
+            def _ao_ler_bloco(numero_bloco, fonte):
+                # Cancelamento no meio de um arquivo grande: o arquivo volta com erro, sem os dados parciais
+                trabalho.verificar()
+                trabalho.informar(mensagem=f"Lendo: {fonte} (bloco {numero_bloco})")
+
+            def _sequencial():
+                # Um único cache de normalização: MSISDNs e IMEIs repetidos entre arquivos são normalizados uma vez
+                cache = CacheNormalizacao()
+                for tarefa in tarefas:
+                    fonte = nome_fonte(tarefa["nome_arquivo"], tarefa["aba"])
+                    trabalho.informar(mensagem=f"Lendo: {fonte}")
+                    yield processar_arquivo(**tarefa, cache=cache,
+                                            ao_ler_bloco=lambda n, nome=fonte: _ao_ler_bloco(n, nome))
+            execucao_arquivos = _sequencial()
+
+        with medidor.medir("arquivos"):
+            for resultado in execucao_arquivos:
+                resultados[resultado["nome"]] = resultado
+                trabalho.verificar()
+                contador += 1
+                cache_arquivos.guardar(chaves[resultado["nome"]], resultado)
+                if resultado["erro"]:
+                    execucao["erros"].append(f"{resultado['nome']} -> Erro: {resultado['erro']}")
+                else:
+                    arquivos_lidos += 1
+                    if resultado.get("aviso"):
+                        execucao["mensagens"].append(("warning", f"{resultado['nome']}: {resultado['aviso']}"))
+                trabalho.informar(contador / total_arquivos * FRACAO_LEITURA,
+                                  f"Concluído: {resultado['nome']} ({contador}/{total_arquivos})")
+        medidor.contar("arquivos", linhas=sum(etapa["linhas"] for nome in processados
+                                             for etapa in resultados[nome]["etapas"] if etapa["etapa"] == "leitura"))
+
+        # Resultados incorporados na ordem do acervo, independentemente da ordem de conclusão
+        trabalho.informar(mensagem="Incorporando os resultados dos arquivos...")
+        with medidor.medir("incorporacao"):
+            cache_normalizacao = CacheNormalizacao()
+            armazem_registros, partes_registros = ArmazemRegistros(), []
+            for fonte in fontes:
+                resultado = resultados[fonte]
+                if resultado["estado"] is not None:
+                    acumulador.adicionar_estado(resultado["estado"], resultado["total_registros"])
+                armazem_registros.incorporar(resultado["registros"])
+                if resultado["arquivo_registros"]:
+                    partes_registros.append(resultado["arquivo_registros"])
+                cache_normalizacao.celulas += resultado["celulas"]
+                cache_normalizacao.normalizados += resultado["normalizados"]
+            if modo_streaming:
+                arquivo_registros = juntar_registros(partes_registros, tempfile.NamedTemporaryFile(suffix=".csv.gz", delete=False).name,
+                                                     COLUNAS_REGISTRO + [COLUNA_ALVOS] if listas else COLUNAS_REGISTRO)
+        medidor.contar("incorporacao", registros=acumulador.registros)
+
+        if arquivos_lidos < 1:
+            execucao["mensagens"].append(("error", "Necessário ao menos um arquivo válido."))
+        else:
+            resumo = cache_normalizacao.resumo()
+            if not modo_streaming:
+                resumo += "\n" + cache_arquivos.resumo()
+            if armazem_registros.registros:
+                resumo += (f"\nRegistros em memória: {armazem_registros.registros} "
+                           f"({armazem_registros.memoria() / armazem_registros.registros:.0f} bytes/registro)")
+            execucao["resumo"] = resumo
+            # Colunas escolhidas para cada tipo (nome e amostra do conteúdo), com as pontuações
+            execucao["mapeamentos"] = [(fonte, resultados[fonte]["mapeamento"]) for fonte in fontes
+                                       if resultados[fonte]["mapeamento"] is not None]
+            trabalho.verificar()
+            trabalho.informar(FRACAO_LEITURA, "Cruzando os dados...")
+
+            if acumulador.registros == 0:
+                execucao["mensagens"].append(("warning", "Nenhum dado relevante encontrado nos arquivos."))
+            else:
+                # Filtrar por nível de confiança e identificar cruzamentos numa única passada agrupada
+                with medidor.medir("cruzamento"):
+                    df_cruzado = detectar_cruzamentos(acumulador.estado(), list(niveis_confianca))
+                if cruzar_por_sufixo:
+                    # Cruzamentos parciais (número curto x número completo) entram na mesma tabela, com confiança própria
+                    with medidor.medir("cruzamento_sufixo"):
+                        df_sufixo = detectar_cruzamentos_por_sufixo(acumulador.estado(), list(niveis_confianca))
+                    medidor.contar("cruzamento_sufixo", registros=len(df_sufixo))
+                    df_cruzado = pd.concat([df for df in (df_cruzado, df_sufixo) if not df.empty] or [df_cruzado],
+                                           ignore_index=True)
+                total_cruzamentos = len(df_cruzado)
+                medidor.contar("cruzamento", registros=total_cruzamentos)
+                if listas:
+                    # Busca vetorizada nas listas (mmap) sobre os valores distintos do acervo e dos cruzamentos
+                    trabalho.informar(mensagem="Comparando com as listas de alvos...")
+                    with medidor.medir("listas_alvos"):
+                        distintos = acumulador.estado()[["valor", "tipo"]].drop_duplicates()
+                        em_listas = int((marcar_alvos(listas, distintos["valor"], distintos["tipo"]) != "").sum())
+                        df_cruzado[COLUNA_ALVOS] = marcar_alvos(listas, df_cruzado["valor"], df_cruzado["tipo"])
+                    medidor.contar("listas_alvos", registros=len(distintos) + len(df_cruzado))
+                    cruzados_em_listas = int((df_cruzado[COLUNA_ALVOS] != "").sum())
+                    execucao["mensagens"].append(
+                        ("warning" if em_listas else "info",
+                         f"Listas de alvos ({', '.join(lista.nome for lista in listas)}): {em_listas} valores distintos "
+                         f"do acervo constam nas listas, {cruzados_em_listas} deles entre os cruzamentos."))
+                # Índice valor -> arquivos mantido na sessão para consultas sem reprocessar
+                with medidor.medir("indice"):
+                    saida["indice"] = IndiceInvertido(acumulador.estado(), fontes.keys())
+                if montar_grafo:
+                    # Valores e arquivos como nós; os vínculos de linha de cada arquivo são somados aqui
+                    trabalho.verificar()
+                    trabalho.informar(0.7, "Montando o grafo de vínculos...")
+                    with medidor.medir("grafo"):
+                        arestas_linha = reduzir_arestas_linha([resultados[nome]["arestas_linha"]
+                                                               for nome in fontes
+                                                               if resultados[nome]["arestas_linha"] is not None])
+                        saida["grafo"] = GrafoVinculos(acumulador.estado(), arestas_linha)
+                    medidor.contar("grafo", registros=len(arestas_linha))
+
+                # Resultados mantidos na sessão: visualizador paginado e downloads sobrevivem às interações
+                if df_cruzado.empty:
+                    execucao["mensagens"].append(("warning", "Nenhum cruzamento encontrado com os critérios selecionados."))
+                else:
+                    registros_streaming = None
+                    if modo_streaming:
+                        # Registros já gravados em disco durante a leitura (CSV compactado): ficam no disco
+                        # até os resultados serem descartados, e só o caminho vai para a sessão
+                        registros_streaming, arquivo_registros = RegistrosEmDisco(arquivo_registros), None
+                    saida["resultados"] = {
+                        "cruzamentos": VisualizadorCruzamentos(df_cruzado),
+                        "registros": armazem_registros,
+                        "registros_streaming": registros_streaming,
+                        "listas_alvos": listas,
+                    }
+
+            if colocalizacao:
+                # Eventos (identificador, ERB, instante) de cada arquivo, varridos juntos por ERB e instante
+                trabalho.verificar()
+                trabalho.informar(0.8, "Detectando co-localizações...")
+                eventos = {nome: resultados[nome]["eventos"] for nome in fontes
+                           if resultados[nome]["eventos"] is not None}
+                with medidor.medir("colocalizacao"):
+                    df_colocalizacoes = detectar_colocalizacoes(eventos, int(janela_minutos) * 60)
+                medidor.contar("colocalizacao", linhas=sum(len(e) for e in eventos.values()), registros=len(df_colocalizacoes))
+                saida["colocalizacoes"] = {
+                    "pares": df_colocalizacoes, "janela_minutos": int(janela_minutos),
+                    "identificador": colocalizacao,
+                    "sem_eventos": [nome for nome in fontes
+                                    if resultados[nome]["eventos"] is not None and not len(resultados[nome]["eventos"])],
+                }
+
+            if caminho_base_caso:
+                # Só os arquivos que ainda não estão no caso são gravados e cruzados contra a base
+                trabalho.verificar()
+                trabalho.informar(0.9, "Gravando na base do caso...")
+                with medidor.medir("base_caso"), BaseCaso(caminho_base_caso) as base:
+                    novos_ids, ja_no_caso = [], 0
+                    for fonte in fontes:
+                        resultado = resultados[fonte]
+                        if resultado["erro"] or resultado["estado"] is None:
+                            continue
+                        arquivo_id = base.adicionar_arquivo(chaves[fonte][0], fonte, analysis_type, strict,
+                                                            resultado["estado"], resultado["total_registros"])
+                        if arquivo_id is None:
+                            ja_no_caso += 1
+                        else:
+                            novos_ids.append(arquivo_id)
+                    execucao["caso"] = {"novos": len(novos_ids), "ja_no_caso": ja_no_caso,
+                                        "total": len(base.arquivos()),
+                                        "cruzamentos": base.cruzamentos_novos(novos_ids, list(niveis_confianca))}
+        concluida = True
+    except Exception:
+        # Cancelado ou com falha: os arquivos concluídos ficam no cache, os registros parciais em disco são apagados
+        _remover_temporarios([resultado["arquivo_registros"] for resultado in resultados.values()])
+        raise
+    finally:
+        if execucao_arquivos is not None:
+            execucao_arquivos.close()  # no modo paralelo, descarta os arquivos que ainda não começaram
+        if perfilador and not concluida:
+            perfilador.parar()
+        _remover_temporarios([arquivo_registros])
+
+    trabalho.informar(1.0, "Concluído")
+    # Resumo de desempenho (mantido na sessão) e uma linha no log de execuções
+    etapas = [etapa for nome in fontes if nome in processados
+              for etapa in resultados[nome]["etapas"]] + medidor.linhas("(execução)")
+    saida["desempenho"] = {
+        "tabela": tabela_etapas(etapas),
+        "segundos": time.perf_counter() - inicio_execucao,
+        # RSS atual do servidor ao fim e quanto ela mudou durante a execução (outras sessões também influem)
+        "rss_mib": rss_atual_mib(),
+        "aumento_rss_mib": None,
+        "perfil": perfilador.parar() if perfilador else None,
+    }
+    if rss_inicio is not None and saida["desempenho"]["rss_mib"] is not None:
+        saida["desempenho"]["aumento_rss_mib"] = round(saida["desempenho"]["rss_mib"] - rss_inicio, 1)
+    try:
+        registrar_execucao({
+            "analise": analysis_type, "strict": strict, "modo_streaming": modo_streaming, "workers": int(workers),
+            "segundos": round(saida["desempenho"]["segundos"], 3),
+            "rss_mib": saida["desempenho"]["rss_mib"], "aumento_rss_mib": saida["desempenho"]["aumento_rss_mib"],
+            "registros": acumulador.registros, "cruzamentos": total_cruzamentos,
+            "arquivos": [
+                {"nome": nome, "bytes": arquivos[nome_arquivo].tamanho,
+                 "do_cache": nome not in processados, "registros": resultados[nome]["total_registros"],
+                 "erro": resultados[nome]["erro"]}
+                for nome, (nome_arquivo, _) in fontes.items()
+            ],
+            "etapas": etapas,
+        })
+    except OSError as e:
+        execucao["mensagens"].append(("warning", f"Não foi possível gravar o log de execuções: {e}"))
+    return saida
@@ -1,216 +1,26 @@
 # comparador_telematico_enhanced.py
 
 import streamlit as st
+import altair as alt
 import pandas as pd
-import re
-import io
 import os
-import time
 
-# --- Funções Aprimoradas para Normalização ---
-
-def _limpar_valor_excel(valor):
-    """Remove sufixos de float (.0), trata notação científica e espaços de valores vindos do Excel."""
-    if pd.isna(valor): return ""
-    v_str = str(valor).strip()
-    
-    # Se parecer número (incluindo notação científica), converter para inteiro e depois string
-    if re.match(r'^-?\d+(\.\d+)?([eE][-+]?\d+)?$', v_str):
-        try:
-            return '{:.0f}'.format(float(valor))
-        except (ValueError, TypeError):
-            pass
-            
-    if v_str.endswith('.0'): v_str = v_str[:-2]
-    return v_str
-
-def normalizar_telefone(numero, strict=False):
-    """
-    Normaliza números de telefone com foco no padrão brasileiro e lida com o 9º dígito.
-    """
-    v_limpo = _limpar_valor_excel(numero)
-    if not v_limpo: return None, None
-
-    # Remove tudo que não é dígito
-    numero_limpo = re.sub(r"[^\d]", "", v_limpo)
-
-    if not numero_limpo or len(numero_limpo) < 8:
-        return None, None
-
-    # NOVO: Filtro para números de centrais/inválidos (ex: 00000000, 11111111)
-    # Se todos os dígitos forem iguais, ignora
-    if len(set(numero_limpo)) == 1:
-        return None, None
-
-    # Remove prefixo 0 inicial se houver
-    if numero_limpo.startswith("0") and len(numero_limpo) > 10:
-        numero_limpo = numero_limpo[1:]
-
-    # Remove prefixo 55 (Brasil) se houver
-    if numero_limpo.startswith("55") and len(numero_limpo) >= 12:
-        numero_limpo = numero_limpo[2:]
-
-    # Casos de números nacionais (com DDD)
-    if 10 <= len(numero_limpo) <= 11:
-        # Se tem 10 dígitos, avaliar se deve adicionar o 9 (celular)
-        if len(numero_limpo) == 10:
-            ddd = numero_limpo[:2]
-            prefixo = numero_limpo[2]
-            # No Brasil, celulares começam com 6, 7, 8 ou 9
-            if prefixo in ['6', '7', '8', '9']:
-                numero_normalizado = "+55" + ddd + "9" + numero_limpo[2:]
-                return numero_normalizado, "média"
-            else:
-                return "+55" + numero_limpo, "alta"
-        
-        # Se tem 11 dígitos, verificar se o 9 está no lugar certo
-        if len(numero_limpo) == 11:
-            if numero_limpo[2] == '9':
-                return "+55" + numero_limpo, "alta"
-            else:
-                return "+55" + numero_limpo, "baixa"
-
-    # Números curtos (sem DDD) - menos confiáveis para cruzamento
-    elif 8 <= len(numero_limpo) <= 9:
-        if len(numero_limpo) == 8:
-            # Tentar normalizar para 9 dígitos se for celular
-            if numero_limpo[0] in ['6', '7', '8', '9']:
-                return "9" + numero_limpo, "baixa"
-        return numero_limpo, "baixa"
-
-    # Fallback para outros formatos (pode ser internacional)
-    if len(numero_limpo) > 11 and not strict:
-        return "+" + numero_limpo, "baixa"
-
-    return None, None
-
-
-def normalizar_imei(imei, strict=False):
-    """
-    Normaliza IMEIs lidando com conversões de float do Excel.
-    """
-    v_limpo = _limpar_valor_excel(imei)
-    if not v_limpo: return None, None
-    
-    imei_limpo = re.sub(r'\D', '', v_limpo)
-    
-    if not imei_limpo:
-        return None, None
-    
-    # Alta confiança: IMEI padrão de 15 dígitos
-    if len(imei_limpo) == 15:
-        return imei_limpo, "alta"
-    
-    # Média confiança: próximo do padrão IMEI (14 ou 16 dígitos)
-    elif 14 <= len(imei_limpo) <= 16:
-        return imei_limpo[:15], "média"
-    
-    # Baixa confiança: potencialmente um IMEI, mas formato não padrão
-    elif len(imei_limpo) >= 8 and not strict:
-        return imei_limpo, "baixa"
-    
-    return None, None
-
-
-def normalizar_email(email, strict=False):
-    """
-    Normaliza endereços de e-mail com diferentes níveis de rigor.
-    """
-    if pd.isna(email): return None, None
-    
-    email_str = str(email).strip().lower()
-    
-    if not email_str:
-        return None, None
-    
-    # Alta confiança: formato de e-mail padrão
-    if '@' in email_str and '.' in email_str.split('@', 1)[1]:
-        local, domain = email_str.split('@', 1)
-        local = local.split('+')[0]  # Remove parte após + (comum em e-mails Gmail)
-        return f"{local}@{domain}", "alta"
-    
-    # Média confiança: contém @ mas formato não totalmente padrão
-    elif '@' in email_str:
-        return email_str, "média"
-    
-    # Baixa confiança: potencialmente um e-mail, mas formato incomum
-    elif not strict and ('.' in email_str or len(email_str) >= 5):
-        return email_str, "baixa"
-    
-    return None, None
-
-
-def normalizar_hash(h, strict=False):
-    """
-    Normaliza hashes com diferentes níveis de rigor.
-    """
-    if pd.isna(h): return None, None
-    
-    h_str = str(h).strip().lower()
-    
-    if not h_str:
-        return None, None
-    
-    # Alta confiança: formato de hash hexadecimal padrão
-    if re.fullmatch(r'[0-9a-f]{32,128}', h_str):
-        return h_str, "alta"
-    
-    # Média confiança: aparenta ser hash mas não segue padrão exato
-    elif re.fullmatch(r'[0-9a-f]{16,}', h_str):
-        return h_str, "média"
-    
-    # Baixa confiança: potencialmente um hash ou identificador
-    elif not strict and re.search(r'[0-9a-f]{8,}', h_str):
-        return h_str, "baixa"
-    
-    return None, None
-
-
-def normalizar_id_localizacao(id_str, strict=False):
-    """
-    Normaliza IDs de localização com diferentes níveis de rigor.
-    """
-    if pd.isna(id_str): return None, None
-    
-    id_clean = str(id_str).strip().upper()
-    
-    if not id_clean:
-        return None, None
-    
-    # Alta confiança: ID formatado normalmente
-    if len(id_clean) >= 4:
-        return id_clean, "alta"
-    
-    # Média/Baixa confiança: potencialmente um ID, mas curto
-    elif not strict and len(id_clean) > 0:
-        return id_clean, "baixa"
-    
-    return None, None
-
-# --- Mapeamentos de Colunas ---
-
-COLUNA_MAP_HEURISTICO = {
-    "Extratos de ERBs": {
-        "telefone": [
-            "telefone", "fone", "numero", "tel", "terminal", "msisdn", "número", "celular", 
-            "calling", "called", "origem", "destino", "caller", "callee", "dialed", "chamador", "chamado",
-            "a_party", "b_party", "address", "orig", "dest", "v_msisdn_origem", "v_msisdn_destino",
-            "number", "contact", "contato", "phone", "mobile", "movel", "alvo", "interceptado", "interlocutor"
-        ],
-        "imei": [
-            "imei", "terminal id", "terminal_id", "id", "equipamento", "aparelho", "device", "serial",
-            "esn", "meid", "identificador_equipamento", "hardware", "equip"
-        ]
-    },
-    "Dados de Contas Online (Google Location)": {
-        "id_localizacao": ["location id", "obfuscated id", "id", "identifier", "locid", "gaia", "user_id"],
-        "email": [
-            "email", "conta google", "gmail", "conta", "e-mail", "endereco", "endereço", 
-            "login", "user", "username", "usuario", "usuário", "mail", "address", "principal", "recovery"
-        ],
-        "hash": ["hash", "md5", "sha1", "sha256", "sha512", "checksum", "digest"]
-    }
-}
+from acervo import AcervoEmDisco, e_pacote, remover_acervos_orfaos
+from alvos import COLUNA_ALVOS, anotar_blocos, criar_lista_alvos, listar_listas_alvos, remover_lista_alvos
+from analise import executar_analise
+from caso import CAMINHO_BASE_CASO
+from colocalizacao import JANELA_PADRAO_MINUTOS
+from cruzamento import CONFIANCA_ORDENADA, DIGITOS_SUFIXO, VisualizadorCruzamentos
+from exportacao import FORMATOS_EXPORTACAO, exportar, exportar_graphml, exportar_matrizes
+from instrumentacao import MOTORES_PERFIL
+from leitura import descrever_dialeto, detectar_dialeto, listar_abas
+from normalizacao import ANALYSIS_TYPE_MAPPING, COLUNA_MAP_HEURISTICO, COLUNAS_REGISTRO
+from processamento import CacheArquivos
+from trabalhos import CANCELADO, CONCLUIDO, EXECUTANDO, GerenciadorTrabalhos
+
+# Chaves da sessão preenchidas pelo resultado de cada execução
+CHAVES_RESULTADO = ["indice", "resultados", "colocalizacoes", "grafo", "desempenho", "execucao"]
+INTERVALO_ATUALIZACAO = 1.0  # segundos entre as atualizações do progresso do trabalho
 
 # --- Configuração da Página ---
 
@@ -290,16 +100,13 @@ with st.expander("Clique para Ajuda e Objetivo da Ferramenta"):
         - **Alta (Verde)**: Dados em formato padrão completo
         - **Média (Laranja)**: Dados em formato próximo ao padrão
         - **Baixa (Vermelho)**: Dados potencialmente relevantes, mas em formato não padrão
+        - **Sufixo (Roxo)**: Número curto (sem DDD) ligado a um número completo de outro arquivo pelos últimos dígitos
     """)
 
 # --- Tipo de Análise ---
 
 st.header("Configurar Análise")
 analysis_type = st.selectbox("Tipo de Análise:", ["-- Selecione --", "Extratos de ERBs", "Dados de Contas Online (Google Location)"])
-ANALYSIS_TYPE_MAPPING = {
-    "Extratos de ERBs": ["telefone", "imei"],
-    "Dados de Contas Online (Google Location)": ["id_localizacao", "email", "hash"]
-}
 data_types_to_process = ANALYSIS_TYPE_MAPPING.get(analysis_type, [])
 
 if analysis_type != "-- Selecione --":
@@ -310,22 +117,225 @@ if analysis_type != "-- Selecione --":
 strict_mode = False  # Modo permissivo por padrão
 niveis_confianca = ["baixa", "média", "alta"]  # Incluir todos os níveis de confiança
 
+modo_streaming = st.checkbox(
+    "Modo streaming para extratos muito grandes",
+    help="Lê os arquivos em blocos e grava os registros extraídos em disco, mantendo o uso de memória estável. "
+         "O relatório de todos os registros passa a ser entregue em CSV compactado."
+)
+cruzar_por_sufixo = st.checkbox(
+    f"Cruzar números curtos pelo sufixo ({DIGITOS_SUFIXO} últimos dígitos)",
+    help="Liga telefones de 8 ou 9 dígitos sem DDD ao número completo (+55 DDD) de outro arquivo com o mesmo final. "
+         "Esses cruzamentos parciais aparecem com a confiança \"sufixo\" e devem ser confirmados pelo analista."
+)
+usar_colocalizacao = analysis_type == "Extratos de ERBs" and st.checkbox(
+    "Detectar co-localização temporal (mesma ERB na mesma janela de tempo)",
+    help="Usa as colunas de ERB e de data/hora dos extratos para listar pares de identificadores de arquivos diferentes "
+         "registrados na mesma ERB com poucos minutos de diferença, com o número de vezes em que isso ocorreu."
+)
+identificador_colocalizacao, janela_minutos = None, JANELA_PADRAO_MINUTOS
+if usar_colocalizacao:
+    col_janela, col_identificador = st.columns(2)
+    janela_minutos = col_janela.number_input("Janela de tempo (minutos)", min_value=1, max_value=24 * 60,
+                                             value=JANELA_PADRAO_MINUTOS)
+    identificador_colocalizacao = col_identificador.selectbox(
+        "Identificador", ["imei", "telefone"], format_func=str.upper,
+        help="Para telefone, são usadas as colunas de origem quando o extrato as distingue (a ERB registrada é a do alvo)."
+    )
+montar_grafo = st.checkbox(
+    "Montar grafo de vínculos (clusters de valores e arquivos)",
+    help="Liga valores e arquivos num grafo e agrupa em clusters tudo o que está conectado, revelando cadeias como "
+         "telefone A - IMEI X - telefone B entre arquivos diferentes."
+)
+vinculos_linha = montar_grafo and st.checkbox(
+    "Ligar valores da mesma linha no grafo",
+    help="Também liga os valores encontrados no mesmo registro (ex: o telefone e o IMEI de uma linha). "
+         "Necessário para seguir cadeias entre identificadores; aumenta um pouco o tempo de leitura."
+)
+workers = st.number_input(
+    "Arquivos processados em paralelo", min_value=1, max_value=os.cpu_count() or 1, value=min(4, os.cpu_count() or 1),
+    help="Número de processos usados para ler e normalizar os arquivos ao mesmo tempo (1 = sequencial)."
+)
+usar_base_caso = st.checkbox(
+    "Gravar na base do caso (persistente em disco)",
+    help="Guarda os valores normalizados de cada arquivo numa base SQLite local e cruza os arquivos novos "
+         "com tudo o que já foi incluído no caso em sessões anteriores. A base não é apagada pelo download."
+)
+caminho_base_caso = st.text_input("Arquivo da base do caso", value=CAMINHO_BASE_CASO) if usar_base_caso else None
+
+# Listas de alvos: gravadas uma vez em disco (pasta "listas") e comparadas com os valores de cada execução
+listas_alvos = []
+if data_types_to_process:
+    with st.expander("🎯 Listas de Alvos"):
+        st.caption("Planilha de referência (ex: milhões de telefones ou e-mails de interesse) lida uma única vez, "
+                   "com a mesma normalização da análise, e gravada em disco num formato compacto consultado sem "
+                   "carregar a lista na memória. A primeira linha da planilha deve ser o cabeçalho (ex: telefone, imei). "
+                   "As listas ficam disponíveis para as próximas sessões.")
+        arquivo_lista = st.file_uploader("Planilha de referência", type=["csv", "xlsx", "xls"], key="upload_lista_alvos")
+        nome_lista = st.text_input("Nome da lista", value=os.path.splitext(arquivo_lista.name)[0] if arquivo_lista else "")
+        if st.button("Gravar Lista de Alvos", disabled=arquivo_lista is None or not nome_lista.strip()):
+            with st.spinner("Lendo e gravando a lista de alvos..."):
+                try:
+                    lista = criar_lista_alvos(arquivo_lista, arquivo_lista.name, nome_lista.strip(), data_types_to_process,
+                                              COLUNA_MAP_HEURISTICO[analysis_type])
+                    st.success(f"Lista \"{lista.nome}\" gravada: " + ", ".join(
+                        f"{quantidade} {tipo.upper()}" for tipo, quantidade in lista.contagens.items()) + ".")
+                except Exception as e:
+                    st.error(f"Não foi possível gravar a lista de alvos: {e}")
+        for lista in listar_listas_alvos():
+            col_lista, col_del_lista = st.columns([5, 1])
+            col_lista.markdown(f"`{lista.nome}` — {len(lista)} valores de {lista.origem}, gravada em {lista.criada_em}")
+            if col_del_lista.button("❌", key=f"del_lista_{lista.diretorio}"):
+                try:
+                    remover_lista_alvos(lista.diretorio)
+                    st.rerun()
+                except OSError as e:
+                    st.error(f"Não foi possível remover a lista \"{lista.nome}\" (em uso por um processamento?): {e}")
+    listas_disponiveis = {lista.diretorio: lista for lista in listar_listas_alvos()
+                          if set(lista.tipos) & set(data_types_to_process)}
+    listas_alvos = st.multiselect(
+        "Comparar com as listas de alvos", list(listas_disponiveis),
+        format_func=lambda diretorio: f"{listas_disponiveis[diretorio].nome} ({len(listas_disponiveis[diretorio])} valores)",
+        help=f"Marca, nos cruzamentos e em todos os registros extraídos, os valores que constam nas listas escolhidas "
+             f"(coluna {COLUNA_ALVOS})."
+    )
+formato_relatorios = st.selectbox(
+    "Formato dos relatórios", list(FORMATOS_EXPORTACAO),
+    help="XLSX é dividido em várias abas quando passa do limite de linhas do Excel; CSV.GZ e Parquet são mais rápidos "
+         "para volumes grandes. No modo streaming, todos os registros são sempre entregues em CSV.GZ."
+)
+motor_perfil = st.selectbox(
+    "Perfil de execução (diagnóstico)", ["Desligado"] + MOTORES_PERFIL,
+    help="Captura um perfil das funções mais custosas durante o processamento e o exibe ao final. "
+         "Deixa a execução mais lenta; no modo paralelo só o processo principal é perfilado."
+)
+
 # --- Upload de Arquivos ---
 
 if 'uploaded_files' not in st.session_state:
-    st.session_state.uploaded_files = {} # Dict de filename: file_object
+    st.session_state.uploaded_files = AcervoEmDisco() # Nome -> ArquivoEmDisco (gravado no diretório da sessão)
+if 'versao_upload' not in st.session_state:
+    st.session_state.versao_upload = 0 # Muda a chave do file_uploader para esvaziá-lo depois de gravar os arquivos
+if 'avisos_upload' not in st.session_state:
+    st.session_state.avisos_upload = [] # Resumo dos pacotes do último envio: (nível, texto)
+if 'dialetos' not in st.session_state:
+    st.session_state.dialetos = {} # Dict de filename: DialetoCSV (apenas CSV)
+if 'abas' not in st.session_state:
+    st.session_state.abas = {} # Dict de filename: nomes das abas (apenas Excel)
+if 'indice' not in st.session_state:
+    st.session_state.indice = None # IndiceInvertido da última execução
+if 'resultados' not in st.session_state:
+    st.session_state.resultados = None # Cruzamentos e registros da última execução
+if 'desempenho' not in st.session_state:
+    st.session_state.desempenho = None # Tempos por etapa (e perfil) da última execução
+if 'colocalizacoes' not in st.session_state:
+    st.session_state.colocalizacoes = None # Pares co-localizados da última execução
+if 'grafo' not in st.session_state:
+    st.session_state.grafo = None # GrafoVinculos da última execução
+if 'cache_arquivos' not in st.session_state:
+    st.session_state.cache_arquivos = CacheArquivos() # Resultados por conteúdo, entre execuções
+if 'execucao' not in st.session_state:
+    st.session_state.execucao = None # Resumo, mapeamento de colunas e mensagens da última execução
+if 'trabalho' not in st.session_state:
+    st.session_state.trabalho = None # Id do trabalho em segundo plano desta sessão
+
+
+@st.cache_resource
+def limpar_acervos_orfaos():
+    """Uma vez por servidor: apaga os uploads deixados em disco por sessões de uma execução que caiu."""
+    return remover_acervos_orfaos()
+
+
+@st.cache_resource
+def gerenciador_trabalhos():
+    """Registro de trabalhos único no servidor: compartilhado pelas sessões e preservado entre reexecuções."""
+    return GerenciadorTrabalhos()
+
+
+def apagar_registros_streaming():
+    """Apaga do disco o CSV.gz de registros do modo streaming da execução que está sendo descartada."""
+    resultados = st.session_state.resultados
+    if resultados is not None and resultados["registros_streaming"] is not None:
+        resultados["registros_streaming"].apagar()
+
+
+def limpar_sessao():
+    """Sessão Segura: após um download, todos os dados da sessão são apagados do servidor."""
+    st.session_state.clear()
+    st.success("Dados limpos com sucesso. Reiniciando sistema...")
+
+
+def recolher_trabalho(trabalho):
+    """Leva para a sessão o resultado do trabalho encerrado (ou o motivo do fim) e o retira do registro."""
+    if trabalho.estado == CONCLUIDO:
+        for chave in CHAVES_RESULTADO:
+            st.session_state[chave] = trabalho.resultado[chave]
+    elif trabalho.estado == CANCELADO:
+        st.session_state.execucao = {"mensagens": [("info", "Processamento cancelado. Os arquivos já concluídos "
+                                                           "ficam no cache e não são lidos de novo.")]}
+    else:
+        st.session_state.execucao = {"mensagens": [("error", f"Falha no processamento: {trabalho.erro}")]}
+    gerenciador.descartar(trabalho.id)
+    st.session_state.trabalho = None
+
+
+limpar_acervos_orfaos()
+gerenciador = gerenciador_trabalhos()
+trabalho_atual = gerenciador.obter(st.session_state.trabalho) if st.session_state.trabalho else None
+if trabalho_atual is not None and trabalho_atual.encerrado:
+    recolher_trabalho(trabalho_atual)
+    trabalho_atual = None
+elif trabalho_atual is None:
+    st.session_state.trabalho = None  # trabalho descartado do registro (ex: servidor reiniciado)
 
 st.header("Adicionar Planilhas")
-new_files = st.file_uploader("Arraste ou selecione as planilhas aqui", type=["csv", "xlsx", "xls"], accept_multiple_files=True)
+new_files = st.file_uploader("Arraste ou selecione as planilhas aqui (ou pacotes .zip, .tar.gz e .gz com as planilhas)",
+                             type=["csv", "xlsx", "xls", "zip", "gz", "tgz", "tar"], accept_multiple_files=True,
+                             key=f"upload_{st.session_state.versao_upload}")
+
+
+def detectar_formato(arquivo):
+    """Dialeto e codificação (CSV) ou abas (Excel), detectados uma única vez, na chegada do arquivo."""
+    with arquivo.abrir() as aberto:
+        if arquivo.name.lower().endswith(".csv"):
+            st.session_state.dialetos[arquivo.name] = detectar_dialeto(aberto)
+        else:
+            try:
+                st.session_state.abas[arquivo.name] = listar_abas(aberto, arquivo.name)
+            except Exception:
+                st.session_state.abas[arquivo.name] = None  # arquivo ilegível: o erro aparece no processamento
+
 
 if new_files:
+    avisos = []
     for f in new_files:
-        if f.name not in st.session_state.uploaded_files:
-            st.session_state.uploaded_files[f.name] = f
+        # Gravado em disco na chegada (com o SHA-256 do conteúdo); a memória do upload é liberada abaixo
+        if e_pacote(f.name):
+            # Cada planilha do pacote vira um arquivo do acervo, "pacote/membro", descompactada uma por vez
+            try:
+                gravados, ignorados = st.session_state.uploaded_files.adicionar_pacote(f)
+            except Exception as e:
+                avisos.append(("error", f"{f.name}: não foi possível abrir o pacote ({e})."))
+                continue
+            avisos.append(("info", f"{f.name}: {len(gravados)} planilhas adicionadas ao acervo"
+                                   + (f"; {len(ignorados)} arquivos de outros formatos ignorados." if ignorados else ".")))
+        elif f.name not in st.session_state.uploaded_files:
+            gravados = [st.session_state.uploaded_files.adicionar(f)]
+        else:
+            continue
+        for arquivo in gravados:
+            detectar_formato(arquivo)
+    st.session_state.avisos_upload = avisos
+    # Nova chave esvazia o file_uploader: o Streamlit deixa de guardar os bytes enviados na memória do servidor
+    st.session_state.versao_upload += 1
+    st.rerun()
+
+for nivel, texto in st.session_state.avisos_upload:
+    getattr(st, nivel)(texto)
 
 # Mostrar lista personalizada de arquivos (Até 20 por tela)
 if st.session_state.uploaded_files:
     st.subheader(f"Arquivos no Acervo ({len(st.session_state.uploaded_files)})")
+    st.caption(f"{st.session_state.uploaded_files.tamanho() / 1024 ** 2:.1f} MB gravados em disco na pasta temporária da sessão.")
     
     arquivos_lista = sorted(list(st.session_state.uploaded_files.keys()))
     itens_por_pagina = 20
@@ -340,315 +350,373 @@ if st.session_state.uploaded_files:
         
     for fname in arquivos_lista[inicio:fim]:
         col_f, col_del = st.columns([5, 1])
-        col_f.markdown(f"✅ `{fname}`")
+        dialeto = st.session_state.dialetos.get(fname)
+        abas = st.session_state.abas.get(fname) or []
+        col_f.markdown(f"✅ `{fname}`" + (f" — {descrever_dialeto(dialeto)}" if dialeto else "")
+                       + (f" — {len(abas)} abas, cruzadas como fontes separadas" if len(abas) > 1 else ""))
         if col_del.button("❌", key=f"del_{fname}"):
             del st.session_state.uploaded_files[fname]
+            st.session_state.dialetos.pop(fname, None)
+            st.session_state.abas.pop(fname, None)
+            apagar_registros_streaming()
+            st.session_state.indice = None
+            st.session_state.resultados = None
+            st.session_state.colocalizacoes = None
+            st.session_state.grafo = None
+            st.session_state.desempenho = None
+            st.session_state.execucao = None
             st.rerun()
     
     if st.button("Limpar Todo o Acervo", type="secondary"):
-        st.session_state.uploaded_files = {}
+        st.session_state.uploaded_files.limpar()
+        st.session_state.avisos_upload = []
+        st.session_state.dialetos = {}
+        st.session_state.abas = {}
+        apagar_registros_streaming()
+        st.session_state.indice = None
+        st.session_state.resultados = None
+        st.session_state.colocalizacoes = None
+        st.session_state.grafo = None
+        st.session_state.desempenho = None
+        st.session_state.execucao = None
+        st.session_state.cache_arquivos = CacheArquivos()
+        if st.session_state.trabalho:
+            gerenciador.descartar(st.session_state.trabalho)  # cancela o processamento em andamento
+            st.session_state.trabalho = None
         st.rerun()
 
-# --- Detectar Cabeçalho ---
-
-def detectar_cabecalho(file, filename, max_linhas=15):
-    try:
-        file.seek(0)
-        for i in range(max_linhas):
-            file.seek(0)
-            if filename.lower().endswith(".csv"):
-                df = pd.read_csv(file, header=i, nrows=10, encoding="utf-8", sep=None, engine='python')
-            else:
-                # Tentar ler com motores específicos para .xlsx e .xls
-                if filename.lower().endswith(".xlsx"):
-                    engine = 'openpyxl'
-                elif filename.lower().endswith(".xls"):
-                    engine = 'xlrd'
-                else:
-                    engine = None
-                df = pd.read_excel(file, header=i, nrows=10, engine=engine)
-            
-            # Heurística: cabeçalho costuma ter poucas colunas nulas e nomes significativos
-            column_names = [str(c) for c in df.columns]
-            unnamed_count = sum(1 for c in column_names if "unnamed" in c.lower() or not c.strip())
-            
-            if df.shape[1] >= 2 and unnamed_count < df.shape[1] // 1.5:
-                return i
-        return 0
-    except Exception:
-        return 0
-
 # --- Complementares ---
 
 # Checar se há arquivos
 if st.session_state.uploaded_files and data_types_to_process:
 
-    if st.button("Processar e Cruzar Dados", type="primary", use_container_width=True):
-        st.subheader("Status:")
-        status_area = st.empty()
-        progress = st.progress(0.0)
-        dataframes_por_arquivo, erros = [], []
-        contador = 0
-        total_arquivos = len(st.session_state.uploaded_files)
-
-        for nome_arquivo, file in st.session_state.uploaded_files.items():
-            contador += 1
-            status_area.text(f"Lendo: {nome_arquivo}")
-            try:
-                header_row = detectar_cabecalho(file, nome_arquivo)
-                file.seek(0)
-                if nome_arquivo.lower().endswith(".csv"):
-                    df = pd.read_csv(file, header=header_row, dtype=str, encoding='utf-8', sep=None, engine='python')
-                else:
-                    if nome_arquivo.lower().endswith(".xlsx"):
-                        engine = 'openpyxl'
-                    elif nome_arquivo.lower().endswith(".xls"):
-                        engine = 'xlrd'
-                    else:
-                        engine = None
-                    df = pd.read_excel(file, header=header_row, dtype=str, engine=engine)
-                
-                # Limpeza inicial: remover 'nan'
-                df = df.fillna("")
-                # Standardizing columns
-                df.columns = [str(col).strip().lower() for col in df.columns]
-                dataframes_por_arquivo.append({"df": df, "nome": nome_arquivo})
-            except Exception as e:
-                erros.append(f"{nome_arquivo} -> Erro: {e}")
-            progress.progress(contador / total_arquivos * 0.3)
-
-        if len(dataframes_por_arquivo) < 1:
-            st.error("Necessário ao menos um arquivo válido.")
-        else:
-            normalizadores = {
-                "telefone": lambda x: normalizar_telefone(x, strict_mode),
-                "imei": lambda x: normalizar_imei(x, strict_mode),
-                "email": lambda x: normalizar_email(x, strict_mode),
-                "hash": lambda x: normalizar_hash(x, strict_mode),
-                "id_localizacao": lambda x: normalizar_id_localizacao(x, strict_mode)
-            }
-            map_primario = COLUNA_MAP_HEURISTICO[analysis_type]
-
-            # Armazenar todos os dados extraídos com seus níveis de confiança
-            todos_registros = []
-
-            for bloco in dataframes_por_arquivo:
-                df, nome_arquivo = bloco["df"], bloco["nome"]
-                
-                # Primeiro, vamos identificar as colunas para cada tipo de dado
-                colunas_por_tipo = {}
-                for tipo in data_types_to_process:
-                    colunas_tipo = [col for col in df.columns if any(k in col.lower() for k in map_primario[tipo])]
-                    
-                    # NOVO: SE NÃO ENCONTRAR COLUNA PELO NOME, VARRE TUDO (Varredura de Segurança)
-                    # Isso garante que mesmo que a planilha mude o nome da coluna para algo desconhecido, os dados serão capturados
-                    if not colunas_tipo:
-                        colunas_tipo = list(df.columns)
-                    
-                    colunas_por_tipo[tipo] = colunas_tipo
-                
-                # Agora processamos cada linha
-                for _, row in df.iterrows():
-                    # Para cada tipo de dado, tentamos extrair de todas as colunas relevantes
-                    for tipo in data_types_to_process:
-                        for col in colunas_por_tipo[tipo]:
-                            valor_normalizado, confianca = normalizadores[tipo](row[col])
-                            
-                            if valor_normalizado:
-                                dado = {
-                                    "valor": valor_normalizado,
-                                    "tipo": tipo,
-                                    "confianca": confianca,
-                                    "arquivo": nome_arquivo,
-                                    "valor_original": row[col],
-                                    "coluna_fonte": col
-                                }
-                                todos_registros.append(dado)
-
-            progress.progress(0.6)
-            
-            # Converter para DataFrame para facilitar o processamento
-            df_todos = pd.DataFrame(todos_registros)
-            
-            if df_todos.empty:
-                st.warning("Nenhum dado relevante encontrado nos arquivos.")
-            else:
-                # Filtrar por nível de confiança (usando todos os níveis por padrão)
-                df_filtrado = df_todos[df_todos["confianca"].isin(niveis_confianca)]
-                
-                # Identificar cruzamentos
-                cruzamentos = []
-                for (valor, tipo), grupo in df_filtrado.groupby(["valor", "tipo"]):
-                    arquivos_unicos = grupo["arquivo"].unique()
-                    
-                    # Cruzamento ocorre se o mesmo valor aparece em arquivos diferentes
-                    if len(arquivos_unicos) > 1:
-                        cruzamento = {
-                            "valor": valor,
-                            "tipo": tipo,
-                            "confianca": grupo["confianca"].max(),
-                            "arquivos": list(arquivos_unicos),
-                            "colunas": list(grupo["coluna_fonte"].unique()),
-                            "ocorrencias": len(grupo)
-                        }
-                        cruzamentos.append(cruzamento)
-                
-                df_cruzado = pd.DataFrame(cruzamentos)
-                
-                # Ordenar por relevância: mais ocorrências primeiro e maior confiança
-                if not df_cruzado.empty:
-                    conf_map = {"alta": 0, "média": 1, "baixa": 2}
-                    df_cruzado["_priority"] = df_cruzado["confianca"].map(conf_map)
-                    df_cruzado = df_cruzado.sort_values(by=["ocorrencias", "_priority"], ascending=[False, True]).drop(columns=["_priority"])
-                
-                # Mostrar resultados
-                if df_cruzado.empty:
-                    st.warning("Nenhum cruzamento encontrado com os critérios selecionados.")
-                else:
-                    st.success(f"Foram encontrados {len(df_cruzado)} elementos cruzados entre blocos.")
-                    
-                    # Função para formatação de confiança
-                    def format_confidence(df):
-                        # Verificar o tamanho do DataFrame para evitar problemas com o Styler
-                        total_cells = df.shape[0] * df.shape[1]
-                        MAX_CELLS_STYLER = 250000  # Limite seguro para o Styler
-                        
-                        if total_cells > MAX_CELLS_STYLER:
-                            st.warning(f"O DataFrame tem {total_cells} células, excedendo o limite para estilização. Exibindo sem cores.")
-                            return df
-                        else:
-                            return df.style.apply(
-                                lambda x: [
-                                    'background-color: rgba(0, 255, 0, 0.1)' if v == 'alta' else 
-                                    'background-color: rgba(255, 165, 0, 0.1)' if v == 'média' else 
-                                    'background-color: rgba(255, 0, 0, 0.1)' if v == 'baixa' else 
-                                    '' for v in x
-                                ], 
-                                subset=['confianca']
-                            )
-                    
-                    # Exibir apenas os cruzamentos na interface, não exibindo todos os dados
-                    st.subheader("Cruzamentos Identificados")
-                    st.dataframe(format_confidence(df_cruzado))
-                    
-                    # Criar botões de download separados
-                    st.subheader("Downloads Disponíveis")
-                    
-                    # 1. Download da planilha com os cruzamentos
-                    output_cruzamentos = io.BytesIO()
-                    with pd.ExcelWriter(output_cruzamentos, engine='xlsxwriter') as writer:
-                        df_cruzado.to_excel(writer, index=False, sheet_name="Cruzamentos")
-                        
-                        # Configuração para destacar níveis de confiança na planilha
-                        workbook = writer.book
-                        worksheet = writer.sheets["Cruzamentos"]
-                        
-                        # Formatos para diferentes níveis de confiança
-                        formato_alta = workbook.add_format({'bg_color': '#C6EFCE', 'font_color': '#006100'})
-                        formato_media = workbook.add_format({'bg_color': '#FFEB9C', 'font_color': '#9C6500'})
-                        formato_baixa = workbook.add_format({'bg_color': '#FFC7CE', 'font_color': '#9C0006'})
-                        
-                        # Encontrar o índice da coluna 'confianca'
-                        conf_idx = df_cruzado.columns.get_loc("confianca")
-                        
-                        # Aplicar formatação condicional
-                        worksheet.conditional_format(1, conf_idx, len(df_cruzado) + 1, conf_idx, {
-                            'type': 'cell',
-                            'criteria': 'equal to',
-                            'value': '"alta"',
-                            'format': formato_alta
-                        })
-                        
-                        worksheet.conditional_format(1, conf_idx, len(df_cruzado) + 1, conf_idx, {
-                            'type': 'cell',
-                            'criteria': 'equal to',
-                            'value': '"média"',
-                            'format': formato_media
-                        })
-                        
-                        worksheet.conditional_format(1, conf_idx, len(df_cruzado) + 1, conf_idx, {
-                            'type': 'cell',
-                            'criteria': 'equal to',
-                            'value': '"baixa"',
-                            'format': formato_baixa
-                        })
-                    
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        if st.download_button(
-                            "📊 Baixar Planilha de Cruzamentos (XLSX)",
-                            data=output_cruzamentos.getvalue(),
-                            file_name="cruzamentos_telematicos.xlsx",
-                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                            use_container_width=True
-                        ):
-                            st.session_state.clear()
-                            st.success("Dados limpos com sucesso. Reiniciando sistema...")
-                            time.sleep(1)
-                            st.rerun()
-                    
-                    # 2. Download de todos os registros extraídos
-                    output_todos = io.BytesIO()
-                    with pd.ExcelWriter(output_todos, engine='xlsxwriter') as writer:
-                        df_todos.to_excel(writer, index=False, sheet_name="Todos os Registros")
-                        
-                        # Configuração similar para a planilha de todos os registros
-                        workbook = writer.book
-                        worksheet = writer.sheets["Todos os Registros"]
-                        
-                        # Formatos para diferentes níveis de confiança
-                        formato_alta = workbook.add_format({'bg_color': '#C6EFCE', 'font_color': '#006100'})
-                        formato_media = workbook.add_format({'bg_color': '#FFEB9C', 'font_color': '#9C6500'})
-                        formato_baixa = workbook.add_format({'bg_color': '#FFC7CE', 'font_color': '#9C0006'})
-                        
-                        # Encontrar o índice da coluna 'confianca'
-                        conf_idx = df_todos.columns.get_loc("confianca")
-                        
-                        # Aplicar formatação condicional
-                        worksheet.conditional_format(1, conf_idx, len(df_todos) + 1, conf_idx, {
-                            'type': 'cell',
-                            'criteria': 'equal to',
-                            'value': '"alta"',
-                            'format': formato_alta
-                        })
-                        
-                        worksheet.conditional_format(1, conf_idx, len(df_todos) + 1, conf_idx, {
-                            'type': 'cell',
-                            'criteria': 'equal to',
-                            'value': '"média"',
-                            'format': formato_media
-                        })
-                        
-                        worksheet.conditional_format(1, conf_idx, len(df_todos) + 1, conf_idx, {
-                            'type': 'cell',
-                            'criteria': 'equal to',
-                            'value': '"baixa"',
-                            'format': formato_baixa
-                        })
-                    
-                    with col2:
-                        if st.download_button(
-                            "📄 Baixar Todos os Registros Extraídos (XLSX)",
-                            data=output_todos.getvalue(),
-                            file_name="todos_registros_extraidos.xlsx",
-                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                            use_container_width=True
-                        ):
-                            st.session_state.clear()
-                            st.success("Dados limpos com sucesso. Reiniciando sistema...")
-                            time.sleep(1)
-                            st.rerun()
-                        
-                        # Informação para o usuário
-                        st.info("**Sessão Segura**: Ao realizar o download, todos os dados serão permanentemente apagados do servidor.")
-
-            progress.progress(1.0)
-
-            if erros:
-                with st.expander("⚠️ Arquivos com Erro de Leitura"):
-                    for err in erros:
-                        st.error(err)
+    # O processamento roda num trabalho em segundo plano: interações com a página não o interrompem
+    if st.button("Processar e Cruzar Dados", type="primary", use_container_width=True,
+                 disabled=trabalho_atual is not None):
+        apagar_registros_streaming()
+        for chave in CHAVES_RESULTADO:
+            st.session_state[chave] = None
+        trabalho_atual = gerenciador.submeter(
+            executar_analise, descricao=f"{analysis_type} ({len(st.session_state.uploaded_files)} arquivos)",
+            arquivos=dict(st.session_state.uploaded_files), dialetos=dict(st.session_state.dialetos),
+            abas=dict(st.session_state.abas), analysis_type=analysis_type, tipos=data_types_to_process,
+            strict=strict_mode, niveis_confianca=niveis_confianca, modo_streaming=modo_streaming,
+            cruzar_por_sufixo=cruzar_por_sufixo, colocalizacao=identificador_colocalizacao,
+            janela_minutos=int(janela_minutos), montar_grafo=montar_grafo, vinculos_linha=vinculos_linha,
+            workers=int(workers), caminho_base_caso=caminho_base_caso,
+            motor_perfil=None if motor_perfil == "Desligado" else motor_perfil,
+            cache_arquivos=st.session_state.cache_arquivos, listas_alvos=listas_alvos,
+        )
+        st.session_state.trabalho = trabalho_atual.id
 
 elif analysis_type == "-- Selecione --":
-    st.warning("Selecione o tipo de análise para começar.")
\ No newline at end of file
+    st.warning("Selecione o tipo de análise para começar.")
+
+# --- Status do Processamento ---
+
+@st.fragment(run_every=INTERVALO_ATUALIZACAO)
+def acompanhar_trabalho():
+    """Progresso do trabalho da sessão, atualizado sozinho; ao terminar, a página inteira é refeita com os resultados."""
+    trabalho = gerenciador.obter(st.session_state.get("trabalho"))
+    if trabalho is None or trabalho.encerrado:
+        st.rerun()
+    st.subheader("Status:")
+    posicao = gerenciador.posicao_na_fila(trabalho)
+    if posicao:
+        executando = gerenciador.contagem().get(EXECUTANDO, 0)
+        st.info(f"Aguardando na fila (posição {posicao}): {executando} de {gerenciador.simultaneos} "
+                "processamentos simultâneos do servidor em andamento.")
+    st.progress(trabalho.progresso, text=trabalho.mensagem)
+    st.caption(f"{trabalho.segundos():.0f} s em execução · o processamento continua no servidor enquanto a página é usada.")
+    if st.button("Cancelar Processamento", type="secondary", disabled=trabalho.cancelamento_pedido):
+        trabalho.cancelar()
+    if trabalho.cancelamento_pedido:
+        st.caption("Cancelamento pedido: o processamento para no próximo bloco ou arquivo.")
+
+
+if trabalho_atual is not None:
+    acompanhar_trabalho()
+
+# --- Última Execução ---
+
+if st.session_state.execucao is not None:
+    execucao = st.session_state.execucao
+    if execucao.get("resumo"):
+        st.text(execucao["resumo"])
+    if execucao.get("mapeamentos"):
+        # Colunas escolhidas para cada tipo (nome e amostra do conteúdo), com as pontuações
+        with st.expander("🧭 Mapeamento de Colunas por Arquivo"):
+            for fonte, mapeamento in execucao["mapeamentos"]:
+                escolhidas = mapeamento[mapeamento["selecionada"]].groupby("tipo", sort=False)["coluna"].agg(", ".join)
+                st.markdown(f"**{fonte}**: " + ("; ".join(
+                    f"{tipo.upper()} → {escolhidas.get(tipo, 'nenhuma coluna')}" for tipo in execucao["tipos"])))
+                st.dataframe(mapeamento.pivot(index="coluna", columns="tipo", values="pontuacao")
+                             .reindex(index=pd.unique(mapeamento["coluna"]), columns=execucao["tipos"]),
+                             use_container_width=True)
+    for nivel, texto in execucao.get("mensagens", []):
+        getattr(st, nivel)(texto)
+
+    caso = execucao.get("caso")
+    if caso is not None:
+        st.subheader("Cruzamentos com a Base do Caso")
+        st.caption(f"{caso['novos']} arquivos incluídos no caso, {caso['ja_no_caso']} já estavam na base "
+                   f"({caso['total']} arquivos no caso).")
+        if caso["cruzamentos"].empty:
+            st.info("Nenhum cruzamento novo com a base do caso.")
+        else:
+            st.dataframe(caso["cruzamentos"], use_container_width=True)
+
+    if execucao.get("erros"):
+        with st.expander("⚠️ Arquivos com Erro de Leitura"):
+            for err in execucao["erros"]:
+                st.error(err)
+
+# --- Desempenho ---
+
+if st.session_state.desempenho is not None:
+    desempenho = st.session_state.desempenho
+    with st.expander("⏱️ Desempenho da Última Execução"):
+        st.caption(f"Tempo total: {desempenho['segundos']:.1f} s"
+                   + (f" · memória do servidor (RSS) ao final: {desempenho['rss_mib']:.0f} MiB"
+                      f" ({desempenho['aumento_rss_mib']:+.0f} MiB na execução)" if desempenho["rss_mib"] else "")
+                   + " · linhas \"(execução)\" medidas no processo principal; as demais, por arquivo e etapa.")
+        st.dataframe(desempenho["tabela"], use_container_width=True, hide_index=True)
+        if desempenho["perfil"]:
+            st.code(desempenho["perfil"], language=None)
+
+# --- Resultados ---
+
+# Função para formatação de confiança (aplicada apenas à página exibida)
+def format_confidence(df):
+    return df.style.apply(
+        lambda x: [
+            'background-color: rgba(0, 255, 0, 0.1)' if v == 'alta' else 
+            'background-color: rgba(255, 165, 0, 0.1)' if v == 'média' else 
+            'background-color: rgba(255, 0, 0, 0.1)' if v == 'baixa' else 
+            'background-color: rgba(128, 0, 255, 0.1)' if v == 'sufixo' else 
+            '' for v in x
+        ], 
+        subset=['confianca']
+    )
+
+if st.session_state.resultados is not None:
+    visualizador = st.session_state.resultados["cruzamentos"]
+    st.success(f"Foram encontrados {len(visualizador)} elementos cruzados entre blocos.")
+
+    # Exibir apenas a página atual dos cruzamentos; filtros, busca e ordenação ficam no servidor
+    st.subheader("Cruzamentos Identificados")
+    col_tipo, col_conf, col_arq = st.columns(3)
+    filtros = {
+        "tipos": col_tipo.multiselect("Tipo", sorted(visualizador.df["tipo"].unique())),
+        "confiancas": col_conf.multiselect("Confiança", list(CONFIANCA_ORDENADA.categories[::-1])),
+        "arquivo": col_arq.selectbox("Arquivo", [None] + visualizador.arquivos, format_func=lambda a: "Todos" if a is None else a),
+    }
+    col_busca, col_min, col_ordem, col_sentido = st.columns([3, 1, 1, 1])
+    filtros["busca"] = col_busca.text_input("Buscar no valor", help="Trecho do valor normalizado (ex: final do número).")
+    filtros["min_ocorrencias"] = col_min.number_input("Mín. ocorrências", min_value=1, value=1)
+    ordenar_por = col_ordem.selectbox("Ordenar por", VisualizadorCruzamentos.COLUNAS_ORDENAVEIS)
+    crescente = col_sentido.selectbox("Sentido", ["Decrescente", "Crescente"]) == "Crescente"
+    if COLUNA_ALVOS in visualizador.df:
+        filtros["so_alvos"] = st.checkbox("Somente valores que constam nas listas de alvos")
+
+    total_filtrado = int(visualizador.filtrar(**filtros).sum())
+    col_tamanho, col_pagina = st.columns([1, 5])
+    tamanho_pagina = col_tamanho.selectbox("Linhas por página", [50, 100, 500], index=1)
+    total_paginas = max(1, -(-total_filtrado // tamanho_pagina))
+    numero_pagina = col_pagina.number_input(f"Página (de {total_paginas})", min_value=1, max_value=total_paginas, value=1)
+    df_pagina, total_filtrado = visualizador.pagina(numero_pagina, tamanho_pagina, ordenar_por, crescente, **filtros)
+    st.dataframe(format_confidence(df_pagina), use_container_width=True)
+    st.caption(f"{total_filtrado} cruzamentos após os filtros · exibindo {len(df_pagina)} nesta página.")
+
+    # Criar botões de download separados
+    st.subheader("Downloads Disponíveis")
+    
+    # Relatórios gerados só quando o download é pedido (callable executado no clique)
+    extensao, mime_relatorio = FORMATOS_EXPORTACAO[formato_relatorios]
+    col1, col2 = st.columns(2)
+    
+    # 1. Download da planilha com os cruzamentos
+    with col1:
+        st.download_button(
+            f"📊 Baixar Planilha de Cruzamentos ({formato_relatorios})",
+            data=lambda df=visualizador.df, formato=formato_relatorios: exportar(formato, [df], "Cruzamentos"),
+            file_name=f"cruzamentos_telematicos{extensao}",
+            mime=mime_relatorio,
+            use_container_width=True,
+            on_click=limpar_sessao
+        )
+    
+    # 2. Download de todos os registros extraídos
+    if st.session_state.resultados["registros_streaming"] is not None:
+        # Aberto do disco só no clique; o arquivo é apagado quando os resultados são descartados
+        dados_todos = st.session_state.resultados["registros_streaming"].abrir
+        rotulo_todos, nome_todos, mime_todos = "📄 Baixar Todos os Registros Extraídos (CSV.GZ)", "todos_registros_extraidos.csv.gz", "application/gzip"
+    else:
+        # Registros convertidos bloco a bloco a partir do armazenamento colunar, sem montar df_todos
+        # Com listas de alvos, cada bloco ganha a coluna das listas em que o valor consta
+        listas_resultado = st.session_state.resultados.get("listas_alvos")
+        dados_todos = lambda armazem=st.session_state.resultados["registros"], formato=formato_relatorios, listas=listas_resultado: exportar(
+            formato, anotar_blocos(listas, armazem.blocos()) if listas else armazem.blocos(), "Todos os Registros",
+            colunas=COLUNAS_REGISTRO + [COLUNA_ALVOS] if listas else COLUNAS_REGISTRO)
+        rotulo_todos = f"📄 Baixar Todos os Registros Extraídos ({formato_relatorios})"
+        nome_todos, mime_todos = f"todos_registros_extraidos{extensao}", mime_relatorio
+    
+    with col2:
+        st.download_button(
+            rotulo_todos,
+            data=dados_todos,
+            file_name=nome_todos,
+            mime=mime_todos,
+            use_container_width=True,
+            on_click=limpar_sessao
+        )
+        
+        # Informação para o usuário
+        st.info("**Sessão Segura**: Ao realizar o download, todos os dados serão permanentemente apagados do servidor.")
+
+# --- Consulta aos Resultados ---
+
+if st.session_state.indice is not None:
+    indice = st.session_state.indice
+    LIMITE_CONSULTA = 1000  # linhas exibidas por consulta
+    st.subheader("Consultar Resultados")
+    st.caption(f"Índice da última execução: {len(indice)} valores distintos em {len(indice.arquivos)} arquivos.")
+
+    busca = st.text_input("Buscar valor (telefone, IMEI, e-mail, hash...)", help="O valor é normalizado como na extração.")
+    if busca:
+        df_busca = indice.consultar(busca)
+        if df_busca.empty:
+            st.info("Valor não encontrado em nenhum arquivo.")
+        else:
+            st.dataframe(df_busca, use_container_width=True)
+
+    selecionados = st.multiselect("Valores em comum entre os arquivos", indice.arquivos)
+    if selecionados:
+        df_comuns = indice.compartilhados(selecionados, limite=LIMITE_CONSULTA)
+        st.caption(f"Exibindo até {LIMITE_CONSULTA} valores.")
+        st.dataframe(df_comuns, use_container_width=True)
+
+    if len(indice.arquivos) > 1:
+        minimo = st.number_input("Valores presentes em pelo menos k arquivos", min_value=2, max_value=len(indice.arquivos), value=2)
+        df_minimo = indice.em_pelo_menos(minimo, limite=LIMITE_CONSULTA)
+        st.caption(f"Exibindo até {LIMITE_CONSULTA} valores, dos mais espalhados para os menos.")
+        st.dataframe(df_minimo, use_container_width=True)
+# --- Sobreposição entre Arquivos ---
+
+if st.session_state.indice is not None and len(st.session_state.indice.arquivos) > 1:
+    indice = st.session_state.indice
+    MAX_ARQUIVOS_MAPA = 50  # arquivos no mapa de calor (a planilha exportada traz todos)
+    st.subheader("Sobreposição entre Arquivos")
+    col_tipo_mapa, col_medida = st.columns(2)
+    tipo_mapa = col_tipo_mapa.selectbox("Tipo de dado", [None] + indice.tipos_presentes,
+                                        format_func=lambda t: "Todos" if t is None else t.upper())
+    medida = col_medida.radio("Medida", ["Valores em comum", "Jaccard"], horizontal=True)
+    compartilhados, jaccard = indice.sobreposicao(tipo_mapa)
+    matriz = compartilhados if medida == "Valores em comum" else jaccard
+
+    # Com muitos arquivos, o mapa mostra os que mais compartilham valores com os demais
+    relevancia = compartilhados.sum() - pd.Series(compartilhados.to_numpy().diagonal(), index=compartilhados.index)
+    principais = set(relevancia.nlargest(MAX_ARQUIVOS_MAPA).index)
+    nomes_mapa = [nome for nome in matriz.index if nome in principais]
+    if len(matriz) > MAX_ARQUIVOS_MAPA:
+        st.caption(f"Mapa com os {MAX_ARQUIVOS_MAPA} arquivos com mais valores em comum (de {len(matriz)}).")
+    dados_mapa = (matriz.loc[nomes_mapa, nomes_mapa].rename_axis("arquivo_a").reset_index()
+                  .melt(id_vars="arquivo_a", var_name="arquivo_b", value_name=medida))
+    st.altair_chart(alt.Chart(dados_mapa).mark_rect().encode(
+        x=alt.X("arquivo_b:N", sort=nomes_mapa, title=None),
+        y=alt.Y("arquivo_a:N", sort=nomes_mapa, title=None),
+        color=alt.Color(f"{medida}:Q", scale=alt.Scale(scheme="reds")),
+        tooltip=["arquivo_a", "arquivo_b", f"{medida}:Q"],
+    ), use_container_width=True)
+
+    st.caption("Pares de arquivos com mais valores em comum")
+    st.dataframe(indice.pares_sobrepostos(tipo_mapa), use_container_width=True, hide_index=True)
+
+    def _planilha_sobreposicao(indice=indice):
+        matrizes = {}
+        for tipo in [None] + indice.tipos_presentes:
+            rotulo = "Todos" if tipo is None else tipo
+            matrizes[f"Compartilhados - {rotulo}"], matrizes[f"Jaccard - {rotulo}"] = indice.sobreposicao(tipo)
+        return exportar_matrizes(matrizes)
+
+    st.download_button(
+        "🗺️ Baixar Matrizes de Sobreposição (XLSX)",
+        data=_planilha_sobreposicao,
+        file_name="sobreposicao_arquivos.xlsx",
+        mime=FORMATOS_EXPORTACAO["XLSX"][1],
+        use_container_width=True,
+        on_click=limpar_sessao
+    )
+
+# --- Co-localização Temporal ---
+
+if st.session_state.colocalizacoes is not None:
+    colocalizacoes = st.session_state.colocalizacoes
+    st.subheader("Co-localização Temporal")
+    st.caption(f"Pares de {colocalizacoes['identificador'].upper()} de arquivos diferentes na mesma ERB com até "
+               f"{colocalizacoes['janela_minutos']} minutos de diferença, do maior para o menor número de coocorrências.")
+    if colocalizacoes["sem_eventos"]:
+        st.caption("Sem colunas de ERB e data/hora reconhecidas: " + ", ".join(colocalizacoes["sem_eventos"]))
+    pares = colocalizacoes["pares"]
+    if pares.empty:
+        st.info("Nenhuma co-localização encontrada na janela escolhida.")
+    else:
+        st.dataframe(pares.head(1000), use_container_width=True, hide_index=True)
+        if len(pares) > 1000:
+            st.caption(f"Exibindo os 1000 pares mais frequentes de {len(pares)}; a planilha traz todos.")
+        extensao, mime_relatorio = FORMATOS_EXPORTACAO[formato_relatorios]
+        st.download_button(
+            f"📍 Baixar Co-localizações ({formato_relatorios})",
+            data=lambda df=pares, formato=formato_relatorios: exportar(formato, [df], "Colocalizacoes"),
+            file_name=f"colocalizacoes{extensao}",
+            mime=mime_relatorio,
+            use_container_width=True,
+            on_click=limpar_sessao
+        )
+
+# --- Grafo de Vínculos ---
+
+if st.session_state.grafo is not None:
+    grafo = st.session_state.grafo
+    MAX_CLUSTERS_TABELA = 1000
+    st.subheader("Grafo de Vínculos")
+    modos = {"Arquivos e mesma linha": True, "Só valores da mesma linha": False}
+    usar_arquivos = modos[st.radio(
+        "Ligações entre valores", list(modos), horizontal=True,
+        help="Com os arquivos, dois valores ficam no mesmo cluster se aparecem num mesmo arquivo conectado; "
+             "só pela mesma linha, os clusters seguem apenas os registros (ex: telefone A - IMEI X - telefone B)."
+    )]
+    clusters = grafo.clusters(usar_arquivos)
+    if clusters.empty:
+        st.info("Nenhum vínculo encontrado entre valores com essas ligações.")
+    else:
+        st.caption(f"{len(clusters)} clusters, do maior para o menor (em empate, o de maior confiança)."
+                   + (f" Exibindo os {MAX_CLUSTERS_TABELA} primeiros." if len(clusters) > MAX_CLUSTERS_TABELA else ""))
+        st.dataframe(clusters.head(MAX_CLUSTERS_TABELA), use_container_width=True, hide_index=True)
+
+        cluster_escolhido = st.number_input("Detalhar o cluster", min_value=1, max_value=len(clusters), step=1)
+        col_nos, col_arestas = st.columns(2)
+        col_nos.dataframe(grafo.nos(usar_arquivos, [cluster_escolhido]), use_container_width=True, hide_index=True)
+        col_arestas.dataframe(grafo.arestas(usar_arquivos, [cluster_escolhido]), use_container_width=True, hide_index=True)
+
+        extensao, mime_relatorio = FORMATOS_EXPORTACAO[formato_relatorios]
+        col_lista, col_graphml = st.columns(2)
+        with col_lista:
+            st.download_button(
+                f"🕸️ Baixar Lista de Arestas ({formato_relatorios})",
+                data=lambda grafo=grafo, modo=usar_arquivos, formato=formato_relatorios: exportar(
+                    formato, [grafo.arestas(modo)], "Arestas"),
+                file_name=f"grafo_arestas{extensao}",
+                mime=mime_relatorio,
+                use_container_width=True,
+                on_click=limpar_sessao
+            )
+        with col_graphml:
+            st.download_button(
+                "🕸️ Baixar Grafo (GraphML)",
+                data=lambda grafo=grafo, modo=usar_arquivos: exportar_graphml(grafo.nos(modo), grafo.arestas(modo)),
+                file_name="grafo_vinculos.graphml",
+                mime="application/graphml+xml",
+                use_container_width=True,
+                on_click=limpar_sessao
+            )
@@ -0,0 +1,400 @@
+# benchmark.py
+#
+# Benchmark do pipeline com dados sintéticos reprodutíveis (semente fixa).
+#
+# Uso:
+#   python benchmark.py                                   # escalas padrão, grava benchmark.json
+#   python benchmark.py --escalas 10000 100000 1000000 --saida depois.json --comparar antes.json
+#   python benchmark.py --escalas 5000 --gerar-em dados_sinteticos   # só grava os arquivos gerados
+
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+from cruzamento import AcumuladorCruzamentos, detectar_cruzamentos
+from exportacao import exportar
+from leitura import ler_planilha_em_blocos
+from normalizacao import (ANALYSIS_TYPE_MAPPING, COLUNA_MAP_HEURISTICO, COLUNAS_REGISTRO, CacheNormalizacao,
+                          classificar_colunas, extrair_registros)
+from registros import ArmazemRegistros
+
+# --- Gerador de Dados Sintéticos ---
+
+ANALISE_ERB = "Extratos de ERBs"
+ANALISE_GOOGLE = "Dados de Contas Online (Google Location)"
+
+DDDS = np.array([11, 21, 27, 31, 41, 48, 51, 61, 62, 71, 79, 81, 82, 83, 84, 85, 91, 92, 98])
+
+# Variantes de escrita de um celular e suas probabilidades (13, 11 e 10 dígitos, Excel, formatado)
+VARIANTES_TELEFONE = {
+    "13_digitos": 0.30,      # 5581991234567
+    "11_digitos": 0.25,      # 81991234567
+    "10_digitos": 0.10,      # 8191234567 (sem o 9º dígito)
+    "float_excel": 0.15,     # 5581991234567.0
+    "cientifica": 0.05,      # 5.581991234567E+12
+    "formatado": 0.10,       # (81) 99123-4567
+    "internacional": 0.05,   # +55 81 99123-4567
+}
+VARIANTES_IMEI = {"15_digitos": 0.75, "float_excel": 0.10, "cientifica": 0.05, "14_digitos": 0.10}
+
+# Linhas de preâmbulo antes do cabeçalho, como nos extratos das operadoras
+PREAMBULO_ERB = [
+    ["RELATÓRIO DE CHAMADAS - EXTRATO DE ERB"],
+    ["Operadora: OPERADORA SINTÉTICA S.A.", "", "Ofício nº 0000/2024"],
+    ["Período: 01/01/2024 a 31/03/2024"],
+    [],
+]
+PREAMBULO_GOOGLE = [["Google LLC - Location History (dados sintéticos)"], []]
+
+
+def _texto_digitos(numeros):
+    return pd.Series(numeros).astype(str).to_numpy(dtype=object)
+
+
+def _gerar_celulares(rng, quantidade):
+    """Celulares nacionais com 11 dígitos (DDD + 9 + assinante iniciado em 6-9)."""
+    ddd = rng.choice(DDDS, quantidade)
+    assinante = rng.integers(6, 10, quantidade) * 10_000_000 + rng.integers(0, 10_000_000, quantidade)
+    return ddd * 1_000_000_000 + 900_000_000 + assinante
+
+
+def _variantes_telefone(celulares):
+    """Matriz (variante, celular) com cada forma de escrita de cada número."""
+    nacional = _texto_digitos(celulares)
+    completo = _texto_digitos(5_500_000_000_000 + celulares)
+    ddd = np.array([n[:2] for n in nacional], dtype=object)
+    parte1 = np.array([n[2:7] for n in nacional], dtype=object)
+    parte2 = np.array([n[7:] for n in nacional], dtype=object)
+    formas = {
+        "13_digitos": completo,
+        "11_digitos": nacional,
+        "10_digitos": ddd + np.array([n[3:] for n in nacional], dtype=object),
+        "float_excel": completo + ".0",
+        "cientifica": np.array([f"{c[0]}.{c[1:]}E+12" for c in completo], dtype=object),
+        "formatado": "(" + ddd + ") " + parte1 + "-" + parte2,
+        "internacional": "+55 " + ddd + " " + parte1 + "-" + parte2,
+    }
+    return np.stack([formas[v] for v in VARIANTES_TELEFONE])
+
+
+def _variantes_imei(imeis):
+    texto = _texto_digitos(imeis)
+    formas = {
+        "15_digitos": texto,
+        "float_excel": texto + ".0",
+        "cientifica": np.array([f"{t[0]}.{t[1:]}E+14" for t in texto], dtype=object),
+        "14_digitos": np.array([t[:14] for t in texto], dtype=object),
+    }
+    return np.stack([formas[v] for v in VARIANTES_IMEI])
+
+
+def _sortear(rng, matriz, probabilidades, linhas):
+    """Escolhe, para cada linha, um item do conjunto e uma das suas variantes de escrita."""
+    itens = rng.integers(0, matriz.shape[1], linhas)
+    variantes = rng.choice(len(probabilidades), linhas, p=list(probabilidades.values()))
+    return matriz[variantes, itens]
+
+
+def _conjuntos(rng, gerar, tamanho, arquivos, sobreposicao):
+    """Um conjunto de valores por arquivo, com uma fração `sobreposicao` comum a todos."""
+    comuns = gerar(rng, int(tamanho * sobreposicao))
+    return [np.concatenate([comuns, gerar(rng, tamanho - len(comuns))]) for _ in range(arquivos)]
+
+
+def _datas(rng, linhas):
+    segundos = rng.integers(0, 90 * 86_400, linhas)
+    return (pd.Timestamp("2024-01-01") + pd.to_timedelta(segundos, unit="s")).strftime("%d/%m/%Y %H:%M:%S").to_numpy(dtype=object)
+
+
+def gerar_extrato_erb(rng, linhas, celulares, imeis):
+    """DataFrame de um extrato de ERB: números em formas variadas e IMEIs repetidos."""
+    return pd.DataFrame({
+        "Data/Hora": _datas(rng, linhas),
+        "MSISDN Origem": _sortear(rng, _variantes_telefone(celulares), VARIANTES_TELEFONE, linhas),
+        "MSISDN Destino": _sortear(rng, _variantes_telefone(celulares), VARIANTES_TELEFONE, linhas),
+        "IMEI": _sortear(rng, _variantes_imei(imeis), VARIANTES_IMEI, linhas),
+        "ERB": _texto_digitos(rng.integers(10_000, 99_999, linhas)),
+        "Azimute": _texto_digitos(rng.integers(0, 360, linhas)),
+        "Duração (s)": _texto_digitos(rng.integers(0, 1_800, linhas)),
+    })
+
+
+def _gerar_imeis(rng, quantidade):
+    return 350_000_000_000_000 + rng.integers(0, 10 ** 13, quantidade)
+
+
+def _gerar_ids(rng, quantidade):
+    alfabeto = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"))
+    return np.array(["".join(l) for l in alfabeto[rng.integers(0, len(alfabeto), (quantidade, 21))]], dtype=object)
+
+
+def _gerar_emails(rng, quantidade):
+    dominios = np.array(["gmail.com", "hotmail.com", "yahoo.com.br", "outlook.com"], dtype=object)
+    return "usuario" + _texto_digitos(rng.integers(0, 10 ** 9, quantidade)) + "@" + rng.choice(dominios, quantidade)
+
+
+def _gerar_hashes(rng, quantidade):
+    return np.array([rng.bytes(32).hex() for _ in range(quantidade)], dtype=object)
+
+
+def gerar_exportacao_google(rng, linhas, ids, emails, hashes):
+    """DataFrame de uma exportação do Google Location: IDs, e-mails (com maiúsculas e +tag) e hashes."""
+    emails_linha = emails[rng.integers(0, len(emails), linhas)]
+    variante = rng.random(linhas)
+    emails_linha = np.where(variante < 0.1, np.char.upper(emails_linha.astype(str)).astype(object), emails_linha)
+    emails_linha = np.where(variante > 0.95, [e.replace("@", "+google@") for e in emails_linha], emails_linha)
+    return pd.DataFrame({
+        "Timestamp": _datas(rng, linhas),
+        "Latitude": np.round(rng.uniform(-33.7, 5.2, linhas), 6).astype(str).astype(object),
+        "Longitude": np.round(rng.uniform(-73.9, -34.8, linhas), 6).astype(str).astype(object),
+        "Accuracy": _texto_digitos(rng.integers(3, 2_000, linhas)),
+        "Location ID": ids[rng.integers(0, len(ids), linhas)],
+        "Conta Google": emails_linha,
+        "Hash SHA256": hashes[rng.integers(0, len(hashes), linhas)],
+    })
+
+
+def _bytes_csv(df, preambulo, delimitador, codificacao):
+    saida = io.StringIO()
+    for linha in preambulo:
+        saida.write(delimitador.join(linha) + "\n")
+    df.to_csv(saida, sep=delimitador, index=False)
+    return saida.getvalue().encode(codificacao)
+
+
+def _bytes_xlsx(df, preambulo):
+    """XLSX com preâmbulo; células só com dígitos viram números, como o Excel faz ao abrir um CSV."""
+    saida = io.BytesIO()
+    pasta = xlsxwriter.Workbook(saida, {"constant_memory": True})
+    # Data de criação fixa: a mesma semente gera os mesmos bytes
+    pasta.set_properties({"created": datetime(2024, 1, 1)})
+    aba = pasta.add_worksheet("Extrato")
+    for i, linha in enumerate(preambulo):
+        aba.write_row(i, 0, linha)
+    aba.write_row(len(preambulo), 0, list(df.columns))
+    for i, valores in enumerate(df.itertuples(index=False, name=None), start=len(preambulo) + 1):
+        aba.write_row(i, 0, [float(v) if v.isdigit() else v for v in valores])
+    pasta.close()
+    return saida.getvalue()
+
+
+# Formato de cada arquivo do cenário, em rodízio: CSV ';' UTF-8, CSV ',' CP1252 e XLSX
+FORMATOS_ARQUIVO = [("csv", ";", "utf-8"), ("csv", ",", "cp1252"), ("xlsx", None, None)]
+
+
+def gerar_cenario(analise, linhas, arquivos=3, sobreposicao=0.2, semente=42):
+    """
+    Gera `arquivos` extratos sintéticos de `linhas` linhas cada (lista de (nome, bytes)).
+    Uma fração `sobreposicao` dos números/IMEIs (ou IDs/e-mails/hashes) é comum a todos os
+    arquivos; o restante é exclusivo de cada um. A mesma semente gera os mesmos bytes.
+    """
+    rng = np.random.default_rng(semente)
+    tamanho = max(linhas // 10, 10)  # cada valor aparece ~10 vezes por arquivo
+    if analise == ANALISE_ERB:
+        celulares = _conjuntos(rng, _gerar_celulares, tamanho, arquivos, sobreposicao)
+        imeis = _conjuntos(rng, _gerar_imeis, max(tamanho // 5, 2), arquivos, sobreposicao)
+        dfs = [gerar_extrato_erb(rng, linhas, c, i) for c, i in zip(celulares, imeis)]
+        preambulo, prefixo = PREAMBULO_ERB, "extrato_erb"
+    elif analise == ANALISE_GOOGLE:
+        ids = _conjuntos(rng, _gerar_ids, tamanho, arquivos, sobreposicao)
+        emails = _conjuntos(rng, _gerar_emails, max(tamanho // 5, 2), arquivos, sobreposicao)
+        hashes = _conjuntos(rng, _gerar_hashes, max(tamanho // 5, 2), arquivos, sobreposicao)
+        dfs = [gerar_exportacao_google(rng, linhas, *valores) for valores in zip(ids, emails, hashes)]
+        preambulo, prefixo = PREAMBULO_GOOGLE, "google_location"
+    else:
+        raise ValueError(f"Tipo de análise desconhecido: {analise}")
+
+    cenario = []
+    for n, df in enumerate(dfs, start=1):
+        formato, delimitador, codificacao = FORMATOS_ARQUIVO[(n - 1) % len(FORMATOS_ARQUIVO)]
+        if formato == "csv":
+            dados = _bytes_csv(df, preambulo, delimitador, codificacao)
+        else:
+            dados = _bytes_xlsx(df, preambulo)
+        cenario.append((f"{prefixo}_{n}.{formato}", dados))
+    return cenario
+
+
+# --- Medição por Etapa ---
+
+ETAPAS = ["cabecalho", "leitura", "normalizacao", "cruzamento", "exportacao"]
+
+
+def medir(funcao, memoria=True):
+    """
+    Executa `funcao` e devolve (resultado, segundos, pico de memória em MiB). O pico vem de uma
+    segunda execução com tracemalloc, para que o rastreamento não distorça o tempo medido.
+    """
+    inicio = time.perf_counter()
+    resultado = funcao()
+    segundos = time.perf_counter() - inicio
+    pico = None
+    if memoria:
+        tracemalloc.start()
+        try:
+            funcao()
+            pico = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        finally:
+            tracemalloc.stop()
+    return resultado, segundos, pico
+
+
+def executar_cenario(analise, cenario, memoria=True):
+    """Mede cada etapa do pipeline sobre um cenário gerado e devolve uma linha por etapa."""
+    tipos, map_primario = ANALYSIS_TYPE_MAPPING[analise], COLUNA_MAP_HEURISTICO[analise]
+
+    def _cabecalho():
+        # Detecção de dialeto e cabeçalho: custo de entregar o primeiro bloco de uma linha
+        return [len(next(ler_planilha_em_blocos(io.BytesIO(dados), nome, tamanho_bloco=1)).columns)
+                for nome, dados in cenario]
+
+    def _leitura():
+        return [(nome, list(ler_planilha_em_blocos(io.BytesIO(dados), nome))) for nome, dados in cenario]
+
+    _, *medidas_cabecalho = medir(_cabecalho, memoria)
+    lidos, *medidas_leitura = medir(_leitura, memoria)
+
+    def _normalizacao():
+        acumulador, armazem = AcumuladorCruzamentos(), ArmazemRegistros()
+        for nome, blocos in lidos:
+            cache, colunas_por_tipo = CacheNormalizacao(), None
+            for df in blocos:
+                df = df.fillna("")
+                df.columns = [str(col).strip().lower() for col in df.columns]
+                if colunas_por_tipo is None:
+                    colunas_por_tipo, _ = classificar_colunas(df, tipos, map_primario)
+                registros = extrair_registros(df, nome, colunas_por_tipo, cache)
+                acumulador.adicionar(registros)
+                armazem.adicionar(registros)
+        return acumulador.estado(), armazem
+
+    (estado, armazem), *medidas_normalizacao = medir(_normalizacao, memoria)
+    df_cruzado, *medidas_cruzamento = medir(lambda: detectar_cruzamentos(estado), memoria)
+
+    def _exportacao():
+        # Os dois relatórios oferecidos na interface, no formato padrão (XLSX)
+        return (len(exportar("XLSX", [df_cruzado], "Cruzamentos"))
+                + len(exportar("XLSX", armazem.blocos(), "Todos os Registros", colunas=COLUNAS_REGISTRO)))
+
+    tamanho_relatorios, *medidas_exportacao = medir(_exportacao, memoria)
+
+    itens = {
+        "cabecalho": len(cenario),
+        "leitura": sum(len(df) for _, blocos in lidos for df in blocos),
+        "normalizacao": armazem.registros,
+        "cruzamento": len(df_cruzado),
+        "exportacao": tamanho_relatorios,
+    }
+    medidas = [medidas_cabecalho, medidas_leitura, medidas_normalizacao, medidas_cruzamento, medidas_exportacao]
+    return [
+        {"etapa": etapa, "segundos": round(segundos, 4),
+         "pico_memoria_mib": None if pico is None else round(pico, 2), "itens": itens[etapa]}
+        for etapa, (segundos, pico) in zip(ETAPAS, medidas)
+    ]
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def executar_benchmark(escalas, analises=(ANALISE_ERB, ANALISE_GOOGLE), arquivos=3, sobreposicao=0.2,
+                       semente=42, memoria=True, ao_medir=None):
+    """Gera e mede cada (análise, escala); devolve o dicionário gravado no JSON de resultados."""
+    resultados = []
+    for analise in analises:
+        for linhas in escalas:
+            cenario = gerar_cenario(analise, linhas, arquivos, sobreposicao, semente)
+            for linha in executar_cenario(analise, cenario, memoria):
+                linha = {"analise": analise, "linhas_por_arquivo": linhas, **linha}
+                resultados.append(linha)
+                if ao_medir:
+                    ao_medir(linha)
+    return {
+        "metadados": {
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "commit": _commit_atual(),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+            "semente": semente,
+            "arquivos": arquivos,
+            "sobreposicao": sobreposicao,
+            "escalas": list(escalas),
+        },
+        "resultados": resultados,
+    }
+
+
+def comparar(anterior, atual):
+    """Tabela etapa a etapa entre dois resultados (dicionários do JSON), com a variação de tempo."""
+    chave = ["analise", "linhas_por_arquivo", "etapa"]
+    antes = pd.DataFrame(anterior["resultados"]).set_index(chave)
+    depois = pd.DataFrame(atual["resultados"]).set_index(chave)
+    tabela = antes[["segundos", "pico_memoria_mib"]].join(
+        depois[["segundos", "pico_memoria_mib"]], lsuffix="_antes", rsuffix="_depois", how="inner")
+    tabela["variacao_tempo"] = (tabela["segundos_depois"] / tabela["segundos_antes"] - 1).round(3)
+    return tabela.reset_index()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do comparador com dados sintéticos.")
+    parser.add_argument("--escalas", type=int, nargs="+", default=[10_000, 100_000], help="linhas por arquivo")
+    parser.add_argument("--analises", nargs="+", choices=["erb", "google"], default=["erb", "google"])
+    parser.add_argument("--arquivos", type=int, default=3)
+    parser.add_argument("--sobreposicao", type=float, default=0.2, help="fração de valores comuns entre arquivos")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--sem-memoria", action="store_true", help="não mede o pico de memória (roda cada etapa uma vez)")
+    parser.add_argument("--saida", default="benchmark.json")
+    parser.add_argument("--comparar", metavar="ANTERIOR.json", help="resultado anterior para comparação")
+    parser.add_argument("--gerar-em", metavar="PASTA", help="apenas grava os arquivos sintéticos nesta pasta")
+    args = parser.parse_args(argv)
+    analises = [{"erb": ANALISE_ERB, "google": ANALISE_GOOGLE}[a] for a in args.analises]
+
+    if args.gerar_em:
+        os.makedirs(args.gerar_em, exist_ok=True)
+        for analise in analises:
+            for linhas in args.escalas:
+                for nome, dados in gerar_cenario(analise, linhas, args.arquivos, args.sobreposicao, args.semente):
+                    caminho = os.path.join(args.gerar_em, f"{linhas}_{nome}")
+                    with open(caminho, "wb") as f:
+                        f.write(dados)
+                    print(caminho)
+        return
+
+    def _mostrar(linha):
+        pico = "-" if linha["pico_memoria_mib"] is None else f"{linha['pico_memoria_mib']:.1f} MiB"
+        print(f"{linha['analise'][:20]:<20} {linha['linhas_por_arquivo']:>9} {linha['etapa']:<13} "
+              f"{linha['segundos']:>9.3f} s {pico:>12}  ({linha['itens']} itens)", flush=True)
+
+    atual = executar_benchmark(args.escalas, analises, args.arquivos, args.sobreposicao, args.semente,
+                               memoria=not args.sem_memoria, ao_medir=_mostrar)
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump(atual, f, ensure_ascii=False, indent=2)
+    print(f"Resultados gravados em {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            anterior = json.load(f)
+        with pd.option_context("display.width", 200, "display.max_rows", None):
+            print(comparar(anterior, atual).to_string(index=False))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
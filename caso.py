@@ -0,0 +1,117 @@
+# caso.py
+
+import os
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+
+from cruzamento import COLUNAS_ESTADO, detectar_cruzamentos
+
+# --- Base Persistente do Caso (SQLite) ---
+
+CAMINHO_BASE_CASO = os.path.join("casos", "caso.sqlite")
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS arquivos (
+    id INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL,
+    nome TEXT NOT NULL,
+    analise TEXT NOT NULL,
+    strict INTEGER NOT NULL,
+    total_registros INTEGER NOT NULL,
+    adicionado_em TEXT NOT NULL,
+    UNIQUE (hash, analise, strict)
+);
+CREATE TABLE IF NOT EXISTS registros (
+    valor TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    arquivo_id INTEGER NOT NULL REFERENCES arquivos (id),
+    coluna_fonte TEXT,
+    confianca TEXT,
+    ocorrencias INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_registros_valor_tipo ON registros (valor, tipo);
+CREATE INDEX IF NOT EXISTS idx_registros_arquivo ON registros (arquivo_id);
+"""
+
+
+class BaseCaso:
+    """
+    Base local de um caso de investigação: guarda, por arquivo (identificado pelo SHA-256 do
+    conteúdo), os registros normalizados já reduzidos a (valor, tipo, coluna, confiança, ocorrências).
+    Novos arquivos são cruzados contra tudo o que já está no caso com uma junção indexada
+    em (valor, tipo), sem recalcular o caso inteiro.
+    """
+
+    def __init__(self, caminho=CAMINHO_BASE_CASO):
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        self.caminho = caminho
+        self._conexao = sqlite3.connect(caminho)
+        self._conexao.executescript(_ESQUEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.fechar()
+
+    def fechar(self):
+        self._conexao.close()
+
+    def arquivos(self):
+        """Arquivos já incorporados ao caso, na ordem de inclusão."""
+        return pd.read_sql_query(
+            "SELECT id, nome, analise, total_registros, adicionado_em FROM arquivos ORDER BY id", self._conexao)
+
+    def contem(self, hash_arquivo, analise, strict):
+        consulta = "SELECT 1 FROM arquivos WHERE hash = ? AND analise = ? AND strict = ?"
+        return self._conexao.execute(consulta, (hash_arquivo, analise, int(strict))).fetchone() is not None
+
+    def _nome_unico(self, nome):
+        """Extratos de sessões diferentes costumam ter o mesmo nome: o repetido ganha um sufixo."""
+        existentes = {linha[0] for linha in self._conexao.execute("SELECT nome FROM arquivos")}
+        candidato, n = nome, 1
+        while candidato in existentes:
+            n += 1
+            candidato = f"{nome} ({n})"
+        return candidato
+
+    def adicionar_arquivo(self, hash_arquivo, nome, analise, strict, estado, total_registros):
+        """Grava o estado reduzido de um arquivo e devolve seu id (ou None se já estava no caso)."""
+        if self.contem(hash_arquivo, analise, strict):
+            return None
+        with self._conexao:
+            cursor = self._conexao.execute(
+                "INSERT INTO arquivos (hash, nome, analise, strict, total_registros, adicionado_em) VALUES (?, ?, ?, ?, ?, ?)",
+                (hash_arquivo, self._nome_unico(nome), analise, int(strict), int(total_registros),
+                 datetime.now().isoformat(timespec="seconds"))
+            )
+            arquivo_id = cursor.lastrowid
+            linhas = estado[["valor", "tipo", "coluna_fonte", "confianca", "ocorrencias"]].assign(arquivo_id=arquivo_id)
+            linhas.to_sql("registros", self._conexao, if_exists="append", index=False, chunksize=50_000)
+        return arquivo_id
+
+    def estado_com(self, arquivo_ids):
+        """
+        Todas as linhas do caso cujo (valor, tipo) aparece nos arquivos informados, com o nome
+        do arquivo, no formato do estado do cruzamento (junção indexada, sem varrer o caso).
+        """
+        if not arquivo_ids:
+            return pd.DataFrame(columns=COLUNAS_ESTADO + ["ocorrencias"])
+        marcadores = ", ".join("?" * len(arquivo_ids))
+        consulta = f"""
+            WITH novos AS (SELECT DISTINCT valor, tipo FROM registros WHERE arquivo_id IN ({marcadores}))
+            SELECT r.valor, r.tipo, a.nome AS arquivo, r.coluna_fonte, r.confianca, r.ocorrencias
+            FROM novos n
+            JOIN registros r ON r.valor = n.valor AND r.tipo = n.tipo
+            JOIN arquivos a ON a.id = r.arquivo_id
+            ORDER BY r.arquivo_id, r.rowid
+        """
+        return pd.read_sql_query(consulta, self._conexao, params=list(arquivo_ids))
+
+    def cruzamentos_novos(self, arquivo_ids, niveis_confianca=None):
+        """Cruzamentos que envolvem ao menos um dos arquivos informados (ex: os recém-adicionados)."""
+        return detectar_cruzamentos(self.estado_com(arquivo_ids), niveis_confianca)
@@ -0,0 +1,246 @@
+# colocalizacao.py
+
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+try:
+    from pandas.tseries.api import guess_datetime_format
+except ImportError:  # pandas < 2.2
+    guess_datetime_format = None
+
+# --- Colunas de ERB e Data/Hora ---
+
+PALAVRAS_ERB = ["erb", "cgi", "cell", "celula", "célula", "eci", "estacao", "estação", "torre", "antena", "site"]
+PALAVRAS_DATA = ["data", "date", "dia"]
+PALAVRAS_HORA = ["hora", "time", "horario", "horário"]
+PALAVRAS_DATA_HORA = ["timestamp", "datetime", "datahora"]
+# Colunas de telefone do próprio alvo do extrato (a ERB registrada é a dele, não a do interlocutor)
+PALAVRAS_ORIGEM = ["origem", "orig", "calling", "caller", "a_party", "chamador", "originador"]
+
+
+def mapear_colunas_colocalizacao(colunas):
+    """
+    Posições das colunas de ERB e de data/hora (uma coluna "data/hora" ou colunas separadas de
+    data e de hora), pelo nome. Devolve None quando o arquivo não tem ERB ou data.
+    """
+    mapa = {}
+    for i, nome in enumerate(str(c).lower() for c in colunas):
+        tem_data = any(p in nome for p in PALAVRAS_DATA)
+        tem_hora = any(p in nome for p in PALAVRAS_HORA)
+        if any(p in nome for p in PALAVRAS_DATA_HORA) or (tem_data and tem_hora):
+            mapa.setdefault("data_hora", i)
+        elif tem_data:
+            mapa.setdefault("data", i)
+        elif tem_hora:
+            mapa.setdefault("hora", i)
+        elif any(p in nome for p in PALAVRAS_ERB):
+            mapa.setdefault("erb", i)
+    if "erb" not in mapa or not ({"data_hora", "data"} & set(mapa)):
+        return None
+    return mapa
+
+
+def colunas_identificador(colunas, posicoes, tipo):
+    """Colunas do identificador: para telefone, só as de origem quando o extrato as distingue."""
+    if tipo == "telefone":
+        origem = [i for i in posicoes if any(p in str(colunas[i]).lower() for p in PALAVRAS_ORIGEM)]
+        return origem or posicoes
+    return posicoes
+
+
+AMOSTRA_FORMATO = 20  # valores preenchidos usados para deduzir o formato de data/hora da coluna
+# Fuso ao fim da hora ("-03:00", "-0200", "Z", "UTC", "GMT-3"): descartado, fica a hora local como escrita
+_RE_FUSO = r"(\d{1,2}:\d{2}(?::\d{2}(?:[.,]\d+)?)?)\s*(?:Z|(?:UTC|GMT)?\s*[+-]\d{1,2}(?::?\d{2})?|UTC|GMT)$"
+
+
+def _deduzir_formato(amostra):
+    """
+    Formato mais frequente na amostra. Dia antes do mês só para datas que não começam pelo ano:
+    com dayfirst, "2024-02-01" seria lido como "%Y-%d-%m".
+    """
+    formatos = [guess_datetime_format(texto, dayfirst=not texto[:4].isdigit()) for texto in amostra]
+    formatos = Counter(formato for formato in formatos if formato)
+    return formatos.most_common(1)[0][0] if formatos else None
+
+
+def converter_instantes(textos):
+    """
+    Texto de data/hora -> (segundos desde 1970 em int64, máscara dos valores reconhecidos).
+    O formato é deduzido de uma amostra espaçada ao longo da coluna e só as falhas passam por
+    ISO 8601 e, por fim, pelo parser misto (dia antes do mês). O fuso horário, quando presente, é
+    descartado: os eventos são comparados pela hora local escrita no extrato, a mesma dos extratos
+    sem fuso (horários de verão diferentes numa coluna não a tornam ilegível; extratos em UTC
+    continuam em UTC).
+    """
+    textos = pd.Series(textos, dtype=object).fillna("").astype(str).str.strip()
+    textos = textos.str.replace(_RE_FUSO, r"\1", regex=True, case=False)
+    preenchidos = textos != ""
+    formato = None
+    if guess_datetime_format is not None and preenchidos.any():
+        posicoes = np.flatnonzero(preenchidos.to_numpy())
+        posicoes = posicoes[np.linspace(0, len(posicoes) - 1, min(len(posicoes), AMOSTRA_FORMATO)).astype(int)]
+        formato = _deduzir_formato(textos.iloc[posicoes].tolist())
+    # Com o formato explícito a ordem de dia e mês já está definida
+    instantes = pd.to_datetime(textos.where(preenchidos), format=formato or "ISO8601", errors="coerce")
+    # Fora do formato deduzido: ISO 8601 antes do parser misto, que inverteria dia e mês em "2024-02-01"
+    falhas = instantes.isna() & preenchidos
+    if falhas.any():
+        instantes[falhas] = pd.to_datetime(textos[falhas], format="ISO8601", errors="coerce")
+    falhas = instantes.isna() & preenchidos
+    if falhas.any():
+        instantes[falhas] = pd.to_datetime(textos[falhas], format="mixed", dayfirst=True, errors="coerce")
+    validos = instantes.notna().to_numpy(copy=True)
+    segundos = np.zeros(len(textos), dtype=np.int64)
+    segundos[validos] = instantes[validos].to_numpy(dtype="datetime64[s]").astype(np.int64)
+    return segundos, validos
+
+
+# --- Extração de Eventos ---
+
+COLUNAS_EVENTO = ["identificador", "erb", "instante"]
+
+
+def extrair_eventos(df, posicoes, tipo, mapa, cache, strict=False):
+    """
+    Eventos (identificador normalizado, ERB, instante em segundos) de um bloco já limpo
+    (fillna e nomes em minúsculas), um por célula de identificador com ERB e data/hora válidas.
+    """
+    if "data_hora" in mapa:
+        textos = df.iloc[:, mapa["data_hora"]].astype(str)
+    elif "hora" in mapa:
+        horas = df.iloc[:, mapa["hora"]].astype(str).str.strip()
+        # Sem a hora, a data sozinha cairia à meia-noite: o evento é descartado
+        textos = (df.iloc[:, mapa["data"]].astype(str) + " " + horas).where(horas != "", "")
+    else:
+        textos = df.iloc[:, mapa["data"]].astype(str)
+    segundos, validos = converter_instantes(textos)
+    erbs = df.iloc[:, mapa["erb"]].astype(str).str.strip().str.upper()
+    validos &= (erbs != "").to_numpy()
+
+    partes = []
+    for i in posicoes:
+        valores, _ = cache.normalizar(tipo, df.iloc[:, i], strict)
+        ok = validos & valores.notna().to_numpy()
+        partes.append(pd.DataFrame({
+            "identificador": valores[ok].to_numpy(dtype=object),
+            "erb": erbs[ok].to_numpy(dtype=object),
+            "instante": segundos[ok],
+        }))
+    if not partes:
+        return pd.DataFrame(columns=COLUNAS_EVENTO)
+    return pd.concat(partes, ignore_index=True)
+
+
+class AcumuladorEventos:
+    """Eventos de um arquivo guardados por bloco com identificador e ERB categóricos (memória compacta)."""
+
+    def __init__(self):
+        self._blocos = []
+
+    def adicionar(self, eventos):
+        if not eventos.empty:
+            self._blocos.append(eventos.astype({"identificador": "category", "erb": "category"}))
+
+    def eventos(self):
+        if not self._blocos:
+            return pd.DataFrame(columns=COLUNAS_EVENTO)
+        return pd.DataFrame({
+            "identificador": union_categoricals([b["identificador"] for b in self._blocos]),
+            "erb": union_categoricals([b["erb"] for b in self._blocos]),
+            "instante": np.concatenate([b["instante"].to_numpy() for b in self._blocos]),
+        })
+
+
+# --- Detecção de Co-localizações (varredura ordenada) ---
+
+JANELA_PADRAO_MINUTOS = 15
+COLUNAS_COLOCALIZACAO = ["identificador_a", "identificador_b", "coocorrencias", "erbs",
+                         "primeira", "ultima", "arquivos_a", "arquivos_b"]
+PARES_POR_COMPACTACAO = 5_000_000  # pares acumulados antes de reduzir por (a, b, erb)
+
+
+def _reduzir_pares(partes):
+    pares = pd.concat(partes, ignore_index=True)
+    return pares.groupby(["a", "b", "erb"], sort=False, as_index=False).agg(
+        coocorrencias=("coocorrencias", "sum"), primeira=("primeira", "min"), ultima=("ultima", "max"))
+
+
+def detectar_colocalizacoes(eventos_por_arquivo, janela_segundos):
+    """
+    Pares de identificadores vistos na mesma ERB com até `janela_segundos` de diferença, vindos
+    de arquivos diferentes. Os eventos são ordenados por (ERB, instante) e varridos por
+    deslocamento: na passada d, cada evento é comparado ao d-ésimo seguinte, e só continuam os
+    que ainda estão na mesma ERB e dentro da janela. O custo acompanha o número de pares
+    encontrados, sem comparar todos com todos.
+    """
+    nomes = [nome for nome, eventos in eventos_por_arquivo.items() if len(eventos)]
+    if not nomes:
+        return pd.DataFrame(columns=COLUNAS_COLOCALIZACAO)
+    # Códigos inteiros comuns a todos os arquivos (categorias unidas), sem passar por objetos
+    identificadores = union_categoricals([eventos_por_arquivo[nome]["identificador"].astype("category") for nome in nomes])
+    erbs = union_categoricals([eventos_por_arquivo[nome]["erb"].astype("category") for nome in nomes])
+    eventos = pd.DataFrame({
+        "identificador": identificadores.codes.astype(np.int64), "erb": erbs.codes.astype(np.int64),
+        "instante": np.concatenate([eventos_por_arquivo[nome]["instante"].to_numpy(dtype=np.int64) for nome in nomes]),
+        "arquivo": np.repeat(np.arange(len(nomes)), [len(eventos_por_arquivo[nome]) for nome in nomes]),
+    }).drop_duplicates()
+    distintos = identificadores.categories.to_numpy(dtype=object)
+    identificadores, erbs, instantes, arquivos = (eventos[c].to_numpy() for c in eventos.columns)
+    # Ordenação por (ERB, instante) numa única chave int64 quando os intervalos cabem nela
+    deslocados = instantes - instantes.min()
+    if deslocados.max() < 2 ** 32 and erbs.max() < 2 ** 31:
+        ordem = np.argsort((erbs << 32) | deslocados, kind="stable")
+    else:
+        ordem = np.lexsort((instantes, erbs))
+    identificadores, erbs, instantes, arquivos = identificadores[ordem], erbs[ordem], instantes[ordem], arquivos[ordem]
+
+    partes, pendentes = [], 0
+    ativos = np.arange(len(ordem) - 1)
+    deslocamento = 1
+    while len(ativos):
+        seguintes = ativos + deslocamento
+        dentro = seguintes < len(ordem)
+        ativos, seguintes = ativos[dentro], seguintes[dentro]
+        proximos = (erbs[seguintes] == erbs[ativos]) & (instantes[seguintes] - instantes[ativos] <= janela_segundos)
+        ativos, seguintes = ativos[proximos], seguintes[proximos]
+        validos = (arquivos[ativos] != arquivos[seguintes]) & (identificadores[ativos] != identificadores[seguintes])
+        a, b = identificadores[ativos[validos]], identificadores[seguintes[validos]]
+        if len(a):
+            partes.append(pd.DataFrame({
+                "a": np.minimum(a, b), "b": np.maximum(a, b), "erb": erbs[ativos[validos]],
+                "coocorrencias": 1, "primeira": instantes[ativos[validos]], "ultima": instantes[seguintes[validos]],
+            }))
+            pendentes += len(a)
+            if pendentes > PARES_POR_COMPACTACAO:
+                partes, pendentes = [_reduzir_pares(partes)], 0
+        deslocamento += 1
+
+    if not partes:
+        return pd.DataFrame(columns=COLUNAS_COLOCALIZACAO)
+    por_erb = _reduzir_pares(partes)
+    pares = por_erb.groupby(["a", "b"], sort=False).agg(
+        coocorrencias=("coocorrencias", "sum"), erbs=("erb", "nunique"),
+        primeira=("primeira", "min"), ultima=("ultima", "max")).reset_index()
+
+    # Arquivos em que cada identificador dos pares aparece (chaves identificador * n + arquivo, ordenadas)
+    usados = np.zeros(len(distintos), dtype=bool)
+    usados[pares["a"].to_numpy()] = usados[pares["b"].to_numpy()] = True
+    dos_pares = usados[identificadores]
+    chaves = np.sort(pd.unique(identificadores[dos_pares] * len(nomes) + arquivos[dos_pares]))
+    codigos, inicios = np.unique(chaves // len(nomes), return_index=True)
+    arquivos_de = dict(zip(codigos.tolist(), (
+        [nomes[i] for i in parte] for parte in np.split((chaves % len(nomes)).tolist(), inicios[1:]))))
+    resultado = pd.DataFrame({
+        "identificador_a": distintos[pares["a"].to_numpy()],
+        "identificador_b": distintos[pares["b"].to_numpy()],
+        "coocorrencias": pares["coocorrencias"].to_numpy(),
+        "erbs": pares["erbs"].to_numpy(),
+        "primeira": pd.to_datetime(pares["primeira"].to_numpy(), unit="s"),
+        "ultima": pd.to_datetime(pares["ultima"].to_numpy(), unit="s"),
+        "arquivos_a": [arquivos_de[c] for c in pares["a"].tolist()],
+        "arquivos_b": [arquivos_de[c] for c in pares["b"].tolist()],
+    })
+    return resultado.sort_values(["coocorrencias", "erbs"], ascending=False, kind="stable").reset_index(drop=True)
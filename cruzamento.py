@@ -0,0 +1,222 @@
+# cruzamento.py
+
+import numpy as np
+import pandas as pd
+
+from alvos import COLUNA_ALVOS
+
+# --- Estado Incremental do Cruzamento ---
+
+COLUNAS_ESTADO = ["valor", "tipo", "arquivo", "coluna_fonte", "confianca"]
+
+
+class AcumuladorCruzamentos:
+    """
+    Estado incremental do cruzamento, alimentado bloco a bloco durante a leitura.
+    Cada bloco de registros é reduzido a uma linha por (valor, tipo, arquivo, coluna_fonte,
+    confianca) com a contagem de ocorrências, e os blocos reduzidos são compactados
+    periodicamente: a memória cresce com as combinações distintas, não com as linhas lidas.
+    """
+
+    def __init__(self):
+        self._estado = pd.DataFrame(columns=COLUNAS_ESTADO + ["ocorrencias"])
+        self._pendentes = []
+        self._linhas_pendentes = 0
+        self.registros = 0
+
+    def adicionar(self, registros):
+        """Incorpora um bloco de registros extraídos (pode ser descartado em seguida)."""
+        if registros.empty:
+            return
+        reduzido = registros.groupby(COLUNAS_ESTADO, sort=False).size().reset_index(name="ocorrencias")
+        self.adicionar_estado(reduzido, len(registros))
+
+    def adicionar_estado(self, reduzido, registros):
+        """Incorpora um estado já reduzido (ex: o estado de outro acumulador, vindo de um processo paralelo)."""
+        if reduzido.empty:
+            return
+        self.registros += registros
+        self._pendentes.append(reduzido)
+        self._linhas_pendentes += len(reduzido)
+        # Compacta quando os pendentes superam o estado: custo amortizado linear
+        if self._linhas_pendentes > max(len(self._estado), 100_000):
+            self._compactar()
+
+    def _compactar(self):
+        if not self._pendentes:
+            return
+        partes = [self._estado] if len(self._estado) else []
+        combinado = pd.concat(partes + self._pendentes, ignore_index=True)
+        self._estado = combinado.groupby(COLUNAS_ESTADO, sort=False, as_index=False)["ocorrencias"].sum()
+        self._pendentes = []
+        self._linhas_pendentes = 0
+
+    def estado(self):
+        """Uma linha por (valor, tipo, arquivo, coluna_fonte, confianca), na ordem de aparição."""
+        self._compactar()
+        return self._estado
+
+
+# --- Detecção de Cruzamentos ---
+
+# Ordem de confiança: o máximo de um grupo é o nível mais alto, não o maior texto.
+# "sufixo" (abaixo de "baixa") marca os cruzamentos parciais entre número curto e número completo
+CONFIANCA_SUFIXO = "sufixo"
+CONFIANCA_ORDENADA = pd.CategoricalDtype([CONFIANCA_SUFIXO, "baixa", "média", "alta"], ordered=True)
+
+COLUNAS_CRUZAMENTO = ["valor", "tipo", "confianca", "arquivos", "colunas", "ocorrencias"]
+
+
+def _listas_por_grupo(codigos, valores, n_grupos):
+    """Uma lista de valores por código de grupo, preservando a ordem de aparição (sem agg Python por grupo)."""
+    ordem = np.argsort(codigos, kind="stable")
+    valores = valores[ordem].tolist()
+    fins = np.cumsum(np.bincount(codigos, minlength=n_grupos)).tolist()
+    return [valores[inicio:fim] for inicio, fim in zip([0] + fins[:-1], fins)]
+
+
+def detectar_cruzamentos(df_estado, niveis_confianca=None):
+    """
+    Valores (por tipo) presentes em mais de um arquivo, numa única passada agrupada sobre o
+    estado reduzido: um cruzamento por linha, com a maior confiança, os arquivos e colunas
+    de origem e o total de ocorrências, do mais frequente para o menos frequente.
+    """
+    df = df_estado
+    if niveis_confianca is not None:
+        df = df[df["confianca"].isin(niveis_confianca)]
+    if df.empty:
+        return pd.DataFrame(columns=COLUNAS_CRUZAMENTO)
+
+    # Só os valores vistos em mais de um arquivo seguem para a agregação
+    codigos = df.groupby(["valor", "tipo"], sort=False).ngroup().to_numpy()
+    primeiros = ~df.duplicated(["valor", "tipo", "arquivo"]).to_numpy()
+    em_varios = np.bincount(codigos[primeiros]) > 1
+    df = df[em_varios[codigos]].astype({"confianca": CONFIANCA_ORDENADA})
+    if df.empty:
+        return pd.DataFrame(columns=COLUNAS_CRUZAMENTO)
+
+    grupos = df.groupby(["valor", "tipo"], sort=True)
+    codigos, n_grupos = grupos.ngroup().to_numpy(), grupos.ngroups
+    df_cruzado = grupos.agg(confianca=("confianca", "max"), ocorrencias=("ocorrencias", "sum")).reset_index()
+    for coluna, destino in (("arquivo", "arquivos"), ("coluna_fonte", "colunas")):
+        primeiros = ~df.duplicated(["valor", "tipo", coluna]).to_numpy()
+        df_cruzado[destino] = _listas_por_grupo(codigos[primeiros], df[coluna].to_numpy(dtype=object)[primeiros], n_grupos)
+    df_cruzado["ocorrencias"] = df_cruzado["ocorrencias"].astype(int)
+
+    # Mais ocorrências primeiro; em empate, maior confiança
+    return df_cruzado.sort_values(["ocorrencias", "confianca"], ascending=[False, False], kind="stable")[COLUNAS_CRUZAMENTO]
+
+
+# --- Cruzamento por Sufixo (números curtos) ---
+
+DIGITOS_SUFIXO = 8  # número local sem DDD: os 8 últimos dígitos identificam a linha
+
+
+def detectar_cruzamentos_por_sufixo(df_estado, niveis_confianca=None, digitos=DIGITOS_SUFIXO):
+    """
+    Liga telefones curtos (8 ou 9 dígitos, sem DDD) ao número completo (+55DDD...) com os mesmos
+    últimos `digitos` dígitos, por junção de hash sobre o sufixo em vez de comparar todos com todos.
+    Um cruzamento por número completo, com confiança "sufixo", quando ao menos um arquivo só
+    contém a forma curta (os demais casos já aparecem no cruzamento exato).
+    """
+    df = df_estado[df_estado["tipo"] == "telefone"]
+    if niveis_confianca is not None:
+        df = df[df["confianca"].isin(niveis_confianca)]
+    # Texto nativo do pandas (pyarrow, quando disponível): operações de string vetorizadas em C
+    valores = df["valor"].astype(str)
+    tamanhos = valores.str.len()
+    curto = (tamanhos <= 9) & ~valores.str.startswith("+")
+    completo = valores.str.startswith("+55") & (tamanhos >= 13)
+    if not curto.any() or not completo.any():
+        return pd.DataFrame(columns=COLUNAS_CRUZAMENTO)
+
+    # Sufixo como inteiro: a busca (isin) e a junção usam tabelas de hash de int64
+    df = df.assign(_posicao=np.arange(len(df)), sufixo=valores.str[-digitos:].astype(np.int64).to_numpy())
+    curtos = df[curto.to_numpy()]
+    completos = df[completo.to_numpy()]
+    # Índice de sufixos: só os números completos cujo sufixo aparece entre os curtos
+    completos = completos[completos["sufixo"].isin(curtos["sufixo"])].assign(chave=lambda d: d["valor"], curto=False)
+    candidatos = completos[["sufixo", "chave"]].drop_duplicates()
+    ligados = curtos.merge(candidatos, on="sufixo").assign(curto=True)
+    linhas = pd.concat([completos, ligados], ignore_index=True).sort_values("_posicao", kind="stable")
+
+    # Mantém os números completos que alcançam algum arquivo onde só existe a forma curta
+    so_curto = linhas.groupby(["chave", "arquivo"], sort=False)["curto"].all()
+    linhas = linhas[linhas["chave"].isin(so_curto[so_curto].index.get_level_values("chave"))]
+    if linhas.empty:
+        return pd.DataFrame(columns=COLUNAS_CRUZAMENTO)
+
+    grupos = linhas.groupby("chave", sort=True)
+    codigos, n_grupos = grupos.ngroup().to_numpy(), grupos.ngroups
+    df_sufixo = grupos.agg(ocorrencias=("ocorrencias", "sum")).reset_index().rename(columns={"chave": "valor"})
+    df_sufixo["tipo"] = "telefone"
+    df_sufixo["confianca"] = pd.Categorical([CONFIANCA_SUFIXO] * n_grupos, dtype=CONFIANCA_ORDENADA)
+    for coluna, destino in (("arquivo", "arquivos"), ("coluna_fonte", "colunas")):
+        primeiros = ~linhas.duplicated(["chave", coluna]).to_numpy()
+        df_sufixo[destino] = _listas_por_grupo(codigos[primeiros], linhas[coluna].to_numpy(dtype=object)[primeiros], n_grupos)
+    df_sufixo["ocorrencias"] = df_sufixo["ocorrencias"].astype(int)
+    return df_sufixo.sort_values("ocorrencias", ascending=False, kind="stable")[COLUNAS_CRUZAMENTO]
+
+
+# --- Visualização Paginada ---
+
+class VisualizadorCruzamentos:
+    """
+    Cruzamentos mantidos no servidor para exibição página a página: filtros, busca e ordenação
+    são feitos sobre arrays pré-calculados, e só a página atual é enviada ao navegador.
+    """
+
+    COLUNAS_ORDENAVEIS = ["ocorrencias", "confianca", "valor", "tipo"]
+
+    def __init__(self, df_cruzado):
+        self.df = df_cruzado.reset_index(drop=True)
+        # Lista de arquivos "explodida" uma vez: filtrar por arquivo vira uma máscara vetorizada
+        listas = self.df["arquivos"].tolist()
+        self._linha_arquivo = np.repeat(np.arange(len(listas)), [len(l) for l in listas])
+        arquivos = pd.Categorical([a for l in listas for a in l])
+        self.arquivos = list(arquivos.categories)
+        self._codigo_arquivo = arquivos.codes
+        self._valores = self.df["valor"].astype(object)
+        self._ordens = {}
+        self._ultimo_filtro = None
+
+    def __len__(self):
+        return len(self.df)
+
+    def filtrar(self, tipos=None, confiancas=None, min_ocorrencias=1, arquivo=None, busca="", so_alvos=False):
+        """Máscara das linhas que atendem aos filtros (a última máscara fica guardada para a paginação)."""
+        chave = (tuple(tipos or ()), tuple(confiancas or ()), min_ocorrencias, arquivo, busca, so_alvos)
+        if self._ultimo_filtro and self._ultimo_filtro[0] == chave:
+            return self._ultimo_filtro[1]
+        mascara = (self.df["ocorrencias"] >= min_ocorrencias).to_numpy(copy=True)
+        if tipos:
+            mascara &= self.df["tipo"].isin(tipos).to_numpy()
+        if confiancas:
+            mascara &= self.df["confianca"].isin(confiancas).to_numpy()
+        if arquivo is not None:
+            com_arquivo = np.zeros(len(self.df), dtype=bool)
+            if arquivo in self.arquivos:
+                com_arquivo[self._linha_arquivo[self._codigo_arquivo == self.arquivos.index(arquivo)]] = True
+            mascara &= com_arquivo
+        if busca:
+            mascara &= self._valores.str.contains(busca, case=False, regex=False).to_numpy(dtype=bool)
+        if so_alvos:
+            # Só os valores que constam em alguma lista de alvos (coluna presente quando listas foram usadas)
+            mascara &= (self.df[COLUNA_ALVOS] != "").to_numpy() if COLUNA_ALVOS in self.df else False
+        self._ultimo_filtro = (chave, mascara)
+        return mascara
+
+    def _ordem(self, coluna, crescente):
+        """Permutação ordenada por `coluna`, calculada uma vez por coluna e sentido."""
+        if (coluna, crescente) not in self._ordens:
+            self._ordens[(coluna, crescente)] = (
+                self.df[coluna].sort_values(ascending=crescente, kind="stable").index.to_numpy())
+        return self._ordens[(coluna, crescente)]
+
+    def pagina(self, numero, tamanho, ordenar_por=None, crescente=False, **filtros):
+        """Linhas da página `numero` (a partir de 1) e o total de linhas filtradas."""
+        mascara = self.filtrar(**filtros)
+        ordem = self._ordem(ordenar_por, crescente) if ordenar_por else np.arange(len(self.df))
+        selecionadas = ordem[mascara[ordem]]
+        inicio = (numero - 1) * tamanho
+        return self.df.iloc[selecionadas[inicio:inicio + tamanho]], len(selecionadas)
@@ -0,0 +1,195 @@
+# exportacao.py
+
+import io
+from xml.sax.saxutils import escape, quoteattr
+
+import pandas as pd
+import xlsxwriter
+
+from processamento import COMPRESSAO_REGISTROS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# --- Exportação de Relatórios ---
+
+LINHAS_POR_ABA_EXCEL = 1_048_575  # limite do Excel (1.048.576 linhas) menos o cabeçalho
+
+# Mesmo destaque da interface: verde, laranja, vermelho e roxo por nível de confiança
+FORMATOS_CONFIANCA = {
+    "alta": {'bg_color': '#C6EFCE', 'font_color': '#006100'},
+    "média": {'bg_color': '#FFEB9C', 'font_color': '#9C6500'},
+    "baixa": {'bg_color': '#FFC7CE', 'font_color': '#9C0006'},
+    "sufixo": {'bg_color': '#E4DFEC', 'font_color': '#5B2C86'},
+}
+FORMATO_CABECALHO = {"bold": True, "border": 1, "align": "center", "valign": "top"}  # o mesmo do pandas
+
+
+def _celula(valor):
+    """Valor de célula como o DataFrame.to_excel gravaria (listas como texto, nulos em branco)."""
+    if isinstance(valor, (list, tuple)):
+        return str(valor)
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return None
+    return valor
+
+
+def exportar_xlsx(blocos, nome_aba, colunas=None, linhas_por_aba=LINHAS_POR_ABA_EXCEL):
+    """
+    Grava os blocos (DataFrames com as mesmas colunas) num XLSX em modo constant_memory, linha a
+    linha, abrindo uma nova aba numerada sempre que o limite de linhas do Excel é atingido.
+    A coluna 'confianca' recebe a formatação condicional em todas as abas e datas saem no formato brasileiro.
+    """
+    saida = io.BytesIO()
+    pasta = xlsxwriter.Workbook(saida, {"constant_memory": True, "default_date_format": "dd/mm/yyyy hh:mm:ss"})
+    formatos = {nivel: pasta.add_format(estilo) for nivel, estilo in FORMATOS_CONFIANCA.items()}
+    cabecalho = pasta.add_format(FORMATO_CABECALHO)
+    abas = []  # [planilha, linhas de dados]
+
+    def _nova_aba():
+        nome = nome_aba if not abas else f"{nome_aba} ({len(abas) + 1})"
+        planilha = pasta.add_worksheet(nome[:31])
+        planilha.write_row(0, 0, colunas, cabecalho)
+        abas.append([planilha, 0])
+
+    for bloco in blocos:
+        if colunas is None:
+            colunas = list(bloco.columns)
+        for valores in bloco.itertuples(index=False, name=None):
+            if not abas or abas[-1][1] >= linhas_por_aba:
+                _nova_aba()
+            aba = abas[-1]
+            aba[1] += 1
+            aba[0].write_row(aba[1], 0, [_celula(v) for v in valores])
+
+    if not abas and colunas is not None:
+        _nova_aba()
+    if colunas is not None and "confianca" in colunas:
+        conf_idx = colunas.index("confianca")
+        for planilha, linhas in abas:
+            for nivel, formato in formatos.items():
+                planilha.conditional_format(1, conf_idx, max(linhas, 1), conf_idx, {
+                    'type': 'cell',
+                    'criteria': 'equal to',
+                    'value': f'"{nivel}"',
+                    'format': formato
+                })
+    pasta.close()
+    return saida.getvalue()
+
+
+def exportar_csv_gz(blocos, colunas=None):
+    """CSV compactado: cada bloco vira um membro gzip, com o cabeçalho apenas no primeiro."""
+    saida = io.BytesIO()
+    primeiro = True
+    for bloco in blocos:
+        bloco.to_csv(saida, index=False, header=primeiro, compression=COMPRESSAO_REGISTROS)
+        primeiro = False
+    if primeiro and colunas is not None:
+        pd.DataFrame(columns=colunas).to_csv(saida, index=False, compression=COMPRESSAO_REGISTROS)
+    return saida.getvalue()
+
+
+def _tabela_arrow(bloco):
+    # Categorias variam entre blocos: texto simples mantém o mesmo esquema em todo o arquivo
+    categoricas = [c for c in bloco.columns if isinstance(bloco[c].dtype, pd.CategoricalDtype)]
+    bloco = bloco.astype({c: object for c in categoricas})
+    return pa.Table.from_pandas(bloco, preserve_index=False)
+
+
+def exportar_parquet(blocos, colunas=None):
+    """Parquet gravado bloco a bloco (um row group por bloco)."""
+    saida = io.BytesIO()
+    escritor = None
+    for bloco in blocos:
+        tabela = _tabela_arrow(bloco)
+        if escritor is None:
+            escritor = pq.ParquetWriter(saida, tabela.schema)
+        escritor.write_table(tabela.cast(escritor.schema))
+    if escritor is None:
+        pq.write_table(_tabela_arrow(pd.DataFrame(columns=colunas or [], dtype=object)), saida)
+    else:
+        escritor.close()
+    return saida.getvalue()
+
+
+def exportar_matrizes(matrizes):
+    """
+    XLSX com uma aba por matriz (nome da aba -> DataFrame quadrado arquivo x arquivo), com
+    escala de cores do Excel sobre os valores, como o mapa de calor da interface.
+    """
+    saida = io.BytesIO()
+    pasta = xlsxwriter.Workbook(saida, {"constant_memory": True})
+    cabecalho = pasta.add_format(FORMATO_CABECALHO)
+    for nome_aba, matriz in matrizes.items():
+        planilha = pasta.add_worksheet(nome_aba[:31])
+        planilha.write_row(0, 0, ["arquivo"] + [str(c) for c in matriz.columns], cabecalho)
+        for linha, (arquivo, valores) in enumerate(zip(matriz.index, matriz.to_numpy().tolist()), start=1):
+            planilha.write(linha, 0, str(arquivo), cabecalho)
+            planilha.write_row(linha, 1, valores)
+        if len(matriz):
+            planilha.conditional_format(1, 1, len(matriz), len(matriz.columns), {
+                'type': '2_color_scale', 'min_color': '#FFFFFF', 'max_color': '#F8696B'})
+        planilha.freeze_panes(1, 1)
+    pasta.close()
+    return saida.getvalue()
+
+
+def _tipo_graphml(serie):
+    if pd.api.types.is_integer_dtype(serie.dtype):
+        return "long"
+    if pd.api.types.is_float_dtype(serie.dtype):
+        return "double"
+    return "string"
+
+
+def exportar_graphml(nos, arestas):
+    """
+    GraphML (Gephi, Cytoscape, yEd) a partir de uma tabela de nós (coluna "id" e atributos) e
+    de uma lista de arestas (colunas "origem" e "destino" e atributos), escrito linha a linha.
+    """
+    saida = io.StringIO()
+    saida.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+    atributos = {"node": [c for c in nos.columns if c != "id"],
+                 "edge": [c for c in arestas.columns if c not in ("origem", "destino")]}
+    for alvo, df in (("node", nos), ("edge", arestas)):
+        for coluna in atributos[alvo]:
+            saida.write(f'  <key id="{alvo}_{coluna}" for="{alvo}" attr.name="{escape(str(coluna))}" '
+                        f'attr.type="{_tipo_graphml(df[coluna])}"/>\n')
+    saida.write('  <graph edgedefault="undirected">\n')
+
+    def _dados(alvo, valores):
+        return "".join(f'<data key="{alvo}_{coluna}">{escape(str(valor))}</data>'
+                       for coluna, valor in zip(atributos[alvo], valores) if _celula(valor) is not None)
+
+    for no, *valores in nos[["id"] + atributos["node"]].itertuples(index=False, name=None):
+        saida.write(f'    <node id={quoteattr(str(no))}>{_dados("node", valores)}</node>\n')
+    for origem, destino, *valores in arestas[["origem", "destino"] + atributos["edge"]].itertuples(index=False, name=None):
+        saida.write(f'    <edge source={quoteattr(str(origem))} target={quoteattr(str(destino))}>'
+                    f'{_dados("edge", valores)}</edge>\n')
+    saida.write("  </graph>\n</graphml>\n")
+    return saida.getvalue().encode("utf-8")
+
+
+# Formato -> (extensão, tipo MIME)
+FORMATOS_EXPORTACAO = {
+    "XLSX": (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "CSV.GZ": (".csv.gz", "application/gzip"),
+}
+if pq is not None:
+    FORMATOS_EXPORTACAO["Parquet"] = (".parquet", "application/vnd.apache.parquet")
+
+
+def exportar(formato, blocos, nome_aba, colunas=None):
+    """Gera o relatório no formato escolhido a partir de um iterável de DataFrames."""
+    if formato == "XLSX":
+        return exportar_xlsx(blocos, nome_aba, colunas)
+    if formato == "CSV.GZ":
+        return exportar_csv_gz(blocos, colunas)
+    if formato == "Parquet":
+        return exportar_parquet(blocos, colunas)
+    raise ValueError(f"Formato de exportação desconhecido: {formato}")
@@ -0,0 +1,250 @@
+# grafo.py
+
+import numpy as np
+import pandas as pd
+
+from cruzamento import CONFIANCA_ORDENADA
+
+# --- Componentes Conexos (union-find em arrays) ---
+
+
+def _comprimir(pai):
+    """Compressão de caminhos por saltos (pai[pai]) até cada nó apontar direto para a raiz."""
+    while True:
+        avo = pai[pai]
+        if np.array_equal(avo, pai):
+            return pai
+        pai = avo
+
+
+def componentes_conexos(n_nos, origem, destino):
+    """
+    Rótulo do componente de cada nó (o menor índice do componente), por union-find vetorizado:
+    a cada rodada, a raiz maior de cada aresta ainda separada é pendurada na menor e os caminhos
+    são comprimidos. Todas as arestas são tratadas de uma vez, sem laço Python por aresta.
+    """
+    pai = np.arange(n_nos)
+    origem = np.asarray(origem, dtype=np.int64)
+    destino = np.asarray(destino, dtype=np.int64)
+    while True:
+        pai = _comprimir(pai)
+        raiz_origem, raiz_destino = pai[origem], pai[destino]
+        separadas = raiz_origem != raiz_destino
+        if not separadas.any():
+            return pai
+        origem, destino = origem[separadas], destino[separadas]
+        raiz_origem, raiz_destino = raiz_origem[separadas], raiz_destino[separadas]
+        np.minimum.at(pai, np.maximum(raiz_origem, raiz_destino), np.minimum(raiz_origem, raiz_destino))
+
+
+# --- Vínculos na Mesma Linha ---
+
+COLUNAS_ARESTA_LINHA = ["valor_a", "tipo_a", "valor_b", "tipo_b", "peso"]
+
+
+def arestas_mesma_linha(df, colunas_por_tipo, cache, strict=False):
+    """
+    Valores normalizados encontrados na mesma linha de um bloco (ex: telefone e IMEI de um
+    registro), cada um ligado ao primeiro valor da sua linha: uma estrela por linha basta para
+    a conectividade. Devolve uma linha por par distinto, com o número de linhas em "peso".
+    """
+    partes = []
+    for tipo, posicoes in colunas_por_tipo.items():
+        for i in posicoes:
+            valores, _ = cache.normalizar(tipo, df.iloc[:, i], strict)
+            validos = valores.notna().to_numpy()
+            partes.append(pd.DataFrame({"linha": np.flatnonzero(validos),
+                                        "valor": valores[validos].to_numpy(dtype=object), "tipo": tipo}))
+    if not partes:
+        return pd.DataFrame(columns=COLUNAS_ARESTA_LINHA)
+    valores = pd.concat(partes, ignore_index=True).drop_duplicates().sort_values("linha", kind="stable")
+    primeiros = ~valores["linha"].duplicated().to_numpy()
+    # Posição do primeiro valor de cada linha, repetida para os demais valores da mesma linha
+    inicio = np.maximum.accumulate(np.where(primeiros, np.arange(len(valores)), 0))
+    centro, demais = inicio[~primeiros], np.flatnonzero(~primeiros)
+    arestas = pd.DataFrame({
+        "valor_a": valores["valor"].to_numpy()[centro], "tipo_a": valores["tipo"].to_numpy()[centro],
+        "valor_b": valores["valor"].to_numpy()[demais], "tipo_b": valores["tipo"].to_numpy()[demais],
+    })
+    return reduzir_arestas_linha([arestas.assign(peso=1)])
+
+
+def reduzir_arestas_linha(partes):
+    """Soma os pesos de pares repetidos (entre blocos ou arquivos)."""
+    partes = [p for p in partes if len(p)]
+    if not partes:
+        return pd.DataFrame(columns=COLUNAS_ARESTA_LINHA)
+    return (pd.concat(partes, ignore_index=True)
+            .groupby(COLUNAS_ARESTA_LINHA[:4], sort=False, as_index=False)["peso"].sum())
+
+
+# --- Grafo de Vínculos ---
+
+TIPO_ARQUIVO = "arquivo"
+RELACAO_LINHA = "mesma_linha"
+RELACAO_ARQUIVO = "presente_em"
+RELACOES = pd.CategoricalDtype([RELACAO_LINHA, RELACAO_ARQUIVO])
+COLUNAS_CLUSTER = ["cluster", "valores", "arquivos", "arestas", "confianca", "tipos", "exemplos"]
+COLUNAS_ARESTA = ["cluster", "origem", "destino", "relacao", "peso"]
+EXEMPLOS_POR_CLUSTER = 5
+
+
+class GrafoVinculos:
+    """
+    Grafo com os valores normalizados e os arquivos como nós, ligados por "presente_em" (valor ->
+    arquivo, a partir do estado reduzido do cruzamento) e, opcionalmente, por "mesma_linha" (valores
+    do mesmo registro). Cadeias como telefone A - IMEI X - telefone B viram um único cluster.
+    Valores vistos num só arquivo e sem vínculo de linha não ligam nada e ficam de fora. Os
+    componentes são calculados uma vez por modo (com ou sem os arquivos como ligação).
+    """
+
+    def __init__(self, df_estado, arestas_linha=None):
+        if arestas_linha is None:
+            arestas_linha = pd.DataFrame(columns=COLUNAS_ARESTA_LINHA)
+        # (valor, tipo) do estado e dos vínculos de linha codificados juntos: os códigos já são os nós
+        valores = pd.concat([df_estado["valor"], arestas_linha["valor_a"], arestas_linha["valor_b"]], ignore_index=True)
+        tipos = pd.concat([df_estado["tipo"], arestas_linha["tipo_a"], arestas_linha["tipo_b"]], ignore_index=True)
+        codigo_valor, distintos_valor = pd.factorize(valores)
+        codigo_tipo, distintos_tipo = pd.factorize(tipos)
+        n_tipos = max(len(distintos_tipo), 1)
+        codigos, chaves = pd.factorize(codigo_valor.astype(np.int64) * n_tipos + codigo_tipo)
+        chaves = np.asarray(chaves)
+        codigo_arquivo, arquivos = pd.factorize(df_estado["arquivo"])
+        self.arquivos = list(arquivos)
+        n_arquivos = len(self.arquivos)
+
+        # Nós: primeiro os arquivos, depois os valores
+        self.rotulos = np.concatenate([np.array(self.arquivos, dtype=object),
+                                       np.asarray(distintos_valor, dtype=object)[chaves // n_tipos]])
+        self.tipos = np.concatenate([np.full(n_arquivos, TIPO_ARQUIVO, dtype=object),
+                                     np.asarray(distintos_tipo, dtype=object)[chaves % n_tipos]])
+        no_estado = codigos[:len(df_estado)] + n_arquivos
+        confiancas = np.full(len(self.rotulos), -1, dtype=np.int8)
+        np.maximum.at(confiancas, no_estado, pd.Categorical(df_estado["confianca"], dtype=CONFIANCA_ORDENADA).codes)
+        self.confiancas = pd.Categorical.from_codes(confiancas, dtype=CONFIANCA_ORDENADA)
+
+        # Presença: um par (valor, arquivo) distinto por aresta, com as ocorrências somadas (chaves int64)
+        par, pares = pd.factorize(no_estado.astype(np.int64) * max(n_arquivos, 1) + codigo_arquivo)
+        pares = np.asarray(pares)
+        ocorrencias = np.bincount(par, weights=df_estado["ocorrencias"].to_numpy(dtype=np.float64), minlength=len(pares))
+        no_presenca = pares // max(n_arquivos, 1)
+        self._presenca = (no_presenca, pares % max(n_arquivos, 1), ocorrencias.astype(np.int64))
+
+        # Vínculos de linha sem sentido ((a, b) = (b, a)) e sem laços
+        n = len(arestas_linha)
+        a = codigos[len(df_estado):len(df_estado) + n] + n_arquivos
+        b = codigos[len(df_estado) + n:] + n_arquivos
+        linha = pd.DataFrame({"a": np.minimum(a, b), "b": np.maximum(a, b),
+                              "peso": arestas_linha["peso"].to_numpy(dtype=np.int64)})
+        linha = linha[linha["a"] != linha["b"]].groupby(["a", "b"], sort=False, as_index=False)["peso"].sum()
+        self._linha = (linha["a"].to_numpy(), linha["b"].to_numpy(), linha["peso"].to_numpy())
+
+        # Valores que ligam algo: em mais de um arquivo ou com vínculo de linha
+        self.quantidade_arquivos = np.bincount(no_presenca, minlength=len(self.rotulos))
+        self._ativo = self.quantidade_arquivos > 1
+        self._ativo[self._linha[0]] = self._ativo[self._linha[1]] = True
+        self._ativo[:n_arquivos] = False
+        self._componentes = {}
+
+    def __len__(self):
+        return len(self.rotulos)
+
+    def ids(self, nos):
+        """Identificador legível de cada nó ("tipo:rótulo"), único no grafo."""
+        return self.tipos[nos].astype(str) + ":" + self.rotulos[nos].astype(str)
+
+    def _arestas(self, usar_arquivos):
+        """Arestas do modo escolhido: (origem, destino, peso, código da relação em RELACOES) em arrays."""
+        origem, destino, peso = self._linha
+        relacao = np.zeros(len(origem), dtype=np.int8)
+        if usar_arquivos:
+            no, arquivo, ocorrencias = self._presenca
+            ativos = self._ativo[no]
+            origem = np.concatenate([origem, no[ativos]])
+            destino = np.concatenate([destino, arquivo[ativos]])
+            peso = np.concatenate([peso, ocorrencias[ativos]])
+            relacao = np.concatenate([relacao, np.ones(int(ativos.sum()), dtype=np.int8)])
+        return origem, destino, peso, relacao
+
+    def componentes(self, usar_arquivos=True):
+        """
+        (rótulo do cluster por nó, -1 fora dos clusters; tabela dos clusters, do maior para o menor
+        e, em empate, do mais confiável). Os clusters são numerados a partir de 1 nessa ordem.
+        """
+        if usar_arquivos in self._componentes:
+            return self._componentes[usar_arquivos]
+        origem, destino, _, _ = self._arestas(usar_arquivos)
+        raiz = componentes_conexos(len(self), origem, destino)
+        no_cluster = np.zeros(len(self), dtype=bool)
+        no_cluster[origem] = no_cluster[destino] = True
+        valores = no_cluster & (self.tipos != TIPO_ARQUIVO)
+        nos = np.flatnonzero(valores)
+
+        codigos, raizes = pd.factorize(raiz[nos])
+        n_clusters = len(raizes)
+        mapa_no = np.full(len(self), -1, dtype=np.int64)
+        mapa_no[nos] = codigos
+        tamanhos = np.bincount(codigos, minlength=n_clusters)
+        confianca = np.full(n_clusters, -1, dtype=np.int8)
+        np.maximum.at(confianca, codigos, self.confiancas.codes[nos])
+        arestas = np.bincount(mapa_no[origem], minlength=n_clusters)  # a origem é sempre um valor
+        # Arquivos distintos alcançados pelos valores de cada cluster (pares valor -> arquivo)
+        no, arquivo, _ = self._presenca
+        dentro = mapa_no[no] >= 0
+        pares = pd.unique(mapa_no[no[dentro]] * max(len(self.arquivos), 1) + arquivo[dentro])
+        n_arquivos = np.bincount(pares // max(len(self.arquivos), 1), minlength=n_clusters)
+
+        # Exemplos: os valores presentes em mais arquivos de cada cluster (trechos contíguos por cluster)
+        ordem = np.lexsort((-self.quantidade_arquivos[nos], codigos))
+        posicao = np.arange(len(ordem)) - np.searchsorted(codigos[ordem], codigos[ordem])
+        exemplos = ordem[posicao < EXEMPLOS_POR_CLUSTER]
+        rotulos = self.rotulos[nos[exemplos]].tolist()
+        fins = np.cumsum(np.bincount(codigos[exemplos], minlength=n_clusters)).tolist()
+        exemplos = [", ".join(rotulos[inicio:fim]) for inicio, fim in zip([0] + fins[:-1], fins)]
+        # Contagem por tipo de dado: poucos tipos, uma matriz cluster x tipo
+        codigo_tipo, nomes_tipo = pd.factorize(self.tipos[nos])
+        contagens = np.bincount(codigos * len(nomes_tipo) + codigo_tipo,
+                                minlength=n_clusters * len(nomes_tipo)).reshape(n_clusters, len(nomes_tipo))
+        tipos = [", ".join(f"{t}: {c}" for t, c in zip(nomes_tipo, linha) if c) for linha in contagens.tolist()]
+
+        tabela = pd.DataFrame({
+            "valores": tamanhos, "arquivos": n_arquivos, "arestas": arestas,
+            "confianca": pd.Categorical.from_codes(confianca, dtype=CONFIANCA_ORDENADA),
+            "tipos": tipos, "exemplos": exemplos,
+        })
+        tabela = tabela.sort_values(["valores", "confianca", "arquivos"], ascending=False, kind="stable")
+        numero = np.empty(n_clusters, dtype=np.int64)
+        numero[tabela.index.to_numpy()] = np.arange(1, n_clusters + 1)
+        tabela.insert(0, "cluster", np.arange(1, n_clusters + 1))
+
+        # Cluster de cada nó (arquivos incluídos quando servem de ligação)
+        indice_raiz = np.full(len(self), -1, dtype=np.int64)
+        indice_raiz[raizes] = np.arange(n_clusters)
+        cluster = np.full(len(self), -1, dtype=np.int64)
+        cluster[no_cluster] = numero[indice_raiz[raiz[no_cluster]]]
+        self._componentes[usar_arquivos] = (cluster, tabela.reset_index(drop=True)[COLUNAS_CLUSTER])
+        return self._componentes[usar_arquivos]
+
+    def clusters(self, usar_arquivos=True):
+        return self.componentes(usar_arquivos)[1]
+
+    def nos(self, usar_arquivos=True, clusters=None):
+        """Nós dos clusters escolhidos (todos se None), com identificador, tipo, confiança e cluster."""
+        cluster = self.componentes(usar_arquivos)[0]
+        selecao = cluster > 0 if clusters is None else np.isin(cluster, list(clusters))
+        nos = np.flatnonzero(selecao)
+        return pd.DataFrame({
+            "id": self.ids(nos), "rotulo": self.rotulos[nos], "tipo": self.tipos[nos],
+            "confianca": self.confiancas[nos], "arquivos": self.quantidade_arquivos[nos], "cluster": cluster[nos],
+        }).sort_values(["cluster", "tipo"], kind="stable").reset_index(drop=True)
+
+    def arestas(self, usar_arquivos=True, clusters=None):
+        """Lista de arestas dos clusters escolhidos (todos se None), com os identificadores dos nós."""
+        cluster = self.componentes(usar_arquivos)[0]
+        origem, destino, peso, relacao = self._arestas(usar_arquivos)
+        selecao = cluster[origem] > 0 if clusters is None else np.isin(cluster[origem], list(clusters))
+        origem, destino = origem[selecao], destino[selecao]
+        return pd.DataFrame({
+            "cluster": cluster[origem], "origem": self.ids(origem), "destino": self.ids(destino),
+            "relacao": pd.Categorical.from_codes(relacao[selecao], dtype=RELACOES), "peso": peso[selecao],
+        }, columns=COLUNAS_ARESTA).sort_values("cluster", kind="stable").reset_index(drop=True)
@@ -0,0 +1,146 @@
+# indice.py
+
+import numpy as np
+import pandas as pd
+
+from normalizacao import NORMALIZADORES
+
+# --- Índice Invertido (valor -> arquivos) ---
+
+COLUNAS_CONSULTA = ["valor", "tipo", "arquivos", "ocorrencias"]
+PARES_POR_LOTE = 4_000_000  # pares de arquivos gerados por vez no cálculo da sobreposição
+
+
+class IndiceInvertido:
+    """
+    Índice dos valores normalizados de uma execução: cada (valor, tipo) aponta para os arquivos
+    em que aparece e para as ocorrências por arquivo, guardados em formato CSR (um trecho contíguo
+    de pares por valor; memória proporcional aos pares, não a valores x arquivos). Construído uma
+    vez a partir do estado reduzido do cruzamento, responde consultas sem reprocessar as planilhas.
+    """
+
+    def __init__(self, df_estado, arquivos=None):
+        pares = (df_estado.groupby(["valor", "tipo", "arquivo"], sort=True)["ocorrencias"].sum()
+                 .reset_index())
+        self.arquivos = list(arquivos) if arquivos is not None else list(pd.unique(df_estado["arquivo"]))
+        self._posicao_arquivo = {nome: i for i, nome in enumerate(self.arquivos)}
+
+        # Pares (valor, arquivo) ordenados por valor: cada valor ocupa um trecho contíguo
+        chaves = pares[["valor", "tipo"]]
+        novo = (chaves != chaves.shift()).any(axis=1).to_numpy()
+        codigos = np.cumsum(novo) - 1
+        self.valores = pares["valor"].to_numpy(dtype=object)[novo]
+        self.tipos = pares["tipo"].to_numpy(dtype=object)[novo]
+        self.tipos_presentes = list(pd.unique(self.tipos))
+        self._par_arquivo = pd.Categorical(pares["arquivo"], categories=self.arquivos).codes.astype(np.int32)
+        self._par_ocorrencias = pares["ocorrencias"].to_numpy(dtype=np.int64)
+        self._inicios = np.append(np.flatnonzero(novo), len(pares))
+        self.quantidade_arquivos = np.bincount(codigos, minlength=len(self.valores))
+        self.ocorrencias = np.add.reduceat(self._par_ocorrencias, self._inicios[:-1]) if len(pares) else np.zeros(0, np.int64)
+        self._sobreposicoes = {}
+
+    def __len__(self):
+        return len(self.valores)
+
+    def _resultado(self, codigos, limite=None):
+        """Uma linha por valor, com a lista de arquivos e o total de ocorrências."""
+        codigos = np.asarray(codigos, dtype=np.int64)[:limite]
+        nomes = [
+            [self.arquivos[a] for a in self._par_arquivo[inicio:fim].tolist()]
+            for inicio, fim in zip(self._inicios[codigos].tolist(), self._inicios[codigos + 1].tolist())
+        ]
+        return pd.DataFrame({
+            "valor": self.valores[codigos], "tipo": self.tipos[codigos],
+            "arquivos": nomes, "ocorrencias": self.ocorrencias[codigos]
+        }, columns=COLUNAS_CONSULTA)
+
+    def _candidatos(self, texto):
+        """O texto digitado e suas formas normalizadas para cada tipo presente no índice."""
+        candidatos = {str(texto).strip()}
+        for tipo in self.tipos_presentes:
+            if tipo in NORMALIZADORES:
+                valor, _ = NORMALIZADORES[tipo](texto)
+                if valor:
+                    candidatos.add(valor)
+        return candidatos
+
+    def consultar(self, texto):
+        """Em quais arquivos aparece o valor (normalizado como na extração), com ocorrências por arquivo."""
+        linhas = []
+        for candidato in sorted(self._candidatos(texto)):
+            # Valores ordenados: busca binária, sem varrer o índice
+            inicio = np.searchsorted(self.valores, candidato, side="left")
+            fim = np.searchsorted(self.valores, candidato, side="right")
+            for codigo in range(inicio, fim):
+                for par in range(self._inicios[codigo], self._inicios[codigo + 1]):
+                    linhas.append({
+                        "valor": self.valores[codigo], "tipo": self.tipos[codigo],
+                        "arquivo": self.arquivos[self._par_arquivo[par]],
+                        "ocorrencias": int(self._par_ocorrencias[par])
+                    })
+        return pd.DataFrame(linhas, columns=["valor", "tipo", "arquivo", "ocorrencias"])
+
+    def compartilhados(self, arquivos, limite=None):
+        """Valores presentes em todos os arquivos informados: contagem, por valor, dos seus pares nesses arquivos."""
+        selecionados = np.zeros(len(self.arquivos), dtype=bool)
+        selecionados[[self._posicao_arquivo[nome] for nome in arquivos]] = True
+        por_valor = np.add.reduceat(selecionados[self._par_arquivo].astype(np.int64), self._inicios[:-1]) \
+            if len(self._par_arquivo) else np.zeros(0, np.int64)
+        codigos = np.flatnonzero(por_valor == selecionados.sum())
+        return self._resultado(codigos, limite)
+
+    def em_pelo_menos(self, k, limite=None):
+        """Valores presentes em k ou mais arquivos, dos mais espalhados para os menos."""
+        codigos = np.flatnonzero(self.quantidade_arquivos >= k)
+        codigos = codigos[np.argsort(-self.quantidade_arquivos[codigos], kind="stable")]
+        return self._resultado(codigos, limite)
+
+    def sobreposicao(self, tipo=None):
+        """
+        Matrizes N x N entre arquivos (valores distintos em comum e similaridade de Jaccard), só do
+        `tipo` informado ou de todos. Equivale a A^T A sobre a matriz esparsa valor x arquivo, já
+        guardada no índice em formato CSR (_inicios, _par_arquivo): cada valor em k arquivos
+        contribui com seus k(k-1)/2 pares, gerados em lote para todos os valores com o mesmo k.
+        """
+        if tipo in self._sobreposicoes:
+            return self._sobreposicoes[tipo]
+        n = len(self.arquivos)
+        do_tipo = np.ones(len(self.valores), dtype=bool) if tipo is None else self.tipos == tipo
+        por_arquivo = np.bincount(self._par_arquivo[np.repeat(do_tipo, self.quantidade_arquivos)], minlength=n)
+
+        contagem = np.zeros(n * n, dtype=np.int64)
+        codigos = np.flatnonzero(do_tipo & (self.quantidade_arquivos > 1))
+        quantidades = self.quantidade_arquivos[codigos]
+        for k in np.unique(quantidades).tolist():
+            linhas, colunas = np.triu_indices(k, 1)
+            do_k = codigos[quantidades == k]
+            lote = max(1, PARES_POR_LOTE // len(linhas))
+            for inicio in range(0, len(do_k), lote):
+                # Arquivos de cada valor (k por linha) e todos os pares dentro da linha
+                arquivos = self._par_arquivo[self._inicios[do_k[inicio:inicio + lote], None] + np.arange(k)]
+                a, b = arquivos[:, linhas].ravel(), arquivos[:, colunas].ravel()
+                contagem += np.bincount(np.minimum(a, b).astype(np.int64) * n + np.maximum(a, b), minlength=n * n)
+
+        matriz = contagem.reshape(n, n)
+        matriz = matriz + matriz.T
+        np.fill_diagonal(matriz, por_arquivo)
+        uniao = por_arquivo[:, None] + por_arquivo[None, :] - matriz
+        jaccard = np.divide(matriz, uniao, out=np.zeros((n, n)), where=uniao > 0)
+        resultado = (pd.DataFrame(matriz, index=self.arquivos, columns=self.arquivos),
+                     pd.DataFrame(jaccard.round(4), index=self.arquivos, columns=self.arquivos))
+        self._sobreposicoes[tipo] = resultado
+        return resultado
+
+    def pares_sobrepostos(self, tipo=None, limite=20):
+        """Pares de arquivos com mais valores em comum, com a similaridade de Jaccard."""
+        compartilhados, jaccard = self.sobreposicao(tipo)
+        linhas, colunas = np.triu_indices(len(self.arquivos), 1)
+        comuns = compartilhados.to_numpy()[linhas, colunas]
+        ordem = np.argsort(-comuns, kind="stable")[:limite]
+        ordem = ordem[comuns[ordem] > 0]
+        return pd.DataFrame({
+            "arquivo_a": [self.arquivos[i] for i in linhas[ordem].tolist()],
+            "arquivo_b": [self.arquivos[i] for i in colunas[ordem].tolist()],
+            "compartilhados": comuns[ordem],
+            "jaccard": jaccard.to_numpy()[linhas[ordem], colunas[ordem]],
+        })
@@ -0,0 +1,156 @@
+# instrumentacao.py
+
+import io
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+# --- Medição por Etapa ---
+
+CONTADORES = ["linhas", "celulas", "registros"]
+COLUNAS_ETAPAS = ["arquivo", "etapa", "segundos", "linhas", "linhas_por_s", "celulas", "registros", "rss_mib",
+                  "aumento_rss_mib"]
+
+
+def rss_atual_mib():
+    """
+    Memória residente atual do processo em MiB: psutil, se instalado, ou /proc/self/statm (Linux).
+    None se não houver como medir (ex: Windows sem psutil). O pico do processo (ru_maxrss) não serve:
+    num servidor ou num processo do pool que lê vários arquivos ele só cresce.
+    """
+    if psutil is not None:
+        return round(psutil.Process().memory_info().rss / 1024 ** 2, 1)
+    try:
+        with open("/proc/self/statm") as f:
+            paginas = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(paginas * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2, 1)
+
+
+class MedidorEtapas:
+    """
+    Tempo e contadores acumulados por etapa (ex: cabeçalho, leitura, normalização).
+    Etapas aninhadas não contam duas vezes: o tempo de uma etapa interna é descontado da externa,
+    de modo que a soma das etapas é o tempo total medido. A memória é amostrada no início e no fim
+    de cada medição: "rss_mib" é a maior RSS vista ao fim da etapa e "aumento_rss_mib", o maior
+    aumento dentro de uma medição (amostras, não o pico real). Só guarda dicionários simples, para
+    atravessar o pool de processos junto com o resultado do arquivo.
+    """
+
+    def __init__(self):
+        self.etapas = {}
+        self._internas = []  # tempo das etapas internas, por nível de aninhamento
+
+    @contextmanager
+    def medir(self, etapa, **contadores):
+        self._internas.append(0.0)
+        rss_inicio = rss_atual_mib()
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            total = time.perf_counter() - inicio
+            internas = self._internas.pop()
+            if self._internas:
+                self._internas[-1] += total
+            self.somar(etapa, total - internas, rss_inicio=rss_inicio, **contadores)
+
+    def somar(self, etapa, segundos=0.0, rss_inicio=None, **contadores):
+        atual = self.etapas.setdefault(etapa, {"segundos": 0.0, **{c: 0 for c in CONTADORES},
+                                               "rss_mib": None, "aumento_rss_mib": None})
+        atual["segundos"] += segundos
+        for contador, valor in contadores.items():
+            atual[contador] += int(valor)
+        rss = rss_atual_mib()
+        if rss is not None:
+            atual["rss_mib"] = max(atual["rss_mib"] or 0.0, rss)
+            if rss_inicio is not None:
+                atual["aumento_rss_mib"] = round(max(atual["aumento_rss_mib"] or 0.0, rss - rss_inicio), 1)
+
+    def contar(self, etapa, **contadores):
+        """Soma contadores a uma etapa sem medir tempo (ex: registros emitidos pela normalização)."""
+        self.somar(etapa, 0.0, **contadores)
+
+    def linhas(self, arquivo=None):
+        """Uma linha por etapa, na ordem em que foram medidas pela primeira vez."""
+        return [{"arquivo": arquivo, "etapa": etapa, **valores, "segundos": round(valores["segundos"], 4)}
+                for etapa, valores in self.etapas.items()]
+
+
+def tabela_etapas(linhas):
+    """DataFrame de resumo das medições (uma linha por arquivo e etapa), com a vazão em linhas/s."""
+    df = pd.DataFrame(linhas).reindex(columns=COLUNAS_ETAPAS)
+    segundos = df["segundos"].astype(float)
+    df["linhas_por_s"] = (df["linhas"] / segundos.where(segundos > 0)).where(df["linhas"] > 0).round(0)
+    df["segundos"] = segundos.round(3)
+    return df
+
+
+# --- Log de Execuções ---
+
+CAMINHO_LOG_EXECUCOES = os.path.join("logs", "execucoes.jsonl")
+
+
+def registrar_execucao(registro, caminho=CAMINHO_LOG_EXECUCOES):
+    """Acrescenta uma linha JSON com os dados da execução (auditoria e planejamento de capacidade)."""
+    pasta = os.path.dirname(caminho)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    registro = {"data": datetime.now().isoformat(timespec="seconds"), **registro}
+    with open(caminho, "a", encoding="utf-8") as f:
+        f.write(json.dumps(registro, ensure_ascii=False, default=str) + "\n")
+    return registro
+
+
+# --- Perfil de Execução (opcional) ---
+
+MOTORES_PERFIL = ["cProfile"] + (["pyinstrument"] if pyinstrument is not None else [])
+
+
+class Perfilador:
+    """
+    Captura de perfil do processo atual com cProfile ou pyinstrument (se instalado), ligada e
+    desligada explicitamente em volta de um trecho. No modo paralelo só o processo principal é perfilado.
+    """
+
+    def __init__(self, motor="cProfile"):
+        if motor not in MOTORES_PERFIL:
+            raise ValueError(f"Motor de perfil indisponível: {motor}")
+        self.motor = motor
+        if motor == "pyinstrument":
+            self._perfil = pyinstrument.Profiler()
+        else:
+            import cProfile
+            self._perfil = cProfile.Profile()
+
+    def iniciar(self):
+        if self.motor == "pyinstrument":
+            self._perfil.start()
+        else:
+            self._perfil.enable()
+
+    def parar(self, linhas=40):
+        """Encerra a captura e devolve o relatório em texto (as `linhas` funções mais custosas no cProfile)."""
+        if self.motor == "pyinstrument":
+            self._perfil.stop()
+            return self._perfil.output_text(unicode=True)
+        import pstats
+        self._perfil.disable()
+        saida = io.StringIO()
+        pstats.Stats(self._perfil, stream=saida).sort_stats("cumulative").print_stats(linhas)
+        return saida.getvalue()
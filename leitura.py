@@ -0,0 +1,335 @@
+# leitura.py
+
+import codecs
+import csv
+import io
+import re
+from collections import Counter, namedtuple
+from contextlib import ExitStack, contextmanager
+from itertools import chain, islice
+
+import pandas as pd
+
+from instrumentacao import MedidorEtapas
+
+try:
+    from python_calamine import CalamineWorkbook
+    MOTOR_XLSX = "calamine"
+except ImportError:
+    CalamineWorkbook = None
+    MOTOR_XLSX = "openpyxl"
+
+# --- Leitura de Planilhas ---
+
+MAX_LINHAS_CABECALHO = 15
+LINHAS_AMOSTRA = 10           # linhas de dados avaliadas abaixo de cada candidato
+BYTES_AMOSTRA = 64 * 1024     # amostra inicial usada na prévia de arquivos CSV
+
+DialetoCSV = namedtuple("DialetoCSV", ["delimitador", "aspas", "codificacao"])
+# Tratamento de bytes inválidos na leitura em utf-8: a codificação vem só da amostra inicial, e um
+# arquivo em cp1252 com acentos apenas mais abaixo (ou que mistura as duas) não pode falhar no meio
+ERROS_UTF8 = "cp1252_reserva"
+
+
+def _reserva_cp1252(erro):
+    if isinstance(erro, UnicodeDecodeError):
+        return erro.object[erro.start:erro.end].decode("cp1252", errors="replace"), erro.end
+    raise erro
+
+
+codecs.register_error(ERROS_UTF8, _reserva_cp1252)
+
+
+def motor_excel(filename):
+    """Motor do pandas adequado à extensão do arquivo Excel."""
+    if filename.lower().endswith(".xlsx"):
+        return 'openpyxl'
+    elif filename.lower().endswith(".xls"):
+        return 'xlrd'
+    return None
+
+
+def _celula_vazia(valor):
+    return valor is None or pd.isna(valor) or not str(valor).strip()
+
+
+def detectar_cabecalho(linhas, max_linhas=MAX_LINHAS_CABECALHO):
+    """
+    Escolhe a linha de cabeçalho entre as primeiras linhas brutas já lidas (lista de listas).
+    Cabeçalho costuma ter poucas colunas vazias e nomes significativos.
+    """
+    # Largura da tabela: maior linha da prévia, ignorando células vazias à direita
+    larguras = []
+    for linha in linhas:
+        largura = len(linha)
+        while largura and _celula_vazia(linha[largura - 1]):
+            largura -= 1
+        larguras.append(largura)
+    largura_tabela = max(larguras, default=0)
+    if largura_tabela < 2:
+        return 0
+
+    for i, linha in enumerate(linhas[:max_linhas]):
+        nomes = [str(c) for c in linha[:largura_tabela] if not _celula_vazia(c)]
+        unnamed_count = largura_tabela - len(nomes) + sum(1 for c in nomes if "unnamed" in c.lower())
+        if unnamed_count < largura_tabela // 1.5:
+            return i
+    return 0
+
+
+def _nomes_colunas(linha):
+    """Nomes de colunas como o pandas gera com header=n (Unnamed: i e sufixos .1, .2 para repetidos)."""
+    nomes, vistos = [], {}
+    for i, valor in enumerate(linha):
+        nome = f"Unnamed: {i}" if _celula_vazia(valor) else str(valor)
+        if nome in vistos:
+            vistos[nome] += 1
+            base, nome = nome, f"{nome}.{vistos[nome]}"
+            while nome in vistos:
+                vistos[base] += 1
+                nome = f"{base}.{vistos[base]}"
+        vistos.setdefault(nome, 0)
+        nomes.append(nome)
+    return nomes
+
+
+def _detectar_delimitador(texto, candidatos=",;\t|"):
+    """
+    Delimitador mais consistente na amostra: o que aparece o mesmo número de vezes
+    no maior número de linhas (linhas de título antes do cabeçalho não atrapalham).
+    """
+    linhas = [l for l in texto.splitlines() if l.strip()]
+    melhor, melhor_pontos = ",", (0, 0)
+    for candidato in candidatos:
+        contagens = [l.count(candidato) for l in linhas]
+        frequencias = Counter(c for c in contagens if c > 0)
+        if not frequencias:
+            continue
+        quantidade, linhas_iguais = max(frequencias.items(), key=lambda item: (item[1], item[0]))
+        if (linhas_iguais, quantidade) > melhor_pontos:
+            melhor, melhor_pontos = candidato, (linhas_iguais, quantidade)
+    return melhor
+
+
+def _detectar_aspas(texto, delimitador):
+    """Caractere de aspas mais usado para delimitar campos inteiros na amostra."""
+    d = re.escape(delimitador)
+    contagens = {
+        q: len(re.findall(rf"(?:^|{d})\s*{q}[^{q}\n]*{q}\s*(?:{d}|$)", texto, re.MULTILINE))
+        for q in ('"', "'")
+    }
+    return "'" if contagens["'"] > contagens['"'] else '"'
+
+
+def _detectar_codificacao(amostra, completa):
+    """utf-8 (com ou sem BOM), cp1252 ou latin-1, nesta ordem de preferência."""
+    if amostra.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    for codificacao in ("utf-8", "cp1252"):
+        try:
+            # Decodificador incremental: a amostra pode terminar no meio de um caractere
+            codecs.getincrementaldecoder(codificacao)().decode(amostra, final=completa)
+            return codificacao
+        except UnicodeDecodeError:
+            continue
+    return "latin-1"
+
+
+def _erros_codificacao(codificacao):
+    """Tratamento de erros de decodificação para o read_csv (ver ERROS_UTF8)."""
+    return ERROS_UTF8 if codificacao.startswith("utf-8") else "strict"
+
+
+def _amostra_texto(file, codificacao=None):
+    """Lê a amostra inicial do arquivo e devolve (texto com linhas completas, codificação)."""
+    file.seek(0)
+    amostra = file.read(BYTES_AMOSTRA)
+    file.seek(0)
+    if isinstance(amostra, str):
+        return amostra, codificacao or "utf-8"
+    completa = len(amostra) < BYTES_AMOSTRA
+    codificacao = codificacao or _detectar_codificacao(amostra, completa)
+    texto = amostra.decode(codificacao, errors="ignore")
+    if not completa:
+        # Descarta a última linha, possivelmente cortada no meio
+        texto = texto[:texto.rfind("\n") + 1] or texto
+    return texto, codificacao
+
+
+def detectar_dialeto(file):
+    """Detecta delimitador, aspas e codificação de um CSV a partir de uma pequena amostra de bytes."""
+    texto, codificacao = _amostra_texto(file)
+    delimitador = _detectar_delimitador(texto)
+    return DialetoCSV(delimitador, _detectar_aspas(texto, delimitador), codificacao)
+
+
+def descrever_dialeto(dialeto):
+    """Texto curto para exibir o dialeto detectado ao lado do arquivo."""
+    delimitador = {"\t": "TAB", " ": "espaço"}.get(dialeto.delimitador, dialeto.delimitador)
+    return f"separador `{delimitador}` · aspas `{dialeto.aspas}` · {dialeto.codificacao}"
+
+
+def _previa_csv(file, dialeto, max_linhas):
+    """Linhas brutas do início do CSV, lidas uma vez a partir da amostra."""
+    texto, _ = _amostra_texto(file, dialeto.codificacao)
+    leitor = csv.reader(io.StringIO(texto), delimiter=dialeto.delimitador, quotechar=dialeto.aspas)
+    return list(islice(leitor, max_linhas + LINHAS_AMOSTRA))
+
+
+def _ler_csv(file, dialeto, header_row):
+    """Leitura completa com o motor C, a partir da linha de cabeçalho (o mesmo da leitura em blocos)."""
+    file.seek(0)
+    # No motor C, skiprows conta registros lógicos (incluindo linhas em branco), como o csv.reader
+    return pd.read_csv(file, engine="c", skiprows=header_row, header=0, dtype=str, encoding=dialeto.codificacao,
+                       encoding_errors=_erros_codificacao(dialeto.codificacao), sep=dialeto.delimitador,
+                       quotechar=dialeto.aspas)
+
+
+def ler_planilha(file, filename, max_linhas=MAX_LINHAS_CABECALHO, dialeto=None, aba=None):
+    """
+    Lê a planilha inteira como texto, detectando o cabeçalho sem reabrir o arquivo a cada tentativa.
+    CSV: a prévia vem de uma amostra inicial e a leitura completa começa direto no cabeçalho.
+    Excel: a aba (a primeira, se não informada) é lida uma única vez sem cabeçalho e o cabeçalho
+    é escolhido em memória.
+    """
+    if filename.lower().endswith(".csv"):
+        dialeto = dialeto or detectar_dialeto(file)
+        header_row = detectar_cabecalho(_previa_csv(file, dialeto, max_linhas), max_linhas)
+        return _ler_csv(file, dialeto, header_row)
+
+    file.seek(0)
+    bruto = pd.read_excel(file, sheet_name=aba if aba is not None else 0, header=None, dtype=str,
+                          engine=motor_excel(filename))
+    if bruto.empty:
+        return bruto
+    previa = bruto.head(max_linhas + LINHAS_AMOSTRA).values.tolist()
+    header_row = detectar_cabecalho(previa, max_linhas)
+    df = bruto.iloc[header_row + 1:].reset_index(drop=True)
+    df.columns = _nomes_colunas(bruto.iloc[header_row].tolist())
+    return df
+
+
+# --- Leitura em Blocos (memória limitada) ---
+
+TAMANHO_BLOCO = 200_000  # linhas por bloco na leitura em streaming
+
+# Valores que o pandas trata como nulos por padrão ao ler planilhas
+VALORES_NULOS = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"
+}
+
+
+def _texto_celula_excel(valor):
+    """Converte uma célula lida pelo openpyxl como o pd.read_excel(dtype=str) faria."""
+    if valor is None:
+        return None
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    texto = str(valor)
+    return None if texto in VALORES_NULOS else texto
+
+
+# --- Abas de Pastas Excel ---
+
+
+def listar_abas(file, filename):
+    """
+    Nomes das abas de dados de uma pasta Excel, lidos do índice da pasta sem carregar as células
+    (None para CSV). Abas de gráfico ficam de fora; abas ocultas são incluídas.
+    """
+    nome = filename.lower()
+    file.seek(0)
+    if nome.endswith(".xlsx"):
+        if CalamineWorkbook is not None:
+            return list(CalamineWorkbook.from_filelike(file).sheet_names)
+        from openpyxl import load_workbook
+        pasta = load_workbook(file, read_only=True)
+        try:
+            return [aba.title for aba in pasta.worksheets]
+        finally:
+            pasta.close()
+    if nome.endswith(".xls"):
+        return list(pd.ExcelFile(file, engine="xlrd").sheet_names)
+    return None
+
+
+def nome_fonte(nome_arquivo, aba=None):
+    """Nome da fonte lógica gravado na coluna 'arquivo': o arquivo, ou "arquivo [aba]" para cada aba."""
+    return nome_arquivo if aba is None else f"{nome_arquivo} [{aba}]"
+
+
+@contextmanager
+def _abrir_aba_xlsx(file, aba=None):
+    """
+    (linhas, largura) de uma aba do XLSX (a primeira, se não informada), lida em sequência:
+    calamine quando instalado (leitor nativo, bem mais rápido) ou openpyxl em modo read_only.
+    """
+    file.seek(0)
+    if CalamineWorkbook is not None:
+        pasta = CalamineWorkbook.from_filelike(file)
+        planilha = pasta.get_sheet_by_index(0) if aba is None else pasta.get_sheet_by_name(aba)
+        yield planilha.iter_rows(), planilha.width
+        return
+    from openpyxl import load_workbook
+    pasta = load_workbook(file, read_only=True, data_only=True)
+    try:
+        planilha = pasta.worksheets[0] if aba is None else pasta[aba]
+        yield planilha.iter_rows(values_only=True), planilha.max_column or 0
+    finally:
+        pasta.close()
+
+
+def _blocos_xlsx(file, max_linhas, tamanho_bloco, medidor, aba=None):
+    """Lê uma aba do XLSX linha a linha, sem montar a pasta inteira em memória."""
+    with ExitStack() as pilha:
+        with medidor.medir("cabecalho"):
+            linhas, largura = pilha.enter_context(_abrir_aba_xlsx(file, aba))
+            previa = [[_texto_celula_excel(v) for v in linha] for linha in islice(linhas, max_linhas + LINHAS_AMOSTRA)]
+            if not previa:
+                return
+            header_row = detectar_cabecalho(previa, max_linhas)
+        largura = max(largura, max(len(l) for l in previa))
+        colunas = _nomes_colunas(previa[header_row] + [None] * (largura - len(previa[header_row])))
+
+        def _bloco(dados):
+            dados = [linha + [None] * (largura - len(linha)) if len(linha) < largura else linha[:largura] for linha in dados]
+            return pd.DataFrame(dados, columns=colunas, dtype=object)
+
+        restantes = chain(previa[header_row + 1:], ([_texto_celula_excel(v) for v in linha] for linha in linhas))
+        dados = list(islice(restantes, tamanho_bloco))
+        yield _bloco(dados)
+        while len(dados) == tamanho_bloco:
+            dados = list(islice(restantes, tamanho_bloco))
+            if dados:
+                yield _bloco(dados)
+
+
+def ler_planilha_em_blocos(file, filename, max_linhas=MAX_LINHAS_CABECALHO, dialeto=None, tamanho_bloco=TAMANHO_BLOCO,
+                           medidor=None, aba=None):
+    """
+    Gera a planilha (ou a `aba` informada de uma pasta Excel) em DataFrames de até `tamanho_bloco`
+    linhas, com as mesmas colunas e valores de ler_planilha, para que cada bloco seja processado e
+    descartado em seguida. O tempo de detecção do dialeto e do cabeçalho é registrado como etapa
+    "cabecalho" no `medidor`.
+    """
+    medidor = medidor or MedidorEtapas()
+    nome = filename.lower()
+    if nome.endswith(".csv"):
+        with medidor.medir("cabecalho"):
+            dialeto = dialeto or detectar_dialeto(file)
+            header_row = detectar_cabecalho(_previa_csv(file, dialeto, max_linhas), max_linhas)
+        file.seek(0)
+        # O pyarrow não lê em blocos; o motor C mantém a memória proporcional ao bloco
+        yield from pd.read_csv(
+            file, engine="c", skiprows=header_row, header=0, dtype=str, chunksize=tamanho_bloco,
+            encoding=dialeto.codificacao, encoding_errors=_erros_codificacao(dialeto.codificacao),
+            sep=dialeto.delimitador, quotechar=dialeto.aspas
+        )
+    elif nome.endswith(".xlsx"):
+        yield from _blocos_xlsx(file, max_linhas, tamanho_bloco, medidor, aba)
+    else:
+        # .xls (xlrd) não tem leitura incremental: lê uma vez e entrega em fatias
+        df = ler_planilha(file, filename, max_linhas, aba=aba)
+        for inicio in range(0, max(len(df), 1), tamanho_bloco):
+            yield df.iloc[inicio:inicio + tamanho_bloco]
@@ -0,0 +1,719 @@
+# normalizacao.py
+
+import re
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+# --- Funções Aprimoradas para Normalização ---
+
+def _limpar_valor_excel(valor):
+    """Remove sufixos de float (.0), trata notação científica e espaços de valores vindos do Excel."""
+    if pd.isna(valor): return ""
+    v_str = str(valor).strip()
+
+    # Se parecer número (incluindo notação científica), converter para inteiro e depois string
+    if re.match(r'^-?\d+(\.\d+)?([eE][-+]?\d+)?$', v_str):
+        try:
+            return '{:.0f}'.format(float(valor))
+        except (ValueError, TypeError):
+            pass
+
+    if v_str.endswith('.0'): v_str = v_str[:-2]
+    return v_str
+
+def normalizar_telefone(numero, strict=False):
+    """
+    Normaliza números de telefone com foco no padrão brasileiro e lida com o 9º dígito.
+    """
+    v_limpo = _limpar_valor_excel(numero)
+    if not v_limpo: return None, None
+
+    # Remove tudo que não é dígito
+    numero_limpo = re.sub(r"[^\d]", "", v_limpo)
+
+    if not numero_limpo or len(numero_limpo) < 8:
+        return None, None
+
+    # NOVO: Filtro para números de centrais/inválidos (ex: 00000000, 11111111)
+    # Se todos os dígitos forem iguais, ignora
+    if len(set(numero_limpo)) == 1:
+        return None, None
+
+    # Remove prefixo 0 inicial se houver
+    if numero_limpo.startswith("0") and len(numero_limpo) > 10:
+        numero_limpo = numero_limpo[1:]
+
+    # Remove prefixo 55 (Brasil) se houver
+    if numero_limpo.startswith("55") and len(numero_limpo) >= 12:
+        numero_limpo = numero_limpo[2:]
+
+    # Casos de números nacionais (com DDD)
+    if 10 <= len(numero_limpo) <= 11:
+        # Se tem 10 dígitos, avaliar se deve adicionar o 9 (celular)
+        if len(numero_limpo) == 10:
+            ddd = numero_limpo[:2]
+            prefixo = numero_limpo[2]
+            # No Brasil, celulares começam com 6, 7, 8 ou 9
+            if prefixo in ['6', '7', '8', '9']:
+                numero_normalizado = "+55" + ddd + "9" + numero_limpo[2:]
+                return numero_normalizado, "média"
+            else:
+                return "+55" + numero_limpo, "alta"
+
+        # Se tem 11 dígitos, verificar se o 9 está no lugar certo
+        if len(numero_limpo) == 11:
+            if numero_limpo[2] == '9':
+                return "+55" + numero_limpo, "alta"
+            else:
+                return "+55" + numero_limpo, "baixa"
+
+    # Números curtos (sem DDD) - menos confiáveis para cruzamento
+    elif 8 <= len(numero_limpo) <= 9:
+        if len(numero_limpo) == 8:
+            # Tentar normalizar para 9 dígitos se for celular
+            if numero_limpo[0] in ['6', '7', '8', '9']:
+                return "9" + numero_limpo, "baixa"
+        return numero_limpo, "baixa"
+
+    # Fallback para outros formatos (pode ser internacional)
+    if len(numero_limpo) > 11 and not strict:
+        return "+" + numero_limpo, "baixa"
+
+    return None, None
+
+
+def normalizar_imei(imei, strict=False):
+    """
+    Normaliza IMEIs lidando com conversões de float do Excel.
+    """
+    v_limpo = _limpar_valor_excel(imei)
+    if not v_limpo: return None, None
+
+    imei_limpo = re.sub(r'\D', '', v_limpo)
+
+    if not imei_limpo:
+        return None, None
+
+    # Alta confiança: IMEI padrão de 15 dígitos
+    if len(imei_limpo) == 15:
+        return imei_limpo, "alta"
+
+    # Média confiança: próximo do padrão IMEI (14 ou 16 dígitos)
+    elif 14 <= len(imei_limpo) <= 16:
+        return imei_limpo[:15], "média"
+
+    # Baixa confiança: potencialmente um IMEI, mas formato não padrão
+    elif len(imei_limpo) >= 8 and not strict:
+        return imei_limpo, "baixa"
+
+    return None, None
+
+
+def normalizar_email(email, strict=False):
+    """
+    Normaliza endereços de e-mail com diferentes níveis de rigor.
+    """
+    if pd.isna(email): return None, None
+
+    email_str = str(email).strip().lower()
+
+    if not email_str:
+        return None, None
+
+    # Alta confiança: formato de e-mail padrão
+    if '@' in email_str and '.' in email_str.split('@', 1)[1]:
+        local, domain = email_str.split('@', 1)
+        local = local.split('+')[0]  # Remove parte após + (comum em e-mails Gmail)
+        return f"{local}@{domain}", "alta"
+
+    # Média confiança: contém @ mas formato não totalmente padrão
+    elif '@' in email_str:
+        return email_str, "média"
+
+    # Baixa confiança: potencialmente um e-mail, mas formato incomum
+    elif not strict and ('.' in email_str or len(email_str) >= 5):
+        return email_str, "baixa"
+
+    return None, None
+
+
+def normalizar_hash(h, strict=False):
+    """
+    Normaliza hashes com diferentes níveis de rigor.
+    """
+    if pd.isna(h): return None, None
+
+    h_str = str(h).strip().lower()
+
+    if not h_str:
+        return None, None
+
+    # Alta confiança: formato de hash hexadecimal padrão
+    if re.fullmatch(r'[0-9a-f]{32,128}', h_str):
+        return h_str, "alta"
+
+    # Média confiança: aparenta ser hash mas não segue padrão exato
+    elif re.fullmatch(r'[0-9a-f]{16,}', h_str):
+        return h_str, "média"
+
+    # Baixa confiança: potencialmente um hash ou identificador
+    elif not strict and re.search(r'[0-9a-f]{8,}', h_str):
+        return h_str, "baixa"
+
+    return None, None
+
+
+def normalizar_id_localizacao(id_str, strict=False):
+    """
+    Normaliza IDs de localização com diferentes níveis de rigor.
+    """
+    if pd.isna(id_str): return None, None
+
+    id_clean = str(id_str).strip().upper()
+
+    if not id_clean:
+        return None, None
+
+    # Alta confiança: ID formatado normalmente
+    if len(id_clean) >= 4:
+        return id_clean, "alta"
+
+    # Média/Baixa confiança: potencialmente um ID, mas curto
+    elif not strict and len(id_clean) > 0:
+        return id_clean, "baixa"
+
+    return None, None
+
+
+NORMALIZADORES = {
+    "telefone": normalizar_telefone,
+    "imei": normalizar_imei,
+    "email": normalizar_email,
+    "hash": normalizar_hash,
+    "id_localizacao": normalizar_id_localizacao
+}
+
+# --- Normalização Vetorizada (coluna inteira) ---
+# Cada função abaixo recebe uma coluna (Series) e devolve duas Series alinhadas ao
+# mesmo índice: valores normalizados e confianças, com None onde a versão escalar
+# devolveria (None, None). As funções escalares acima continuam sendo a referência.
+#
+# Telefone e IMEI dependem apenas dos dígitos de _limpar_valor_excel(valor), que são
+# extraídos de uma matriz de códigos UCS-4 (uma linha por célula) com operações NumPy.
+# Células fora do caminho rápido (não ASCII ou maiores que _LARGURA) usam a função
+# escalar de referência.
+
+_LARGURA = 32
+_BLOCO = 100_000
+
+_RE_NUMERICO = re.compile(r'-?\d+(\.\d+)?([eE][-+]?\d+)?')
+_RE_HASH_ALTA = re.compile(r'[0-9a-f]{32,128}')
+_RE_HASH_MEDIA = re.compile(r'[0-9a-f]{16,}')
+_RE_HASH_BAIXA = re.compile(r'[0-9a-f]{8,}')
+
+_ZERO, _CINCO, _SEIS, _NOVE = (ord(c) for c in "0569")
+_SIMBOLOS_NUMERICOS = np.array([ord(c) for c in ".eE+-"], dtype=np.uint32)
+
+
+def _como_texto(serie):
+    """Devolve str(valor) de cada célula num array de objetos ("" para nulos)."""
+    nulos = serie.isna().to_numpy()
+    texto = serie.to_numpy(dtype=object, copy=True)
+    texto[nulos] = ""
+    return np.array([v if type(v) is str else str(v) for v in texto], dtype=object)
+
+
+def _matriz(textos, largura=_LARGURA):
+    """Converte textos (até `largura` caracteres) numa matriz de códigos UCS-4."""
+    return np.array(textos, dtype=f"<U{largura}").view(np.uint32).reshape(len(textos), largura)
+
+
+def _texto_da_matriz(codigos, prefixo=""):
+    """Converte linhas de códigos UCS-4 (preenchidas com zero) em strings, com prefixo opcional."""
+    if prefixo:
+        largura = len(prefixo) + codigos.shape[1]
+        completa = np.zeros((codigos.shape[0], largura), dtype=np.uint32)
+        completa[:, :len(prefixo)] = [ord(c) for c in prefixo]
+        completa[:, len(prefixo):] = codigos
+        codigos = completa
+    codigos = np.ascontiguousarray(codigos)
+    return codigos.view(f"<U{codigos.shape[1]}").ravel().astype(object)
+
+
+def _deslocar(codigos, n):
+    """Remove os n primeiros caracteres de cada linha."""
+    saida = np.zeros_like(codigos)
+    saida[:, :-n] = codigos[:, n:]
+    return saida
+
+
+def _formatar_sem_decimais(numeros):
+    """Equivalente vetorizado de '{:.0f}'.format(x) para um array float64."""
+    arredondados = np.rint(numeros)
+    saida = np.empty(len(numeros), dtype=object)
+    seguros = np.isfinite(arredondados) & (np.abs(arredondados) < 2.0 ** 63)
+    saida[seguros] = arredondados[seguros].astype(np.int64).astype(str)
+    # '{:.0f}' preserva o sinal de zeros negativos (ex: -0.4 -> "-0")
+    saida[seguros & (arredondados == 0) & np.signbit(arredondados)] = "-0"
+    restantes = ~seguros
+    if restantes.any():
+        saida[restantes] = ['{:.0f}'.format(v) for v in numeros[restantes]]
+    return saida
+
+
+def _digitos_excel(textos):
+    """
+    Dígitos de _limpar_valor_excel(valor) para cada texto, como matriz de códigos.
+    Devolve (codigos, tamanhos, escalar): linhas marcadas em `escalar` devem ser
+    resolvidas pela função escalar de referência.
+    """
+    limpos = np.array([t.strip() for t in textos], dtype=object)
+    tamanhos = np.fromiter(map(len, limpos), dtype=np.int64, count=len(limpos))
+    escalar = tamanhos > _LARGURA
+    limpos[escalar] = ""
+    tamanhos[escalar] = 0
+
+    # Largura da matriz ajustada ao maior texto do bloco (mínimo para o resultado do float)
+    largura = max(int(tamanhos.max(initial=0)), 20)
+    codigos = _matriz(limpos, largura)
+    pos = np.arange(largura)
+    dentro = pos < tamanhos[:, None]
+    # Não ASCII (dígitos Unicode) e NUL embutido ficam com a referência escalar
+    escalar |= (((codigos > 127) | (codigos == 0)) & dentro).any(axis=1)
+    dentro[escalar] = False
+    tamanhos[escalar] = 0
+
+    digito = (codigos >= _ZERO) & (codigos <= _NOVE)
+    preenchido = tamanhos > 0
+    so_digitos = preenchido & (digito | ~dentro).all(axis=1)
+
+    # Notação científica e decimais: confirmar com a mesma regex da versão escalar
+    talvez = preenchido & ~so_digitos & (digito | np.isin(codigos, _SIMBOLOS_NUMERICOS) | ~dentro).all(axis=1)
+    idx = np.flatnonzero(talvez)
+    casa = np.fromiter((_RE_NUMERICO.fullmatch(s) is not None for s in limpos[idx]), dtype=bool, count=len(idx))
+    via_float = np.zeros(len(limpos), dtype=bool)
+    via_float[idx[casa]] = True
+    # Inteiros com mais de 15 dígitos perdem precisão no float, como na versão escalar
+    via_float |= so_digitos & (tamanhos > 15)
+    inteiros = so_digitos & ~via_float
+    texto_livre = preenchido & ~so_digitos & ~via_float
+
+    # Inteiros exatos: '{:.0f}'.format(float(v)) apenas remove zeros à esquerda
+    zeros_esq = np.argmax((codigos != _ZERO) | ~dentro, axis=1)
+    zeros_esq = np.minimum(zeros_esq, tamanhos - 1)
+    dentro[inteiros] &= pos >= zeros_esq[inteiros, None]
+
+    # Texto livre: remove o sufixo ".0" antes de extrair os dígitos
+    linhas = np.arange(len(limpos))
+    penultimo = codigos[linhas, np.maximum(tamanhos - 2, 0)]
+    ultimo = codigos[linhas, np.maximum(tamanhos - 1, 0)]
+    sufixo = texto_livre & (tamanhos >= 2) & (penultimo == ord(".")) & (ultimo == _ZERO)
+    dentro[sufixo] &= pos < (tamanhos[sufixo, None] - 2)
+
+    manter = digito & dentro
+    ordem = np.argsort(~manter, axis=1, kind="stable")
+    codigos = np.take_along_axis(codigos, ordem, axis=1)
+    tamanhos = manter.sum(axis=1)
+    codigos[pos >= tamanhos[:, None]] = 0
+
+    if via_float.any():
+        brutos = limpos[via_float]
+        try:
+            numeros = brutos.astype(np.float64)
+        except (ValueError, TypeError):
+            numeros = np.array([float(v) for v in brutos], dtype=np.float64)
+        # Resultado é "-?\d+" ou "-?inf"; somente os dígitos interessam
+        formatados = np.array([f.lstrip("-") if f[-1] != "f" else "" for f in _formatar_sem_decimais(numeros)], dtype=object)
+        tam_float = np.fromiter(map(len, formatados), dtype=np.int64, count=len(formatados))
+        longos = tam_float > largura
+        formatados[longos] = ""
+        tam_float[longos] = 0
+        codigos[via_float] = _matriz(formatados, largura)
+        tamanhos[via_float] = tam_float
+        escalar[np.flatnonzero(via_float)[longos]] = True
+
+    return codigos, tamanhos, escalar
+
+
+def _regra_telefone(codigos, tamanhos, strict):
+    """Aplica as regras de normalizar_telefone sobre a matriz de dígitos."""
+    n = len(tamanhos)
+    valores = np.full(n, None, dtype=object)
+    confiancas = np.full(n, None, dtype=object)
+    pos = np.arange(codigos.shape[1])
+
+    # Mínimo de 8 dígitos e descarte de números com todos os dígitos iguais
+    iguais = ((codigos == codigos[:, [0]]) | (pos >= tamanhos[:, None])).all(axis=1)
+    candidatos = (tamanhos >= 8) & ~iguais
+
+    # Remove prefixo 0 inicial e, em seguida, o prefixo 55 (Brasil)
+    sem_zero = candidatos & (codigos[:, 0] == _ZERO) & (tamanhos > 10)
+    codigos[sem_zero] = _deslocar(codigos[sem_zero], 1)
+    tamanhos[sem_zero] -= 1
+    sem_55 = candidatos & (codigos[:, 0] == _CINCO) & (codigos[:, 1] == _CINCO) & (tamanhos >= 12)
+    codigos[sem_55] = _deslocar(codigos[sem_55], 2)
+    tamanhos[sem_55] -= 2
+
+    primeiro, terceiro = codigos[:, 0], codigos[:, 2]
+
+    # 10 dígitos: celular recebe o 9º dígito (média), fixo fica como está (alta)
+    dez = candidatos & (tamanhos == 10)
+    dez_celular = dez & (terceiro >= _SEIS) & (terceiro <= _NOVE)
+    dez_fixo = dez & ~dez_celular
+    if dez_celular.any():
+        com_nove = np.insert(codigos[dez_celular], 2, _NOVE, axis=1)
+        valores[dez_celular] = _texto_da_matriz(com_nove, "+55")
+        confiancas[dez_celular] = "média"
+    valores[dez_fixo] = _texto_da_matriz(codigos[dez_fixo], "+55")
+    confiancas[dez_fixo] = "alta"
+
+    # 11 dígitos: alta se o 9 está no lugar certo
+    onze = candidatos & (tamanhos == 11)
+    valores[onze] = _texto_da_matriz(codigos[onze], "+55")
+    confiancas[onze] = np.where(terceiro[onze] == _NOVE, "alta", "baixa")
+
+    # Números curtos (sem DDD)
+    oito_celular = candidatos & (tamanhos == 8) & (primeiro >= _SEIS) & (primeiro <= _NOVE)
+    curtos = candidatos & ((tamanhos == 8) | (tamanhos == 9)) & ~oito_celular
+    valores[oito_celular] = _texto_da_matriz(codigos[oito_celular], "9")
+    valores[curtos] = _texto_da_matriz(codigos[curtos])
+    confiancas[oito_celular | curtos] = "baixa"
+
+    # Fallback para outros formatos (pode ser internacional)
+    if not strict:
+        longos = candidatos & (tamanhos > 11)
+        valores[longos] = _texto_da_matriz(codigos[longos], "+")
+        confiancas[longos] = "baixa"
+
+    return valores, confiancas
+
+
+def _regra_imei(codigos, tamanhos, strict):
+    """Aplica as regras de normalizar_imei sobre a matriz de dígitos."""
+    n = len(tamanhos)
+    valores = np.full(n, None, dtype=object)
+    confiancas = np.full(n, None, dtype=object)
+
+    padrao = tamanhos == 15
+    proximo = (tamanhos == 14) | (tamanhos == 16)
+    valores[padrao] = _texto_da_matriz(codigos[padrao])
+    confiancas[padrao] = "alta"
+    valores[proximo] = _texto_da_matriz(codigos[proximo, :15])
+    confiancas[proximo] = "média"
+
+    if not strict:
+        outros = (tamanhos >= 8) & ~padrao & ~proximo
+        valores[outros] = _texto_da_matriz(codigos[outros])
+        confiancas[outros] = "baixa"
+
+    return valores, confiancas
+
+
+def _series_resultado(serie, valores, confiancas):
+    return (pd.Series(valores, index=serie.index, dtype=object),
+            pd.Series(confiancas, index=serie.index, dtype=object))
+
+
+def _normalizar_digitos(serie, strict, regra, referencia):
+    """Normaliza uma coluna de telefones/IMEIs em blocos de _BLOCO linhas."""
+    serie = pd.Series(serie)
+    textos = _como_texto(serie)
+    valores = np.full(len(textos), None, dtype=object)
+    confiancas = np.full(len(textos), None, dtype=object)
+
+    for inicio in range(0, len(textos), _BLOCO):
+        fim = min(inicio + _BLOCO, len(textos))
+        codigos, tamanhos, escalar = _digitos_excel(textos[inicio:fim])
+        valores[inicio:fim], confiancas[inicio:fim] = regra(codigos, tamanhos, strict)
+        for i in np.flatnonzero(escalar) + inicio:
+            valores[i], confiancas[i] = referencia(serie.iat[i], strict)
+
+    return _series_resultado(serie, valores, confiancas)
+
+
+def normalizar_coluna_telefone(serie, strict=False):
+    """Versão vetorizada de normalizar_telefone."""
+    return _normalizar_digitos(serie, strict, _regra_telefone, normalizar_telefone)
+
+
+def normalizar_coluna_imei(serie, strict=False):
+    """Versão vetorizada de normalizar_imei."""
+    return _normalizar_digitos(serie, strict, _regra_imei, normalizar_imei)
+
+
+def normalizar_coluna_email(serie, strict=False):
+    """Versão vetorizada de normalizar_email."""
+    serie = pd.Series(serie)
+    emails = np.array([t.strip().lower() for t in _como_texto(serie)], dtype=object)
+    n = len(emails)
+    valores = np.full(n, None, dtype=object)
+    confiancas = np.full(n, None, dtype=object)
+
+    partes = [e.partition("@") for e in emails]
+    com_arroba = np.fromiter((p[1] == "@" for p in partes), dtype=bool, count=n)
+    padrao = np.fromiter(("." in p[2] for p in partes), dtype=bool, count=n) & com_arroba
+
+    # Média confiança: contém @ mas formato não totalmente padrão
+    valores[com_arroba] = emails[com_arroba]
+    confiancas[com_arroba] = "média"
+
+    # Alta confiança: remove parte após + do usuário (comum em e-mails Gmail)
+    valores[padrao] = [p[0].split("+")[0] + "@" + p[2] for p, ok in zip(partes, padrao) if ok]
+    confiancas[padrao] = "alta"
+
+    if not strict:
+        tamanhos = np.fromiter(map(len, emails), dtype=np.int64, count=n)
+        com_ponto = np.fromiter(("." in e for e in emails), dtype=bool, count=n)
+        incomum = (tamanhos > 0) & ~com_arroba & (com_ponto | (tamanhos >= 5))
+        valores[incomum] = emails[incomum]
+        confiancas[incomum] = "baixa"
+
+    return _series_resultado(serie, valores, confiancas)
+
+
+def normalizar_coluna_hash(serie, strict=False):
+    """Versão vetorizada de normalizar_hash."""
+    serie = pd.Series(serie)
+    hashes = np.array([t.strip().lower() for t in _como_texto(serie)], dtype=object)
+    valores = np.full(len(hashes), None, dtype=object)
+    confiancas = np.full(len(hashes), None, dtype=object)
+
+    def _casa(funcao, alvos):
+        return np.fromiter((funcao(h) is not None for h in alvos), dtype=bool, count=len(alvos))
+
+    padrao = _casa(_RE_HASH_ALTA.fullmatch, hashes)
+    aparente = ~padrao
+    aparente[aparente] = _casa(_RE_HASH_MEDIA.fullmatch, hashes[aparente])
+    valores[padrao | aparente] = hashes[padrao | aparente]
+    confiancas[padrao] = "alta"
+    confiancas[aparente] = "média"
+
+    if not strict:
+        possivel = ~padrao & ~aparente
+        possivel[possivel] = _casa(_RE_HASH_BAIXA.search, hashes[possivel])
+        valores[possivel] = hashes[possivel]
+        confiancas[possivel] = "baixa"
+
+    return _series_resultado(serie, valores, confiancas)
+
+
+def normalizar_coluna_id_localizacao(serie, strict=False):
+    """Versão vetorizada de normalizar_id_localizacao."""
+    serie = pd.Series(serie)
+    ids = np.array([t.strip().upper() for t in _como_texto(serie)], dtype=object)
+    tamanhos = np.fromiter(map(len, ids), dtype=np.int64, count=len(ids))
+    valores = np.full(len(ids), None, dtype=object)
+    confiancas = np.full(len(ids), None, dtype=object)
+
+    formatado = tamanhos >= 4
+    valores[formatado] = ids[formatado]
+    confiancas[formatado] = "alta"
+
+    if not strict:
+        curto = (tamanhos > 0) & ~formatado
+        valores[curto] = ids[curto]
+        confiancas[curto] = "baixa"
+
+    return _series_resultado(serie, valores, confiancas)
+
+
+NORMALIZADORES_VETORIZADOS = {
+    "telefone": normalizar_coluna_telefone,
+    "imei": normalizar_coluna_imei,
+    "email": normalizar_coluna_email,
+    "hash": normalizar_coluna_hash,
+    "id_localizacao": normalizar_coluna_id_localizacao
+}
+
+# --- Cache de Valores Distintos ---
+
+class CacheNormalizacao:
+    """
+    Memoriza a normalização de cada valor bruto distinto, por (tipo, strict).
+    A coluna é fatorada com pd.factorize: apenas os valores ainda não vistos passam
+    pelo normalizador vetorizado e o resultado é propagado às células pelos códigos.
+    Compartilhado entre os arquivos lidos em sequência; no pool de processos, cada arquivo
+    tem o seu, e valores repetidos entre arquivos são normalizados em cada um.
+    """
+
+    def __init__(self, max_valores=2_000_000):
+        self.max_valores = max_valores  # limite de valores memorizados por (tipo, strict)
+        self._memoria = {}
+        self.celulas = 0
+        self.normalizados = 0
+
+    def normalizar(self, tipo, serie, strict=False):
+        """Mesmo resultado de NORMALIZADORES_VETORIZADOS[tipo](serie, strict)."""
+        serie = pd.Series(serie)
+        if pd.api.types.infer_dtype(serie, skipna=True) not in ("string", "empty"):
+            # Valores de tipos mistos (ex: 1 e 1.0) seriam unificados pelo factorize
+            texto = serie.to_numpy(dtype=object, copy=True)
+            preenchidos = ~serie.isna().to_numpy()
+            texto[preenchidos] = [str(v) for v in texto[preenchidos]]
+            serie = pd.Series(texto, index=serie.index, dtype=object)
+
+        codigos, distintos = pd.factorize(serie)
+        distintos = np.asarray(distintos, dtype=object)
+        memoria = self._memoria.setdefault((tipo, strict), {})
+        resultados = [memoria.get(v) for v in distintos]
+
+        novos = [i for i, r in enumerate(resultados) if r is None]
+        if novos:
+            valores, confiancas = NORMALIZADORES_VETORIZADOS[tipo](pd.Series(distintos[novos], dtype=object), strict)
+            for i, valor, confianca in zip(novos, valores, confiancas):
+                resultados[i] = memoria[distintos[i]] = (valor, confianca)
+            self._limitar(memoria)
+
+        self.celulas += int((codigos >= 0).sum())
+        self.normalizados += len(novos)
+
+        # Código -1 (nulo) aponta para o último item, que é sempre vazio
+        tabela_valores = np.array([r[0] for r in resultados] + [None], dtype=object)
+        tabela_confiancas = np.array([r[1] for r in resultados] + [None], dtype=object)
+        return _series_resultado(serie, tabela_valores[codigos], tabela_confiancas[codigos])
+
+    def _limitar(self, memoria):
+        """Descarta os valores mais antigos quando o limite é ultrapassado."""
+        excesso = len(memoria) - self.max_valores
+        if excesso > 0:
+            for chave in list(islice(memoria, excesso)):
+                del memoria[chave]
+
+    @property
+    def acertos(self):
+        return self.celulas - self.normalizados
+
+    @property
+    def taxa_acerto(self):
+        return self.acertos / self.celulas if self.celulas else 0.0
+
+    def resumo(self):
+        return (f"Cache de normalização: {self.celulas} células, {self.normalizados} valores distintos normalizados "
+                f"(taxa de acerto {self.taxa_acerto:.1%})")
+
+# --- Mapeamentos de Colunas ---
+
+COLUNA_MAP_HEURISTICO = {
+    "Extratos de ERBs": {
+        "telefone": [
+            "telefone", "fone", "numero", "tel", "terminal", "msisdn", "número", "celular", 
+            "calling", "called", "origem", "destino", "caller", "callee", "dialed", "chamador", "chamado",
+            "a_party", "b_party", "address", "orig", "dest", "v_msisdn_origem", "v_msisdn_destino",
+            "number", "contact", "contato", "phone", "mobile", "movel", "alvo", "interceptado", "interlocutor"
+        ],
+        "imei": [
+            "imei", "terminal id", "terminal_id", "id", "equipamento", "aparelho", "device", "serial",
+            "esn", "meid", "identificador_equipamento", "hardware", "equip"
+        ]
+    },
+    "Dados de Contas Online (Google Location)": {
+        "id_localizacao": ["location id", "obfuscated id", "id", "identifier", "locid", "gaia", "user_id"],
+        "email": [
+            "email", "conta google", "gmail", "conta", "e-mail", "endereco", "endereço", 
+            "login", "user", "username", "usuario", "usuário", "mail", "address", "principal", "recovery"
+        ],
+        "hash": ["hash", "md5", "sha1", "sha256", "sha512", "checksum", "digest"]
+    }
+}
+
+# Tipos de dado cruzados em cada tipo de análise
+ANALYSIS_TYPE_MAPPING = {
+    "Extratos de ERBs": ["telefone", "imei"],
+    "Dados de Contas Online (Google Location)": ["id_localizacao", "email", "hash"]
+}
+
+# --- Extração de Registros ---
+
+COLUNAS_REGISTRO = ["valor", "tipo", "confianca", "arquivo", "valor_original", "coluna_fonte"]
+
+def mapear_colunas(colunas, tipos, map_primario):
+    """Posições das colunas cujo nome contém alguma das palavras-chave de cada tipo de dado."""
+    return {
+        tipo: [i for i, col in enumerate(colunas) if any(k in col.lower() for k in map_primario[tipo])]
+        for tipo in tipos
+    }
+
+
+# --- Classificação de Colunas por Amostragem ---
+
+AMOSTRA_CLASSIFICACAO = 300   # valores preenchidos avaliados por coluna
+PESOS_CONFIANCA = {"alta": 1.0, "média": 0.5, "baixa": 0.2}
+LIMIAR_COM_NOME = 0.2         # nome reconhecido: basta o conteúdo normalizar (mesmo como "baixa")
+LIMIAR_SEM_NOME = 0.6         # nome desconhecido: o conteúdo precisa ser majoritariamente alta/média
+# Normalizadores que aceitam quase qualquer texto: o conteúdo não identifica a coluna, só o nome
+TIPOS_SO_POR_NOME = {"id_localizacao"}
+
+
+def _amostra_coluna(serie, tamanho=AMOSTRA_CLASSIFICACAO):
+    """Até `tamanho` células preenchidas, espaçadas uniformemente ao longo da coluna."""
+    preenchidas = np.flatnonzero(serie.notna().to_numpy() & (serie.to_numpy(dtype=object) != ""))
+    if len(preenchidas) > tamanho:
+        preenchidas = preenchidas[np.linspace(0, len(preenchidas) - 1, tamanho).astype(int)]
+    return serie.iloc[preenchidas]
+
+
+def pontuar_coluna(amostra, tipo, strict=False):
+    """Média dos pesos de confiança obtidos ao normalizar a amostra como `tipo` (0 = nada reconhecido)."""
+    if amostra.empty:
+        return 0.0
+    _, confiancas = NORMALIZADORES_VETORIZADOS[tipo](amostra, strict)
+    return float(confiancas.map(PESOS_CONFIANCA).fillna(0.0).sum()) / len(amostra)
+
+
+def classificar_colunas(df, tipos, map_primario, strict=False):
+    """
+    Escolhe as colunas de cada tipo pelo conteúdo de uma amostra, em vez de varrer a planilha
+    inteira quando nenhum nome é reconhecido. Devolve (posições por tipo, tabela de pontuações).
+    """
+    por_nome = mapear_colunas(df.columns, tipos, map_primario)
+    amostras = [_amostra_coluna(df.iloc[:, i]) for i in range(df.shape[1])]
+    colunas_por_tipo, linhas = {}, []
+    for tipo in tipos:
+        colunas_por_tipo[tipo] = []
+        for i, amostra in enumerate(amostras):
+            nome_confere = i in por_nome[tipo]
+            # Arredondada: a soma de pesos como 0.2 não pode ficar abaixo do limiar por erro de ponto flutuante
+            pontuacao = round(pontuar_coluna(amostra, tipo, strict), 3)
+            if nome_confere:
+                selecionada = pontuacao >= LIMIAR_COM_NOME
+            else:
+                selecionada = tipo not in TIPOS_SO_POR_NOME and pontuacao >= LIMIAR_SEM_NOME
+            if selecionada:
+                colunas_por_tipo[tipo].append(i)
+            linhas.append({"coluna": df.columns[i], "tipo": tipo, "pontuacao": pontuacao,
+                           "nome_reconhecido": nome_confere, "selecionada": selecionada})
+    return colunas_por_tipo, pd.DataFrame(linhas, columns=["coluna", "tipo", "pontuacao", "nome_reconhecido", "selecionada"])
+
+
+def extrair_registros(df, nome_arquivo, colunas_por_tipo, cache, strict=False):
+    """
+    Normaliza as colunas mapeadas de um DataFrame (ou bloco) e devolve um registro por
+    valor encontrado, na ordem linha a linha, tipo e coluna.
+    """
+    partes = []
+    ordem = 0
+    for tipo, posicoes in colunas_por_tipo.items():
+        for i in posicoes:
+            serie = df.iloc[:, i]
+            valores, confiancas = cache.normalizar(tipo, serie, strict)
+            validos = valores.notna().to_numpy()
+            partes.append(pd.DataFrame({
+                "_linha": np.flatnonzero(validos),
+                "_ordem": ordem,
+                "valor": valores[validos].to_numpy(dtype=object),
+                "tipo": tipo,
+                "confianca": confiancas[validos].to_numpy(dtype=object),
+                "arquivo": nome_arquivo,
+                "valor_original": serie[validos].to_numpy(dtype=object),
+                "coluna_fonte": df.columns[i]
+            }))
+            ordem += 1
+
+    if not partes:
+        return pd.DataFrame(columns=COLUNAS_REGISTRO)
+
+    registros = pd.concat(partes, ignore_index=True)
+    registros = registros.sort_values(["_linha", "_ordem"], kind="stable")
+    return registros.drop(columns=["_linha", "_ordem"]).reset_index(drop=True)
@@ -0,0 +1,311 @@
+# processamento.py
+
+import gzip
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import traceback
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+
+from alvos import COLUNA_ALVOS, ListaAlvos, marcar_alvos
+from colocalizacao import AcumuladorEventos, colunas_identificador, extrair_eventos, mapear_colunas_colocalizacao
+from cruzamento import AcumuladorCruzamentos
+from grafo import arestas_mesma_linha, reduzir_arestas_linha
+from instrumentacao import MedidorEtapas
+from leitura import ler_planilha_em_blocos, nome_fonte
+from normalizacao import COLUNAS_REGISTRO, CacheNormalizacao, classificar_colunas, extrair_registros
+from registros import ArmazemRegistros
+
+# --- Processamento por Arquivo ---
+
+COMPRESSAO_REGISTROS = {"method": "gzip", "compresslevel": 1}
+
+
+def _resultado_vazio(fonte, erro=None):
+    """Resultado de um arquivo sem dados: o ponto de partida de processar_arquivo e o de uma falha."""
+    return {"nome": fonte, "estado": None, "registros": ArmazemRegistros(), "arquivo_registros": None,
+            "total_registros": 0, "celulas": 0, "normalizados": 0, "mapeamento": None, "eventos": None,
+            "arestas_linha": None, "etapas": [], "erro": erro, "aviso": None}
+
+
+def processar_arquivo(file, nome_arquivo, tipos, map_primario, strict=False, dialeto=None,
+                      gravar_registros=False, ao_ler_bloco=None, colocalizacao=None,
+                      vinculos_linha=False, aba=None, listas_alvos=None, cache=None):
+    """
+    Lê, normaliza e reduz um arquivo inteiro (ou uma `aba` de uma pasta Excel, gravada como a fonte
+    "arquivo [aba]"), bloco a bloco, e devolve um resultado compacto:
+    o estado reduzido do cruzamento, os registros extraídos num ArmazemRegistros compacto (ou o
+    caminho do CSV.gz em disco quando `gravar_registros`), o mapeamento de colunas escolhido e as
+    estatísticas do cache, além do tempo e dos contadores de cada etapa em "etapas". Com
+    `colocalizacao` (tipo do identificador, ex: "imei"), também devolve em "eventos" os pares
+    identificador/ERB/instante do arquivo para a co-localização temporal e, com `vinculos_linha`,
+    em "arestas_linha" os pares de valores da mesma linha para o grafo de vínculos. Com
+    `listas_alvos` (diretórios de listas de alvos), os registros gravados em disco levam a coluna
+    COLUNA_ALVOS (em memória, ela é acrescentada na exportação). Um `cache` de normalização
+    compartilhado (caminho sequencial) reaproveita entre arquivos os valores repetidos; sem ele,
+    cada arquivo usa um cache próprio, como no pool de processos. Erros são devolvidos em "erro",
+    sem os dados parciais do arquivo, para que a falha de um arquivo não interrompa os demais; uma
+    falha só na extração dos eventos descarta os eventos e é devolvida em "aviso".
+    """
+    fonte = nome_fonte(nome_arquivo, aba)
+    resultado = _resultado_vazio(fonte)
+    if isinstance(file, bytes):
+        file = io.BytesIO(file)
+    arquivo_aberto = blocos = None
+
+    cache = cache if cache is not None else CacheNormalizacao()
+    # Contadores deste arquivo: o cache pode vir de arquivos anteriores
+    celulas_inicio, normalizados_inicio = cache.celulas, cache.normalizados
+    acumulador = AcumuladorCruzamentos()
+    eventos = AcumuladorEventos() if colocalizacao else None
+    partes_linha = []
+    medidor = MedidorEtapas()
+    try:
+        if isinstance(file, (str, os.PathLike)):
+            # Upload gravado em disco: aberto e lido em sequência por quem processa (no pool, só o caminho viaja)
+            file = arquivo_aberto = open(file, "rb")
+        listas = [ListaAlvos(diretorio) for diretorio in listas_alvos or []] if gravar_registros else []
+        if gravar_registros:
+            resultado["arquivo_registros"] = tempfile.NamedTemporaryFile(suffix=".csv.gz", delete=False).name
+
+        colunas_por_tipo = colunas_eventos = None
+        blocos = ler_planilha_em_blocos(file, nome_arquivo, dialeto=dialeto, medidor=medidor, aba=aba)
+        numero_bloco = 0
+        while True:
+            # Tempo de leitura do bloco (a detecção do cabeçalho é medida à parte, dentro da leitura)
+            with medidor.medir("leitura"):
+                df = next(blocos, None)
+            if df is None:
+                break
+            numero_bloco += 1
+            medidor.contar("leitura", linhas=len(df))
+
+            celulas_antes = cache.celulas
+            with medidor.medir("normalizacao"):
+                # Limpeza inicial: remover 'nan'
+                df = df.fillna("")
+                # Standardizing columns
+                df.columns = [str(col).strip().lower() for col in df.columns]
+
+                # Primeiro, vamos identificar as colunas (por posição) para cada tipo de dado,
+                # pelo nome e por uma amostra do conteúdo do primeiro bloco
+                if colunas_por_tipo is None:
+                    with medidor.medir("classificacao"):
+                        colunas_por_tipo, resultado["mapeamento"] = classificar_colunas(df, tipos, map_primario, strict)
+                        if eventos is not None:
+                            mapa = mapear_colunas_colocalizacao(df.columns)
+                            if mapa is not None:
+                                colunas_eventos = colunas_identificador(
+                                    df.columns, colunas_por_tipo.get(colocalizacao, []), colocalizacao)
+
+                # Normalização vetorizada: uma chamada por coluna em vez de uma por célula
+                registros = extrair_registros(df, fonte, colunas_por_tipo, cache, strict)
+            medidor.contar("normalizacao", linhas=len(df), celulas=cache.celulas - celulas_antes, registros=len(registros))
+
+            if colunas_eventos:
+                # Os valores já passaram pelo cache de normalização: aqui só a data/hora é convertida
+                try:
+                    with medidor.medir("eventos"):
+                        bloco_eventos = extrair_eventos(df, colunas_eventos, colocalizacao, mapa, cache, strict)
+                        eventos.adicionar(bloco_eventos)
+                    medidor.contar("eventos", linhas=len(df), registros=len(bloco_eventos))
+                except Exception as e:
+                    # Data/hora ilegível não invalida o cruzamento: só os eventos do arquivo são descartados
+                    resultado["aviso"] = f"co-localização ignorada ({e})"
+                    colunas_eventos = eventos = None
+
+            if vinculos_linha:
+                with medidor.medir("vinculos"):
+                    partes_linha.append(arestas_mesma_linha(df, colunas_por_tipo, cache, strict))
+                medidor.contar("vinculos", linhas=len(df), registros=len(partes_linha[-1]))
+
+            with medidor.medir("reducao"):
+                acumulador.adicionar(registros)
+                if gravar_registros:
+                    # Cada bloco vira um membro gzip anexado ao mesmo arquivo (sem cabeçalho; ver juntar_registros)
+                    if not registros.empty:
+                        if listas:
+                            registros[COLUNA_ALVOS] = marcar_alvos(listas, registros["valor"], registros["tipo"])
+                        registros.to_csv(resultado["arquivo_registros"], mode="a", header=False, index=False,
+                                         compression=COMPRESSAO_REGISTROS)
+                else:
+                    resultado["registros"].adicionar(registros)
+            if ao_ler_bloco:
+                ao_ler_bloco(numero_bloco)
+    except Exception as e:
+        resultado["erro"] = f"{e}"
+        resultado["detalhe"] = traceback.format_exc()
+    finally:
+        # Leitura interrompida: o leitor de blocos é fechado antes do arquivo que ele usa
+        if blocos is not None:
+            blocos.close()
+        if arquivo_aberto is not None:
+            arquivo_aberto.close()
+
+    if resultado["erro"]:
+        # Leitura interrompida no meio (falha ou cancelamento): nada do que foi lido é aproveitado
+        if resultado["arquivo_registros"] and os.path.exists(resultado["arquivo_registros"]):
+            os.remove(resultado["arquivo_registros"])
+        resultado["registros"], resultado["arquivo_registros"] = ArmazemRegistros(), None
+    else:
+        with medidor.medir("reducao"):
+            resultado["estado"] = acumulador.estado()
+            if eventos is not None:
+                resultado["eventos"] = eventos.eventos()
+            if vinculos_linha:
+                resultado["arestas_linha"] = reduzir_arestas_linha(partes_linha)
+        resultado["total_registros"] = acumulador.registros
+    resultado["celulas"] = cache.celulas - celulas_inicio
+    resultado["normalizados"] = cache.normalizados - normalizados_inicio
+    resultado["etapas"] = medidor.linhas(fonte)
+    return resultado
+
+
+def _descartar_registros(futuro):
+    """Apaga o CSV.gz de registros de um arquivo concluído que ninguém vai ler."""
+    if not futuro.cancelled() and futuro.exception() is None and futuro.result()["arquivo_registros"]:
+        _remover_arquivo(futuro.result()["arquivo_registros"])
+
+
+def processar_em_paralelo(tarefas, max_workers):
+    """
+    Executa processar_arquivo para cada tarefa (dict de argumentos) num pool de processos e
+    gera os resultados à medida que cada arquivo termina, fora de ordem. Fechar o gerador antes
+    do fim cancela os arquivos que ainda não começaram.
+    """
+    # "spawn" evita herdar o estado (threads, locks) do servidor Streamlit via fork
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=get_context("spawn")) as pool:
+        futuros = {pool.submit(processar_arquivo, **tarefa): nome_fonte(tarefa["nome_arquivo"], tarefa.get("aba"))
+                   for tarefa in tarefas}
+        entregues = set()
+        try:
+            for futuro in as_completed(futuros):
+                try:
+                    resultado = futuro.result()
+                except Exception as e:
+                    # Falha do próprio processo (ex: memória esgotada): reporta só este arquivo
+                    resultado = _resultado_vazio(futuros[futuro], f"{e}")
+                entregues.add(futuro)
+                yield resultado
+        finally:
+            # Consumidor interrompido (ex: trabalho cancelado): os arquivos que ainda não começaram são
+            # descartados, e os registros em disco dos que terminarem depois são apagados ao terminar
+            for futuro in futuros:
+                if futuro not in entregues and not futuro.cancel():
+                    futuro.add_done_callback(_descartar_registros)
+
+
+def juntar_registros(caminhos, destino, colunas=COLUNAS_REGISTRO):
+    """Concatena os CSV.gz de registros de cada arquivo, precedidos de um membro gzip com o cabeçalho."""
+    with open(destino, "wb") as saida:
+        saida.write(gzip.compress((",".join(colunas) + "\n").encode("utf-8"), compresslevel=1))
+        for caminho in caminhos:
+            with open(caminho, "rb") as parte:
+                shutil.copyfileobj(parte, saida)
+            os.remove(caminho)
+    return destino
+
+
+def _remover_arquivo(caminho):
+    if os.path.exists(caminho):
+        os.remove(caminho)
+
+
+class RegistrosEmDisco:
+    """
+    CSV.gz com todos os registros do modo streaming, deixado em disco: a sessão guarda só o caminho
+    e o arquivo é aberto no momento do download, sem ser copiado para a memória. É apagado quando o objeto deixa de ser referenciado
+    (resultados limpos ou sessão expirada) ou ao fim do servidor.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.tamanho = os.path.getsize(caminho)
+        self._finalizador = weakref.finalize(self, _remover_arquivo, caminho)
+
+    def abrir(self):
+        """Arquivo aberto para leitura binária (o download o consome e o fecha ao descartá-lo)."""
+        return open(self.caminho, "rb")
+
+    def apagar(self):
+        self._finalizador()
+
+
+# --- Cache de Arquivos Processados ---
+
+MEMORIA_CACHE_ARQUIVOS = 1024 ** 3  # orçamento padrão: 1 GiB de resultados em memória
+
+
+def chave_arquivo(dados, nome_arquivo, analysis_type, strict, colocalizacao=None, vinculos_linha=False, aba=None,
+                  sha256=None):
+    """
+    Chave do cache: SHA-256 do conteúdo, nome (gravado nos registros), tipo de análise e rigor,
+    além das extrações opcionais (eventos e vínculos de linha só existem quando pedidos). A aba,
+    quando informada, entra no hash: cada aba é uma fonte própria, também na base do caso.
+    Com `sha256` (hash já calculado do upload gravado em disco), `dados` não é lido.
+    """
+    if sha256 is None:
+        sha256 = hashlib.sha256(dados).hexdigest()
+    if aba is not None:
+        sha256 = hashlib.sha256(bytes.fromhex(sha256) + b"\0" + aba.encode("utf-8")).hexdigest()
+    return sha256, nome_fonte(nome_arquivo, aba), analysis_type, strict, colocalizacao, vinculos_linha
+
+
+def tamanho_resultado(resultado):
+    """Memória aproximada de um resultado de processar_arquivo (estado, registros, eventos e vínculos)."""
+    tamanho = resultado["registros"].memoria()
+    for chave in ("estado", "eventos", "arestas_linha"):
+        if resultado.get(chave) is not None:
+            tamanho += int(resultado[chave].memory_usage(index=False, deep=True).sum())
+    return tamanho
+
+
+class CacheArquivos:
+    """
+    Resultados de processar_arquivo por conteúdo do arquivo, reaproveitados entre execuções
+    (LRU com orçamento de memória): reprocessar após incluir um arquivo custa apenas esse arquivo.
+    Resultados com erro ou gravados em disco (modo streaming) não são guardados.
+    """
+
+    def __init__(self, memoria_maxima=MEMORIA_CACHE_ARQUIVOS):
+        self.memoria_maxima = memoria_maxima
+        self.memoria = 0
+        self._resultados = OrderedDict()
+        self.acertos = 0
+        self.falhas = 0
+
+    def __len__(self):
+        return len(self._resultados)
+
+    def obter(self, chave):
+        resultado = self._resultados.get(chave)
+        if resultado is None:
+            self.falhas += 1
+            return None
+        self._resultados.move_to_end(chave)
+        self.acertos += 1
+        return resultado[0]
+
+    def guardar(self, chave, resultado):
+        if resultado["erro"] or resultado["arquivo_registros"]:
+            return
+        tamanho = tamanho_resultado(resultado)
+        if tamanho > self.memoria_maxima:
+            return
+        if chave in self._resultados:
+            self.memoria -= self._resultados.pop(chave)[1]
+        self._resultados[chave] = (resultado, tamanho)
+        self.memoria += tamanho
+        # Descarta os menos usados recentemente até caber no orçamento
+        while self.memoria > self.memoria_maxima:
+            _, (_, tamanho_antigo) = self._resultados.popitem(last=False)
+            self.memoria -= tamanho_antigo
+
+    def resumo(self):
+        return (f"Cache de arquivos: {self.acertos} reaproveitados, {self.falhas} processados "
+                f"({len(self)} em cache, {self.memoria / 1024 ** 2:.1f} MiB)")
@@ -0,0 +1,102 @@
+# registros.py
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from normalizacao import COLUNAS_REGISTRO
+
+# --- Armazenamento Colunar dos Registros ---
+
+COLUNAS_CATEGORICAS = ["tipo", "confianca", "arquivo", "coluna_fonte", "valor_original"]
+
+# Valores que cabem num int64 sem perda: "+" opcional e até 18 dígitos, sem zero à esquerda
+_PADRAO_NUMERICO = r"\+?[1-9]\d{0,17}"
+
+
+def empacotar_valores(valores):
+    """
+    Converte os valores normalizados em int64 quando possível: dígitos viram o próprio número
+    e o "+" inicial vira o sinal negativo (ex: "+5581991234567" -> -5581991234567).
+    Devolve (numeros, textos): 0 em `numeros` marca os valores mantidos como texto, que ficam
+    em `textos` indexados pela posição.
+    """
+    # Valores normalizados se repetem muito: a conversão é feita uma vez por valor distinto
+    codigos, distintos = pd.factorize(pd.Series(valores, dtype=object))
+    distintos = pd.Series(distintos, dtype=object)
+    numericos = distintos.str.fullmatch(_PADRAO_NUMERICO).fillna(False).to_numpy(dtype=bool)
+    tabela = np.zeros(len(distintos), dtype=np.int64)
+    if numericos.any():
+        texto = distintos[numericos]
+        sinal = np.where(texto.str.startswith("+").to_numpy(dtype=bool), -1, 1)
+        tabela[numericos] = sinal * texto.str.lstrip("+").astype(np.int64).to_numpy()
+    numeros = tabela[codigos]
+    posicoes = np.flatnonzero(numeros == 0)
+    textos = pd.Series(np.asarray(valores, dtype=object)[posicoes], index=posicoes, dtype=object)
+    return numeros, textos
+
+
+def desempacotar_valores(numeros, textos):
+    """Inverso de empacotar_valores: devolve um array de strings (object)."""
+    codigos, distintos = pd.factorize(numeros)
+    formatados = np.abs(distintos).astype(str).astype(object)
+    negativos = distintos < 0
+    formatados[negativos] = "+" + formatados[negativos]
+    valores = formatados[codigos]
+    valores[textos.index.to_numpy()] = textos.to_numpy()
+    return valores
+
+
+class ArmazemRegistros:
+    """
+    Registros extraídos guardados por bloco em formato colunar compacto: colunas repetitivas
+    como categóricas e o valor normalizado empacotado em int64. Os blocos só são convertidos
+    de volta para texto (e concatenados uma única vez) quando o DataFrame completo é pedido.
+    """
+
+    def __init__(self):
+        self._blocos = []
+        self.registros = 0
+
+    def adicionar(self, registros):
+        """Compacta e guarda um bloco de registros extraídos (DataFrame com COLUNAS_REGISTRO)."""
+        if registros.empty:
+            return
+        numeros, textos = empacotar_valores(registros["valor"].to_numpy(dtype=object))
+        dados = pd.DataFrame({coluna: registros[coluna].astype("category") for coluna in COLUNAS_CATEGORICAS})
+        dados["valor"] = numeros
+        self._blocos.append((dados, textos))
+        self.registros += len(registros)
+
+    def incorporar(self, outro):
+        """Anexa os blocos de outro armazém (ex: o resultado de outro arquivo)."""
+        self._blocos.extend(outro._blocos)
+        self.registros += outro.registros
+
+    def memoria(self):
+        """Bytes ocupados pelos blocos compactados."""
+        return sum(
+            int(dados.memory_usage(index=False, deep=True).sum()) + int(textos.memory_usage(deep=True))
+            for dados, textos in self._blocos
+        )
+
+    def blocos(self):
+        """Gera cada bloco já convertido de volta para as colunas e valores originais."""
+        for dados, textos in self._blocos:
+            bloco = dados.drop(columns="valor")
+            bloco["valor"] = desempacotar_valores(dados["valor"].to_numpy(), textos)
+            yield bloco[COLUNAS_REGISTRO]
+
+    def dataframe(self):
+        """Todos os registros num único DataFrame, com as colunas repetitivas ainda categóricas."""
+        if not self._blocos:
+            return pd.DataFrame(columns=COLUNAS_REGISTRO)
+        blocos = list(self.blocos())
+        # Categorias diferentes entre blocos: unidas antes da concatenação para não virarem object
+        colunas = {}
+        for coluna in COLUNAS_REGISTRO:
+            if coluna in COLUNAS_CATEGORICAS:
+                colunas[coluna] = union_categoricals([b[coluna] for b in blocos])
+            else:
+                colunas[coluna] = np.concatenate([b[coluna].to_numpy(dtype=object) for b in blocos])
+        return pd.DataFrame(colunas)
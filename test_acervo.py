@@ -0,0 +1,76 @@
+import gzip
+import hashlib
+import io
+import os
+import tarfile
+import zipfile
+
+from acervo import AcervoEmDisco, e_pacote, remover_acervos_orfaos
+
+
+class ArquivoEnviado(io.BytesIO):
+    def __init__(self, dados, name):
+        super().__init__(dados)
+        self.name = name
+
+
+def test_acervo_grava_em_disco_e_limpa(tmp_path):
+    acervo = AcervoEmDisco(str(tmp_path))
+    dados = b"msisdn;imei\n81991234567;356938035643809\n"
+    arquivo = acervo.adicionar(ArquivoEnviado(dados, "../extrato a.CSV"))
+    assert os.path.dirname(arquivo.caminho) == acervo.diretorio and arquivo.caminho.endswith(".csv")
+    assert (arquivo.tamanho, arquivo.sha256) == (len(dados), hashlib.sha256(dados).hexdigest())
+    with arquivo.abrir() as f:
+        assert f.read() == dados
+
+    # Reenvio com o mesmo nome substitui o arquivo anterior
+    novo = acervo.adicionar(ArquivoEnviado(b"x", "../extrato a.CSV"))
+    assert len(acervo) == 1 and not os.path.exists(arquivo.caminho) and acervo["../extrato a.CSV"] is novo
+
+    acervo.adicionar(ArquivoEnviado(b"y", "b.xlsx"))
+    del acervo["b.xlsx"]
+    assert list(acervo) == ["../extrato a.CSV"] and acervo.tamanho() == 1
+    acervo.limpar()
+    assert len(acervo) == 0 and os.listdir(acervo.diretorio) == []
+
+    # Sessão encerrada: o diretório vai junto com o objeto
+    diretorio = acervo.diretorio
+    del acervo
+    assert not os.path.exists(diretorio)
+
+
+def test_remover_acervos_orfaos(tmp_path):
+    antigo, recente = AcervoEmDisco(str(tmp_path)), AcervoEmDisco(str(tmp_path))
+    os.utime(antigo.diretorio, (0, 0))
+    assert remover_acervos_orfaos(str(tmp_path), horas=1) == 1
+    assert not os.path.exists(antigo.diretorio) and os.path.exists(recente.diretorio)
+
+
+def test_pacotes_viram_um_arquivo_por_planilha(tmp_path):
+    acervo = AcervoEmDisco(str(tmp_path))
+    saida = io.BytesIO()
+    with zipfile.ZipFile(saida, "w", zipfile.ZIP_DEFLATED) as pacote:
+        pacote.writestr("respostas/claro.csv", "msisdn\n81991234567\n")
+        pacote.writestr("respostas/", "")
+        pacote.writestr("__MACOSX/respostas/._claro.csv", "x")
+        pacote.writestr("leia-me.txt", "oi")
+        pacote.writestr("RelatXrio.csv", "imei\n356938035643809\n")
+    # Nome gravado pelo Windows na página de código OEM, sem a marca de UTF-8 ("ó" = 0xA2 em cp850)
+    dados = saida.getvalue().replace(b"RelatXrio", b"Relat\xa2rio")
+    gravados, ignorados = acervo.adicionar_pacote(ArquivoEnviado(dados, "lote.zip"))
+    assert [a.name for a in gravados] == ["lote.zip/respostas/claro.csv", "lote.zip/Relatório.csv"]
+    assert ignorados == ["leia-me.txt"]
+    with acervo["lote.zip/respostas/claro.csv"].abrir() as f:
+        assert f.read() == b"msisdn\n81991234567\n"
+
+    saida = io.BytesIO()
+    with tarfile.open(fileobj=saida, mode="w:gz") as pacote:
+        for nome, conteudo in (("x/a.csv", b"msisdn\n1\n"), ("x/.oculto.csv", b"")):
+            info = tarfile.TarInfo(nome)
+            info.size = len(conteudo)
+            pacote.addfile(info, io.BytesIO(conteudo))
+    assert [a.name for a in acervo.adicionar_pacote(ArquivoEnviado(saida.getvalue(), "lote.tar.gz"))[0]] == ["lote.tar.gz/x/a.csv"]
+
+    gravados, _ = acervo.adicionar_pacote(ArquivoEnviado(gzip.compress(b"imei\n1\n"), "extrato.csv.gz"))
+    assert [(a.name, a.sha256) for a in gravados] == [("extrato.csv.gz/extrato.csv", hashlib.sha256(b"imei\n1\n").hexdigest())]
+    assert len(acervo) == 4 and e_pacote("A.TGZ") and not e_pacote("a.csv")
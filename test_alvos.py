@@ -0,0 +1,101 @@
+import io
+import os
+
+import pandas as pd
+
+import pytest
+
+from acervo import AcervoEmDisco
+from alvos import (COLUNA_ALVOS, ListaAlvos, anotar_blocos, criar_lista_alvos, listar_listas_alvos, marcar_alvos,
+                   remover_lista_alvos)
+from analise import executar_analise
+from normalizacao import COLUNA_MAP_HEURISTICO
+from trabalhos import Trabalho
+
+ERBS = COLUNA_MAP_HEURISTICO["Extratos de ERBs"]
+GOOGLE = COLUNA_MAP_HEURISTICO["Dados de Contas Online (Google Location)"]
+
+
+class ArquivoEnviado(io.BytesIO):
+    def __init__(self, dados, name):
+        super().__init__(dados)
+        self.name = name
+
+
+def test_lista_gravada_em_disco_e_consultada_com_mmap(tmp_path):
+    dados = b"telefone\n(81) 99123-4567\n11987654321\n81991234567\n"
+    lista = criar_lista_alvos(ArquivoEnviado(dados, "ref.csv"), "ref.csv", "Operação X", ["telefone"], ERBS,
+                              diretorio_base=str(tmp_path))
+    assert lista.contagens == {"telefone": 2}
+    aberta = ListaAlvos(lista.diretorio)
+    assert aberta.contem("telefone", ["+5511987654321", "+5581991234567", "+5581900000000", "abc"]).tolist() == \
+        [True, True, False, False]
+    assert not aberta.contem("imei", ["+5511987654321"]).any()
+
+    emails = criar_lista_alvos(ArquivoEnviado(b"email;hash\nFulano@Gmail.com;D41D8CD98F00B204E9800998ECF8427E\n", "r.csv"),
+                               "r.csv", "Contas", ["email", "hash"], GOOGLE, diretorio_base=str(tmp_path))
+    assert emails.contagens == {"email": 1, "hash": 1}
+    assert [lista.nome for lista in listar_listas_alvos(str(tmp_path))] == ["Contas", "Operação X"]
+
+    marcas = marcar_alvos([aberta, emails], ["+5511987654321", "fulano@gmail.com", "fulano@gmail.com", "x@y.com"],
+                          ["telefone", "email", "hash", "email"])
+    assert marcas.tolist() == ["Operação X", "Contas", "", ""]
+    bloco = pd.DataFrame({"valor": ["d41d8cd98f00b204e9800998ecf8427e"], "tipo": ["hash"]})
+    assert next(anotar_blocos([emails], [bloco]))[COLUNA_ALVOS].tolist() == ["Contas"]
+
+    # Regravar com o mesmo nome substitui a lista
+    lista = criar_lista_alvos(ArquivoEnviado(b"telefone\n81977776666\n", "n.csv"), "n.csv", "Operação X", ["telefone"],
+                              ERBS, diretorio_base=str(tmp_path))
+    assert lista.contem("telefone", ["+5581977776666", "+5511987654321"]).tolist() == [True, False]
+    assert len(os.listdir(tmp_path)) == 2
+
+    # Sem cabeçalho, a primeira linha é tomada como nome de coluna e não entra na lista
+    sem_cabecalho = criar_lista_alvos(ArquivoEnviado(b"81933334444\n81955556666\n81977778888\n", "s.csv"), "s.csv",
+                                      "Sem cabeçalho", ["telefone"], ERBS, diretorio_base=str(tmp_path))
+    assert sem_cabecalho.contem("telefone", ["+5581933334444", "+5581955556666", "+5581977778888"]).tolist() == \
+        [False, True, True]
+
+
+def test_lista_consultada_nao_fica_mapeada_e_remocao_em_uso_avisa(tmp_path, monkeypatch):
+    lista = criar_lista_alvos(ArquivoEnviado(b"telefone\n81991234567\n", "ref.csv"), "ref.csv", "Alvos", ["telefone"],
+                              ERBS, diretorio_base=str(tmp_path))
+    assert lista.contem("telefone", ["+5581991234567"]).tolist() == [True]
+    if os.path.exists("/proc/self/maps"):
+        # Mapeada só durante a consulta: no Windows, um arquivo mapeado não pode ser apagado
+        with open("/proc/self/maps") as mapas:
+            assert lista.diretorio not in mapas.read()
+
+    # Arquivo em uso: a remoção falha sem apagar parte da lista
+    def _em_uso(origem, destino):
+        raise PermissionError("em uso")
+    with monkeypatch.context() as m:
+        m.setattr(os, "replace", _em_uso)
+        with pytest.raises(OSError):
+            remover_lista_alvos(lista.diretorio)
+    assert [l.nome for l in listar_listas_alvos(str(tmp_path))] == ["Alvos"]
+    assert lista.contem("telefone", ["+5581991234567"]).tolist() == [True]
+
+    remover_lista_alvos(lista.diretorio)
+    assert listar_listas_alvos(str(tmp_path)) == [] and os.listdir(tmp_path) == []
+
+
+def test_executar_analise_marca_os_alvos_nos_cruzamentos_e_registros(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    lista = criar_lista_alvos(ArquivoEnviado(b"imei\n356938035643809\n", "ref.csv"), "ref.csv", "Alvos", ["imei"], ERBS)
+    acervo = AcervoEmDisco(str(tmp_path / "acervo"))
+    acervo.adicionar(ArquivoEnviado(b"msisdn;imei\n81991234567;356938035643809\n", "a.csv"))
+    acervo.adicionar(ArquivoEnviado(b"telefone;imei\n(81) 99123-4567;356938035643809\n", "b.csv"))
+
+    for modo_streaming in (False, True):
+        saida = executar_analise(Trabalho(), acervo, "Extratos de ERBs", ["telefone", "imei"],
+                                 modo_streaming=modo_streaming, listas_alvos=[lista.diretorio])
+        df = saida["resultados"]["cruzamentos"].df
+        assert dict(zip(df["valor"], df[COLUNA_ALVOS])) == {"+5581991234567": "", "356938035643809": "Alvos"}
+        assert saida["resultados"]["cruzamentos"].filtrar(so_alvos=True).sum() == 1
+        if modo_streaming:
+            with saida["resultados"]["registros_streaming"].abrir() as arquivo:
+                registros = pd.read_csv(arquivo, compression="gzip", dtype=str, keep_default_na=False)
+        else:
+            listas = saida["resultados"]["listas_alvos"]
+            registros = pd.concat(anotar_blocos(listas, saida["resultados"]["registros"].blocos()))
+        assert (registros[COLUNA_ALVOS] == "Alvos").sum() == 2 and len(registros) == 4
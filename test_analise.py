@@ -0,0 +1,44 @@
+import io
+
+import pytest
+
+from acervo import AcervoEmDisco
+from analise import executar_analise, fontes_do_acervo
+from processamento import CacheArquivos
+from trabalhos import Trabalho, TrabalhoCancelado
+
+
+class ArquivoEnviado(io.BytesIO):
+    def __init__(self, dados, name):
+        super().__init__(dados)
+        self.name = name
+
+
+def _acervo(diretorio):
+    acervo = AcervoEmDisco(str(diretorio))
+    acervo.adicionar(ArquivoEnviado(b"msisdn;imei\n81991234567;356938035643809\n81977776666;490154203237518\n", "a.csv"))
+    acervo.adicionar(ArquivoEnviado(b"telefone;imei\n(81) 99123-4567;111\n", "b.csv"))
+    return acervo
+
+
+def test_fontes_do_acervo_separa_as_abas():
+    fontes = fontes_do_acervo(["m.xlsx", "a.csv", "u.xlsx"], {"m.xlsx": ["Jan", "Fev"], "u.xlsx": ["Plan1"]})
+    assert fontes == {"m.xlsx [Jan]": ("m.xlsx", "Jan"), "m.xlsx [Fev]": ("m.xlsx", "Fev"),
+                      "a.csv": ("a.csv", None), "u.xlsx": ("u.xlsx", None)}
+
+
+def test_executar_analise_informa_o_trabalho_e_guarda_o_que_terminou(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # o log de execuções vai para logs/ no diretório atual
+    trabalho, cache = Trabalho(), CacheArquivos()
+    saida = executar_analise(trabalho, _acervo(tmp_path), "Extratos de ERBs", ["telefone", "imei"], cache_arquivos=cache)
+    df = saida["resultados"]["cruzamentos"].df
+    assert df["valor"].tolist() == ["+5581991234567"] and trabalho.progresso == 1.0
+    assert [fonte for fonte, _ in saida["execucao"]["mapeamentos"]] == ["a.csv", "b.csv"]
+    assert saida["indice"] is not None and saida["desempenho"]["tabela"] is not None
+
+    # Cancelado depois do primeiro arquivo: o que já foi lido fica no cache
+    trabalho, cache = Trabalho(), CacheArquivos()
+    trabalho.informar = lambda progresso=None, mensagem=None: trabalho.cancelar() if progresso else None
+    with pytest.raises(TrabalhoCancelado):
+        executar_analise(trabalho, _acervo(tmp_path), "Extratos de ERBs", ["telefone", "imei"], cache_arquivos=cache)
+    assert len(cache) == 1
@@ -0,0 +1,30 @@
+import io
+
+import pandas as pd
+
+from benchmark import ANALISE_ERB, ANALISE_GOOGLE, ETAPAS, comparar, executar_benchmark, gerar_cenario
+
+
+def test_gerar_cenario_reprodutivel_e_com_formatos_variados():
+    cenario = gerar_cenario(ANALISE_ERB, 300, semente=7)
+    assert [nome for nome, _ in cenario] == ["extrato_erb_1.csv", "extrato_erb_2.csv", "extrato_erb_3.xlsx"]
+    assert cenario == gerar_cenario(ANALISE_ERB, 300, semente=7)
+    assert cenario[0][1] != gerar_cenario(ANALISE_ERB, 300, semente=8)[0][1]
+
+    texto = cenario[0][1].decode("utf-8")
+    assert texto.startswith("RELATÓRIO DE CHAMADAS")
+    df = pd.read_csv(io.StringIO(texto), sep=";", skiprows=4, dtype=str)
+    origem = df["MSISDN Origem"]
+    assert origem.str.endswith(".0").any() and origem.str.contains("E+12", regex=False).any()
+    assert {10, 11, 13} <= set(origem[origem.str.isdigit()].str.len())
+    assert df["IMEI"].duplicated().any()
+
+
+def test_executar_benchmark_mede_todas_as_etapas():
+    resultado = executar_benchmark([200], analises=[ANALISE_ERB, ANALISE_GOOGLE], memoria=False)
+    df = pd.DataFrame(resultado["resultados"])
+    assert df["etapa"].tolist() == ETAPAS * 2
+    cruzamentos = df[df["etapa"] == "cruzamento"]["itens"]
+    assert (cruzamentos > 0).all()  # a sobreposição entre arquivos gera cruzamentos
+    tabela = comparar(resultado, resultado)
+    assert len(tabela) == 10 and (tabela["variacao_tempo"] == 0).all()
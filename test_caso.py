@@ -0,0 +1,30 @@
+import pandas as pd
+
+from caso import BaseCaso
+
+
+def _estado(linhas):
+    return pd.DataFrame(linhas, columns=["valor", "tipo", "arquivo", "coluna_fonte", "confianca", "ocorrencias"])
+
+
+def test_base_caso_cruza_apenas_os_arquivos_novos(tmp_path):
+    caminho = str(tmp_path / "caso.sqlite")
+    with BaseCaso(caminho) as base:
+        a = base.adicionar_arquivo("h1", "extrato.csv", "Extratos de ERBs", False, _estado([
+            ["+5581991234567", "telefone", "extrato.csv", "origem", "alta", 2],
+            ["356938035643809", "imei", "extrato.csv", "imei", "alta", 1],
+        ]), 3)
+        assert base.cruzamentos_novos([a]).empty
+
+    # Outra sessão: mesmo nome de arquivo, conteúdo diferente
+    with BaseCaso(caminho) as base:
+        assert base.adicionar_arquivo("h1", "extrato.csv", "Extratos de ERBs", False, _estado([]), 0) is None
+        b = base.adicionar_arquivo("h2", "extrato.csv", "Extratos de ERBs", False, _estado([
+            ["+5581991234567", "telefone", "extrato.csv", "destino", "média", 5],
+            ["991234567", "telefone", "extrato.csv", "destino", "baixa", 1],
+        ]), 6)
+        df = base.cruzamentos_novos([b])
+        assert df["valor"].tolist() == ["+5581991234567"]
+        assert df.iloc[0]["arquivos"] == ["extrato.csv", "extrato.csv (2)"]
+        assert df.iloc[0]["confianca"] == "alta" and df.iloc[0]["ocorrencias"] == 7
+        assert base.arquivos()["nome"].tolist() == ["extrato.csv", "extrato.csv (2)"]
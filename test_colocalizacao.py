@@ -0,0 +1,87 @@
+import pandas as pd
+
+from colocalizacao import converter_instantes, detectar_colocalizacoes, mapear_colunas_colocalizacao
+from normalizacao import COLUNA_MAP_HEURISTICO
+from processamento import processar_arquivo
+
+MAP_PRIMARIO = COLUNA_MAP_HEURISTICO["Extratos de ERBs"]
+
+
+def _eventos(linhas):
+    return pd.DataFrame(linhas, columns=["identificador", "erb", "instante"])
+
+
+def test_mapear_colunas_e_converter_instantes():
+    assert mapear_colunas_colocalizacao(["data/hora", "msisdn", "erb"]) == {"data_hora": 0, "erb": 2}
+    assert mapear_colunas_colocalizacao(["data", "hora", "cgi"]) == {"data": 0, "hora": 1, "erb": 2}
+    assert mapear_colunas_colocalizacao(["msisdn", "imei"]) is None
+
+    segundos, validos = converter_instantes(["01/02/2024 10:00:00", "", "2024-02-01T10:00:05", "xx"])
+    assert validos.tolist() == [True, False, True, False]
+    assert segundos[2] - segundos[0] == 5
+    assert pd.Timestamp(segundos[0], unit="s") == pd.Timestamp("2024-02-01 10:00:00")
+
+
+def test_converter_instantes_descarta_fuso_horario():
+    # Horário de verão e padrão na mesma coluna não a tornam ilegível
+    segundos, validos = converter_instantes(["2018-01-10T10:00:00-02:00", "2018-03-10T10:00:00-03:00"])
+    assert validos.all()
+    assert pd.Timestamp(segundos[1], unit="s") == pd.Timestamp("2018-03-10 10:00:00")
+
+    # Com e sem fuso: a hora local escrita, a mesma dos extratos sem fuso
+    segundos, validos = converter_instantes(["2024-02-01T10:00:00-03:00", "2024-02-01 10:00:00",
+                                             "01/02/2024 10:00:00 -0300", "01/02/2024 10:00 GMT-3"])
+    assert validos.all() and len(set(segundos.tolist())) == 1
+    assert pd.Timestamp(segundos[0], unit="s") == pd.Timestamp("2024-02-01 10:00:00")
+
+def test_detectar_colocalizacoes_por_erb_e_janela():
+    eventos = {
+        "a.csv": _eventos([("A", "E1", 0), ("A", "E1", 3000), ("A", "E2", 100), ("A", "E1", 10_000)]),
+        "b.csv": _eventos([("B", "E1", 600), ("B", "E1", 3500), ("B", "E2", 5000), ("A", "E1", 10)]),
+        "c.csv": _eventos([("C", "E1", 9_500), ("B", "E1", 620)]),
+    }
+    df = detectar_colocalizacoes(eventos, janela_segundos=900)
+    # A x B: (0, 600), (0, 620), (10, 620) e (3000, 3500); (10, 600) é do mesmo arquivo e E2 fica fora da janela
+    assert df["coocorrencias"].tolist() == [4, 1]
+    primeiro = df.iloc[0]
+    assert {primeiro["identificador_a"], primeiro["identificador_b"]} == {"A", "B"}
+    assert primeiro["primeira"] == pd.Timestamp(0, unit="s") and primeiro["ultima"] == pd.Timestamp(3500, unit="s")
+    assert sorted(primeiro["arquivos_a"] + primeiro["arquivos_b"]) == ["a.csv", "b.csv", "b.csv", "c.csv"]
+    assert detectar_colocalizacoes({"a.csv": eventos["a.csv"]}, 900).empty
+
+
+def test_processar_arquivo_extrai_eventos_do_alvo():
+    dados = ("Data;Hora;MSISDN Origem;MSISDN Destino;ERB\n"
+             "01/02/2024;10:00:00;81991234567;81988887777;cgi-1\n"
+             "01/02/2024;;81991234567;81988887777;CGI-2\n").encode()
+    resultado = processar_arquivo(dados, "a.csv", ["telefone", "imei"], MAP_PRIMARIO, colocalizacao="telefone")
+    eventos = resultado["eventos"]
+    assert eventos["identificador"].astype(str).tolist() == ["+5581991234567"]
+    assert eventos["erb"].astype(str).tolist() == ["CGI-1"]
+    assert "eventos" in [etapa["etapa"] for etapa in resultado["etapas"]]
+    assert processar_arquivo(dados, "a.csv", ["telefone", "imei"], MAP_PRIMARIO)["eventos"] is None
+
+
+def test_colocalizacao_entre_arquivos_iso_e_dia_mes():
+    # ISO (ano-mês-dia) não pode ter dia e mês trocados pela dedução do formato com dia primeiro
+    iso = ("Data/Hora;IMEI;ERB\n2024-02-01 10:03:00;356938035643809;CGI-1\n"
+           "2024-02-13 10:00:00;356938035643809;CGI-9\n").encode()
+    dia_mes = "Data/Hora;IMEI;ERB\n01/02/2024 10:05;490154203237518;CGI-1\n".encode()
+    eventos = {nome: processar_arquivo(dados, nome, ["telefone", "imei"], MAP_PRIMARIO, colocalizacao="imei")["eventos"]
+               for nome, dados in (("iso.csv", iso), ("br.csv", dia_mes))}
+    df = detectar_colocalizacoes(eventos, janela_segundos=15 * 60)
+    assert len(df) == 1 and df.iloc[0]["coocorrencias"] == 1
+    assert {df.iloc[0]["identificador_a"], df.iloc[0]["identificador_b"]} == {"356938035643809", "490154203237518"}
+
+
+def test_falha_nos_eventos_descarta_so_os_eventos(monkeypatch):
+    import processamento
+
+    def _falha(*args, **kwargs):
+        raise ValueError("data ilegível")
+    monkeypatch.setattr(processamento, "extrair_eventos", _falha)
+    dados = "Data/Hora;IMEI;ERB\n01/02/2024 10:05;490154203237518;CGI-1\n".encode()
+    resultado = processar_arquivo(dados, "a.csv", ["telefone", "imei"], MAP_PRIMARIO, colocalizacao="imei")
+    assert resultado["erro"] is None and resultado["eventos"] is None
+    assert "data ilegível" in resultado["aviso"]
+    assert resultado["total_registros"] == 1
@@ -0,0 +1,67 @@
+import pandas as pd
+
+from cruzamento import AcumuladorCruzamentos, VisualizadorCruzamentos, detectar_cruzamentos, detectar_cruzamentos_por_sufixo
+
+
+def _estado(linhas):
+    registros = pd.DataFrame(linhas, columns=["valor", "tipo", "arquivo", "coluna_fonte", "confianca"])
+    acumulador = AcumuladorCruzamentos()
+    acumulador.adicionar(registros)
+    return acumulador.estado()
+
+
+def test_detectar_cruzamentos():
+    estado = _estado([
+        ["+5581991234567", "telefone", "b.csv", "destino", "média"],
+        ["+5581991234567", "telefone", "a.csv", "origem", "alta"],
+        ["+5581991234567", "telefone", "a.csv", "origem", "alta"],
+        ["356938035643809", "imei", "a.csv", "imei", "baixa"],
+        ["356938035643809", "imei", "b.csv", "imei", "baixa"],
+        ["991234567", "telefone", "a.csv", "origem", "baixa"],
+        ["991234567", "telefone", "a.csv", "destino", "baixa"],
+    ])
+    df = detectar_cruzamentos(estado)
+    assert df["valor"].tolist() == ["+5581991234567", "356938035643809"]
+    primeiro = df.iloc[0]
+    # "alta" é a maior confiança, embora "média" seja o maior texto
+    assert primeiro["confianca"] == "alta"
+    assert primeiro["arquivos"] == ["b.csv", "a.csv"]
+    assert primeiro["colunas"] == ["destino", "origem"]
+    assert primeiro["ocorrencias"] == 3
+
+    # Filtro de confiança aplicado antes do cruzamento
+    assert detectar_cruzamentos(estado, ["alta", "média"])["valor"].tolist() == ["+5581991234567"]
+    assert detectar_cruzamentos(estado, ["alta"]).empty
+
+
+def test_visualizador_filtra_ordena_e_pagina():
+    estado = _estado([
+        [f"+55819912345{i:02d}", "telefone", arquivo, "origem", "alta" if i % 2 else "baixa"]
+        for i in range(10) for arquivo in (["a.csv", "b.csv"] if i < 7 else ["b.csv", "c.csv"])
+    ])
+    visualizador = VisualizadorCruzamentos(detectar_cruzamentos(estado))
+    assert len(visualizador) == 10 and visualizador.arquivos == ["a.csv", "b.csv", "c.csv"]
+
+    pagina, total = visualizador.pagina(2, 4, "valor", crescente=True)
+    assert total == 10 and pagina["valor"].tolist() == [f"+55819912345{i:02d}" for i in range(4, 8)]
+
+    pagina, total = visualizador.pagina(1, 4, "valor", arquivo="c.csv", confiancas=["alta"])
+    assert total == 2 and pagina["valor"].tolist() == ["+5581991234509", "+5581991234507"]
+    assert visualizador.pagina(1, 4, busca="4505")[1] == 1
+
+
+def test_detectar_cruzamentos_por_sufixo():
+    estado = _estado([
+        ["+5581991234567", "telefone", "a.csv", "origem", "alta"],
+        ["991234567", "telefone", "b.csv", "destino", "baixa"],
+        ["91234567", "telefone", "c.csv", "destino", "baixa"],
+        # Forma curta e completa no mesmo arquivo: já não acrescenta nenhum arquivo
+        ["+5581988887777", "telefone", "a.csv", "origem", "alta"],
+        ["988887777", "telefone", "a.csv", "destino", "baixa"],
+        ["356938035643809", "imei", "b.csv", "imei", "alta"],
+    ])
+    df = detectar_cruzamentos_por_sufixo(estado)
+    assert df["valor"].tolist() == ["+5581991234567"]
+    assert df.iloc[0]["arquivos"] == ["a.csv", "b.csv", "c.csv"] and df.iloc[0]["ocorrencias"] == 3
+    assert df.iloc[0]["confianca"] == "sufixo" and df["confianca"].cat.ordered
+    assert detectar_cruzamentos_por_sufixo(estado, ["alta"]).empty
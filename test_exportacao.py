@@ -0,0 +1,71 @@
+import io
+import xml.etree.ElementTree as ET
+
+import openpyxl
+import pandas as pd
+
+from exportacao import FORMATOS_EXPORTACAO, exportar, exportar_graphml, exportar_matrizes, exportar_xlsx
+
+
+def _cruzamentos():
+    return pd.DataFrame({
+        "valor": ["+5581991234567", "356938035643809", "991234567"],
+        "tipo": ["telefone", "imei", "telefone"],
+        "confianca": pd.Categorical(["alta", "média", "baixa"]),
+        "arquivos": [["a.csv", "b.xlsx"], ["a.csv", "c.csv"], ["b.xlsx", "c.csv"]],
+        "ocorrencias": [5, 3, 2],
+    })
+
+
+def test_exportar_xlsx_divide_abas_e_mantem_formatacao():
+    df = _cruzamentos()
+    pasta = openpyxl.load_workbook(io.BytesIO(exportar_xlsx([df, df], "Cruzamentos", linhas_por_aba=4)))
+    assert pasta.sheetnames == ["Cruzamentos", "Cruzamentos (2)"]
+    primeira, segunda = pasta.worksheets
+    assert [c.value for c in primeira[1]] == list(df.columns)
+    assert [c.value for c in primeira[2]] == ["+5581991234567", "telefone", "alta", "['a.csv', 'b.xlsx']", 5]
+    assert primeira.max_row == 5 and segunda.max_row == 3
+    for aba in pasta.worksheets:
+        regras = [regra.formula[0] for faixa in aba.conditional_formatting for regra in faixa.rules]
+        assert regras == ['"alta"', '"média"', '"baixa"', '"sufixo"']
+
+
+def test_exportar_csv_gz_e_parquet():
+    df = _cruzamentos()
+    csv = pd.read_csv(io.BytesIO(exportar("CSV.GZ", [df, df], "Cruzamentos")), compression="gzip", dtype=str)
+    assert len(csv) == 6 and csv["valor"].iloc[3] == "+5581991234567"
+    if "Parquet" in FORMATOS_EXPORTACAO:
+        parquet = pd.read_parquet(io.BytesIO(exportar("Parquet", [df, df.head(1)], "Cruzamentos")))
+        assert len(parquet) == 4 and list(parquet["arquivos"].iloc[0]) == ["a.csv", "b.xlsx"]
+
+
+def test_exportar_sem_blocos_grava_so_o_cabecalho():
+    colunas = ["valor", "tipo", "confianca"]
+    pasta = openpyxl.load_workbook(io.BytesIO(exportar("XLSX", iter([]), "Todos os Registros", colunas)))
+    assert [c.value for c in pasta.worksheets[0][1]] == colunas
+
+
+def test_exportar_matrizes_uma_aba_por_matriz():
+    arquivos = ["a.csv", "b.xlsx"]
+    matrizes = {
+        "Compartilhados - telefone": pd.DataFrame([[3, 1], [1, 2]], index=arquivos, columns=arquivos),
+        "Jaccard - telefone": pd.DataFrame([[1.0, 0.25], [0.25, 1.0]], index=arquivos, columns=arquivos),
+    }
+    pasta = openpyxl.load_workbook(io.BytesIO(exportar_matrizes(matrizes)))
+    assert pasta.sheetnames == list(matrizes)
+    aba = pasta["Jaccard - telefone"]
+    assert [c.value for c in aba[1]] == ["arquivo", "a.csv", "b.xlsx"]
+    assert [c.value for c in aba[3]] == ["b.xlsx", 0.25, 1.0]
+    assert len(aba.conditional_formatting) == 1
+
+
+def test_exportar_graphml_com_atributos():
+    nos = pd.DataFrame({"id": ["imei:1", "arquivo:a&b.csv"], "tipo": ["imei", "arquivo"], "cluster": [1, 1]})
+    arestas = pd.DataFrame({"origem": ["imei:1"], "destino": ["arquivo:a&b.csv"], "relacao": ["presente_em"], "peso": [2]})
+    raiz = ET.fromstring(exportar_graphml(nos, arestas))
+    ns = {"g": "http://graphml.graphdrawing.org/xmlns"}
+    assert [n.get("id") for n in raiz.iterfind(".//g:node", ns)] == ["imei:1", "arquivo:a&b.csv"]
+    aresta = raiz.find(".//g:edge", ns)
+    assert aresta.get("target") == "arquivo:a&b.csv"
+    assert {d.get("key"): d.text for d in aresta} == {"edge_relacao": "presente_em", "edge_peso": "2"}
+    assert raiz.find(".//g:key[@id='edge_peso']", ns).get("attr.type") == "long"
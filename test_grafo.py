@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from grafo import GrafoVinculos, arestas_mesma_linha, componentes_conexos
+from normalizacao import CacheNormalizacao
+
+
+def _estado(linhas):
+    return pd.DataFrame(linhas, columns=["valor", "tipo", "arquivo", "confianca", "ocorrencias"]).assign(coluna_fonte="c")
+
+
+def test_componentes_conexos_em_arrays():
+    rotulos = componentes_conexos(7, [5, 1, 3, 2], [4, 0, 4, 3])
+    assert rotulos.tolist() == [0, 0, 2, 2, 2, 2, 6]
+    # Caminho longo em ordem embaralhada: um único componente
+    ordem = np.random.default_rng(0).permutation(10_000)
+    assert (componentes_conexos(10_000, ordem[:-1], ordem[1:]) == 0).all()
+
+
+def test_arestas_mesma_linha_ligam_os_valores_de_cada_registro():
+    df = pd.DataFrame({"msisdn": ["81991234567", "81991234567", "", "81977776666"],
+                       "imei": ["356938035643809", "356938035643809", "490154203237518", ""]})
+    arestas = arestas_mesma_linha(df, {"telefone": [0], "imei": [1]}, CacheNormalizacao())
+    assert arestas.values.tolist() == [["+5581991234567", "telefone", "356938035643809", "imei", 2]]
+
+
+def test_grafo_segue_cadeias_entre_arquivos():
+    estado = _estado([
+        ("+5581991234567", "telefone", "a.csv", "alta", 1), ("356938035643809", "imei", "a.csv", "média", 2),
+        ("356938035643809", "imei", "b.csv", "alta", 1), ("+5581977776666", "telefone", "b.csv", "baixa", 1),
+        ("+5581966665555", "telefone", "c.csv", "alta", 1),
+    ])
+    linha = pd.DataFrame({"valor_a": ["+5581991234567", "356938035643809"], "tipo_a": ["telefone", "imei"],
+                          "valor_b": ["356938035643809", "+5581977776666"], "tipo_b": ["imei", "telefone"], "peso": [1, 1]})
+    grafo = GrafoVinculos(estado, linha)
+
+    # Só pela mesma linha: telefone A - IMEI X - telefone B num único cluster; o valor isolado fica de fora
+    clusters = grafo.clusters(usar_arquivos=False)
+    assert clusters[["cluster", "valores", "arquivos", "arestas"]].values.tolist() == [[1, 3, 2, 2]]
+    assert clusters["confianca"].iloc[0] == "alta" and clusters["tipos"].iloc[0] == "telefone: 2, imei: 1"
+    assert set(grafo.nos(False)["id"]) == {"telefone:+5581991234567", "imei:356938035643809", "telefone:+5581977776666"}
+
+    # Com os arquivos: a.csv e b.csv entram como nós ligados pelo IMEI
+    arestas = grafo.arestas(usar_arquivos=True, clusters=[1])
+    assert set(arestas["relacao"]) == {"mesma_linha", "presente_em"} and len(arestas) == 6
+    assert ("imei:356938035643809", "arquivo:b.csv") in set(zip(arestas["origem"], arestas["destino"]))
+    assert len(GrafoVinculos(estado).clusters(usar_arquivos=True)) == 1
@@ -0,0 +1,52 @@
+import pandas as pd
+
+from indice import IndiceInvertido
+
+
+def _indice():
+    estado = pd.DataFrame([
+        ["+5581991234567", "telefone", "a.csv", "origem", "alta", 2],
+        ["+5581991234567", "telefone", "b.csv", "destino", "alta", 1],
+        ["+5581991234567", "telefone", "c.csv", "destino", "média", 4],
+        ["356938035643809", "imei", "a.csv", "imei", "alta", 1],
+        ["356938035643809", "imei", "c.csv", "imei", "alta", 1],
+        ["991234567", "telefone", "b.csv", "origem", "baixa", 3],
+    ], columns=["valor", "tipo", "arquivo", "coluna_fonte", "confianca", "ocorrencias"])
+    return IndiceInvertido(estado, ["a.csv", "b.csv", "c.csv"])
+
+
+def test_consultar_normaliza_o_valor_digitado():
+    df = _indice().consultar("(81) 99123-4567")
+    assert df["arquivo"].tolist() == ["a.csv", "b.csv", "c.csv"]
+    assert df["ocorrencias"].tolist() == [2, 1, 4]
+    assert _indice().consultar("000").empty
+
+
+def test_compartilhados_e_em_pelo_menos():
+    indice = _indice()
+    assert indice.compartilhados(["a.csv", "c.csv"])["valor"].tolist() == ["+5581991234567", "356938035643809"]
+    assert indice.compartilhados(["b.csv"])["valor"].tolist() == ["+5581991234567", "991234567"]
+    df = indice.em_pelo_menos(3)
+    assert df["valor"].tolist() == ["+5581991234567"]
+    assert df.iloc[0]["arquivos"] == ["a.csv", "b.csv", "c.csv"] and df.iloc[0]["ocorrencias"] == 7
+
+
+def test_compartilhados_com_muitos_arquivos():
+    arquivos = [f"f{i}.csv" for i in range(130)]
+    estado = pd.DataFrame({"valor": "x@gmail.com", "tipo": "email", "arquivo": arquivos[::64],
+                           "coluna_fonte": "email", "confianca": "alta", "ocorrencias": 1})
+    indice = IndiceInvertido(estado, arquivos)
+    assert indice.compartilhados(["f0.csv", "f64.csv", "f128.csv"])["valor"].tolist() == ["x@gmail.com"]
+    assert indice.compartilhados(["f1.csv"]).empty
+
+
+def test_sobreposicao_entre_arquivos():
+    compartilhados, jaccard = _indice().sobreposicao()
+    assert compartilhados.to_numpy().tolist() == [[2, 1, 2], [1, 2, 1], [2, 1, 2]]
+    assert jaccard.loc["a.csv", "b.csv"] == 0.3333 and jaccard.loc["a.csv", "c.csv"] == 1.0
+    compartilhados, jaccard = _indice().sobreposicao("imei")
+    assert compartilhados.loc["a.csv", "c.csv"] == 1 and compartilhados.loc["b.csv"].sum() == 0
+    assert jaccard.loc["b.csv", "b.csv"] == 0.0
+    pares = _indice().pares_sobrepostos()
+    assert pares[["arquivo_a", "arquivo_b"]].values.tolist() == [["a.csv", "c.csv"], ["a.csv", "b.csv"], ["b.csv", "c.csv"]]
+    assert pares["compartilhados"].tolist() == [2, 1, 1]
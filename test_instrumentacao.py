@@ -0,0 +1,48 @@
+import json
+import time
+
+from instrumentacao import MedidorEtapas, registrar_execucao, rss_atual_mib, tabela_etapas
+from processamento import processar_arquivo
+
+
+def test_medidor_desconta_etapas_internas():
+    medidor = MedidorEtapas()
+    with medidor.medir("leitura"):
+        time.sleep(0.02)
+        with medidor.medir("cabecalho"):
+            time.sleep(0.05)
+    medidor.contar("leitura", linhas=1000)
+    etapas = {linha["etapa"]: linha for linha in medidor.linhas("a.csv")}
+    assert list(etapas) == ["cabecalho", "leitura"]
+    assert etapas["cabecalho"]["segundos"] >= 0.05 and etapas["leitura"]["segundos"] < 0.05
+    tabela = tabela_etapas(medidor.linhas("a.csv")).set_index("etapa")
+    assert tabela.loc["leitura", "linhas_por_s"] > 1000
+
+
+def test_processar_arquivo_mede_etapas_e_registra_execucao(tmp_path):
+    dados = b"relatorio\n\nmsisdn;imei\n81991234567;356938035643809\n81991234567;356938035643809\n"
+    resultado = processar_arquivo(dados, "a.csv", ["telefone", "imei"], {"telefone": ["msisdn"], "imei": ["imei"]})
+    etapas = {linha["etapa"]: linha for linha in resultado["etapas"]}
+    assert {"cabecalho", "leitura", "classificacao", "normalizacao", "reducao"} <= set(etapas)
+    assert etapas["leitura"]["linhas"] == 2 and etapas["normalizacao"]["registros"] == 4
+
+    caminho = tmp_path / "logs" / "execucoes.jsonl"
+    registrar_execucao({"arquivos": 1, "etapas": resultado["etapas"]}, str(caminho))
+    registrar_execucao({"arquivos": 2}, str(caminho))
+    linhas = [json.loads(linha) for linha in caminho.read_text(encoding="utf-8").splitlines()]
+    assert [linha["arquivos"] for linha in linhas] == [1, 2] and "data" in linhas[0]
+
+
+def test_medidor_registra_rss_atual_e_aumento_por_etapa():
+    medidor = MedidorEtapas()
+    with medidor.medir("alocacao"):
+        bloco = bytearray(64 * 1024 ** 2)  # páginas escritas: entram na RSS
+    with medidor.medir("depois"):
+        pass
+    del bloco
+    etapas = {linha["etapa"]: linha for linha in medidor.linhas()}
+    if rss_atual_mib() is None:
+        assert etapas["alocacao"]["rss_mib"] is None
+        return
+    # A etapa seguinte não herda o aumento (o pico do processo, ru_maxrss, continuaria no máximo)
+    assert etapas["alocacao"]["aumento_rss_mib"] >= 48 and etapas["depois"]["aumento_rss_mib"] < 16
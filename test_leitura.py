@@ -0,0 +1,96 @@
+import io
+
+import pandas as pd
+
+from leitura import detectar_cabecalho, detectar_dialeto, ler_planilha, ler_planilha_em_blocos, listar_abas, nome_fonte
+
+
+class ArquivoEnviado(io.BytesIO):
+    def __init__(self, dados, name):
+        super().__init__(dados)
+        self.name = name
+
+
+def test_detectar_cabecalho_ignora_linhas_de_titulo():
+    linhas = [["Relatório da operadora"], [], ["", "", ""], ["data", "msisdn", "imei"], ["2024-01-01", "81991234567", "1"]]
+    assert detectar_cabecalho(linhas) == 3
+
+
+def test_ler_planilha_csv_com_preambulo():
+    dados = "Relatorio operadora\n\nData;MSISDN;IMEI\n2024-01-01;81991234567;356938035643809\n".encode("utf-8")
+    df = ler_planilha(ArquivoEnviado(dados, "a.csv"), "a.csv")
+    assert list(df.columns) == ["Data", "MSISDN", "IMEI"]
+    assert df.iloc[0]["MSISDN"] == "81991234567"
+
+
+def test_ler_planilha_excel_com_preambulo():
+    saida = io.BytesIO()
+    with pd.ExcelWriter(saida, engine="xlsxwriter") as writer:
+        pd.DataFrame([["Extrato"], [None], ["telefone", "imei"], ["81991234567", "356938035643809"]]).to_excel(
+            writer, index=False, header=False)
+    df = ler_planilha(ArquivoEnviado(saida.getvalue(), "b.xlsx"), "b.xlsx")
+    assert list(df.columns) == ["telefone", "imei"]
+    assert df.iloc[0].tolist() == ["81991234567", "356938035643809"]
+
+
+def test_detectar_dialeto_cp1252_ponto_e_virgula():
+    dados = "Número;Usuário\n81991234567;João\n".encode("cp1252")
+    arquivo = ArquivoEnviado(dados, "c.csv")
+    dialeto = detectar_dialeto(arquivo)
+    assert (dialeto.delimitador, dialeto.aspas, dialeto.codificacao) == (";", '"', "cp1252")
+    df = ler_planilha(arquivo, "c.csv", dialeto=dialeto)
+    assert df.iloc[0].tolist() == ["81991234567", "João"]
+
+
+def test_cp1252_com_acentos_depois_da_amostra_nao_falha_na_leitura():
+    # Amostra inicial só com ASCII (detectada como utf-8); o acento em cp1252 vem depois dela
+    dados = b"telefone;cidade\n" + b"81991234567;Recife\n" * 5000 + "81988887777;São Paulo\n".encode("cp1252")
+    arquivo = ArquivoEnviado(dados, "e.csv")
+    dialeto = detectar_dialeto(arquivo)
+    assert dialeto.codificacao == "utf-8" and len(dados) > 64 * 1024
+    assert ler_planilha(arquivo, "e.csv", dialeto=dialeto)["cidade"].iloc[-1] == "São Paulo"
+    blocos = list(ler_planilha_em_blocos(arquivo, "e.csv", dialeto=dialeto, tamanho_bloco=1000))
+    assert blocos[-1]["cidade"].iloc[-1] == "São Paulo"
+
+def test_detectar_dialeto_utf8_com_bom():
+    dados = "﻿telefone\timei\n81991234567\t356938035643809\n".encode("utf-8")
+    arquivo = ArquivoEnviado(dados, "d.csv")
+    dialeto = detectar_dialeto(arquivo)
+    assert (dialeto.delimitador, dialeto.codificacao) == ("\t", "utf-8-sig")
+    assert list(ler_planilha(arquivo, "d.csv", dialeto=dialeto).columns) == ["telefone", "imei"]
+
+
+def test_ler_planilha_em_blocos_equivale_a_leitura_completa():
+    saida = io.BytesIO()
+    linhas = [["Extrato"], [None], ["telefone", "imei", "data"]]
+    linhas += [[f"8199123{i:04d}", 356938035643800 + i, "#N/A" if i % 3 else 1.0] for i in range(25)]
+    with pd.ExcelWriter(saida, engine="xlsxwriter") as writer:
+        pd.DataFrame(linhas).to_excel(writer, index=False, header=False)
+    csv_dados = "Titulo\n\n" + pd.DataFrame(linhas[3:], columns=linhas[2]).to_csv(index=False)
+
+    for nome, dados in (("e.xlsx", saida.getvalue()), ("e.csv", csv_dados.encode("utf-8"))):
+        completo = ler_planilha(ArquivoEnviado(dados, nome), nome)
+        blocos = list(ler_planilha_em_blocos(ArquivoEnviado(dados, nome), nome, tamanho_bloco=7))
+        assert len(blocos) == 4
+        em_blocos = pd.concat(blocos, ignore_index=True)
+        assert list(em_blocos.columns) == list(completo.columns)
+        assert em_blocos.astype(object).equals(completo.astype(object))
+
+
+def test_pasta_com_varias_abas_lida_aba_por_aba():
+    saida = io.BytesIO()
+    with pd.ExcelWriter(saida, engine="xlsxwriter") as writer:
+        pd.DataFrame([["Extrato"], [None], ["msisdn", "imei"], ["81991234567", "356938035643809"]]).to_excel(
+            writer, sheet_name="Jan", index=False, header=False)
+        pd.DataFrame({"telefone": ["81977776666", "81966665555"]}).to_excel(writer, sheet_name="Fev", index=False)
+    dados = saida.getvalue()
+
+    assert listar_abas(ArquivoEnviado(dados, "m.xlsx"), "m.xlsx") == ["Jan", "Fev"]
+    assert listar_abas(ArquivoEnviado(b"a;b\n", "m.csv"), "m.csv") is None
+    assert nome_fonte("m.xlsx", "Fev") == "m.xlsx [Fev]" and nome_fonte("m.csv") == "m.csv"
+
+    fev = pd.concat(ler_planilha_em_blocos(ArquivoEnviado(dados, "m.xlsx"), "m.xlsx", tamanho_bloco=1, aba="Fev"))
+    assert list(fev.columns) == ["telefone"] and fev["telefone"].tolist() == ["81977776666", "81966665555"]
+    # Sem aba: a primeira, como antes
+    assert list(ler_planilha(ArquivoEnviado(dados, "m.xlsx"), "m.xlsx").columns) == ["msisdn", "imei"]
+    assert list(ler_planilha(ArquivoEnviado(dados, "m.xlsx"), "m.xlsx", aba="Fev").columns) == ["telefone"]
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+import re
+
+from normalizacao import CacheNormalizacao, NORMALIZADORES, NORMALIZADORES_VETORIZADOS, _como_texto, _digitos_excel, _limpar_valor_excel, _texto_da_matriz, classificar_colunas
+
+AMOSTRAS = [
+    None, np.nan, "", "   ", "nan", "abc", "0", "-0", "-0.4", "0.5", "1.5", "2.5",
+    "81991234567", "8191234567", "8131234567", "81 3123-4567", "(81) 99123-4567",
+    "5581991234567", "+55 81 99123-4567", "05581991234567", "081991234567", "0081991234567",
+    "91234567", "31234567", "991234567", "00000000", "11111111111", "5.581991234567e12",
+    "5.581991234567E+12", "81991234567.0", "5581991234567.0", "1e400", "-1e400",
+    "123456789012345678901", "9" * 25, "4" + "0" * 30, "٣٣٣٤٥٦٧٨٩٠١",
+    "356938035643809", "35693803564380", "3569380356438090", "356938035643809.0",
+    "3.56938035643809e14", "IMEI 35-693803-564380-9", "12345678", "1234567",
+    "Fulano+tag@Gmail.com ", "a@b", "@x.com", "semarroba.com", "curto", "abc",
+    "d41d8cd98f00b204e9800998ecf8427e", "D41D8CD98F00B204", "zz deadbeef zz", "xyz1",
+    "abc", "ab", "ß", " loc-01 ", 81991234567.0, 5581991234567, 3.56938035643809e14, -5.5,
+]
+
+
+def _comparar(tipo, strict):
+    serie = pd.Series(AMOSTRAS, dtype=object, index=range(10, 10 + len(AMOSTRAS)))
+    valores, confiancas = NORMALIZADORES_VETORIZADOS[tipo](serie, strict)
+    assert list(valores.index) == list(serie.index)
+    for v, valor, confianca in zip(AMOSTRAS, valores, confiancas):
+        assert (valor, confianca) == NORMALIZADORES[tipo](v, strict), (tipo, strict, v)
+
+
+def test_digitos_excel_equivalem_ao_escalar():
+    codigos, _, escalar = _digitos_excel(_como_texto(pd.Series(AMOSTRAS, dtype=object)))
+    digitos = _texto_da_matriz(codigos)
+    for v, d, e in zip(AMOSTRAS, digitos, escalar):
+        if not e:
+            assert d == re.sub(r"\D", "", _limpar_valor_excel(v)), v
+
+
+def test_normalizadores_vetorizados_equivalem_aos_escalares():
+    for tipo in NORMALIZADORES:
+        for strict in (False, True):
+            _comparar(tipo, strict)
+
+
+def test_normalizadores_vetorizados_coluna_vazia():
+    for tipo, normalizador in NORMALIZADORES_VETORIZADOS.items():
+        valores, confiancas = normalizador(pd.Series([], dtype=object))
+        assert valores.empty and confiancas.empty
+
+
+def test_normalizadores_vetorizados_coluna_str():
+    serie = pd.Series(["81991234567", "", "8131234567"], dtype=str)
+    valores, confiancas = NORMALIZADORES_VETORIZADOS["telefone"](serie)
+    assert valores.tolist() == ["+5581991234567", None, "+558131234567"]
+    assert confiancas.tolist() == ["alta", None, "alta"]
+
+
+def test_cache_normalizacao_equivale_e_conta_acertos():
+    cache = CacheNormalizacao()
+    serie = pd.Series(AMOSTRAS * 3, dtype=object)
+    for tipo in NORMALIZADORES:
+        valores, confiancas = cache.normalizar(tipo, serie)
+        esperado_v, esperado_c = NORMALIZADORES_VETORIZADOS[tipo](serie)
+        assert valores.tolist() == esperado_v.tolist()
+        assert confiancas.tolist() == esperado_c.tolist()
+
+    antes = cache.normalizados
+    cache.normalizar("telefone", serie)
+    assert cache.normalizados == antes
+    assert 0 < cache.taxa_acerto < 1
+
+
+def test_cache_normalizacao_respeita_limite():
+    cache = CacheNormalizacao(max_valores=5)
+    cache.normalizar("imei", pd.Series([str(356938035643800 + i) for i in range(20)]))
+    assert len(cache._memoria[("imei", False)]) == 5
+
+
+def test_classificar_colunas_pelo_conteudo():
+    n = 400
+    df = pd.DataFrame({
+        "data": ["2024-01-01 10:00:00"] * n,
+        "cell id": ["12345678"] * n,         # nome reconhecido ("id") e conteúdo válido, ainda que fraco
+        "b": ["81991234567"] * n,            # nome desconhecido, conteúdo de telefone
+        "imei": ["356938035643809", ""] * (n // 2),
+        "id": ["x"] * n,                     # nome reconhecido (imei), conteúdo inválido
+    })
+    map_primario = {"telefone": ["telefone", "msisdn"], "imei": ["imei", "id"]}
+    colunas_por_tipo, pontuacoes = classificar_colunas(df, ["telefone", "imei"], map_primario)
+    assert colunas_por_tipo == {"telefone": [2], "imei": [1, 3]}
+    assert len(pontuacoes) == 10
+    assert pontuacoes.set_index(["coluna", "tipo"]).loc[("imei", "imei"), "pontuacao"] == 1.0
+
+    # Tipos que aceitam qualquer texto só são atribuídos pelo nome
+    colunas_por_tipo, _ = classificar_colunas(df, ["id_localizacao"], {"id_localizacao": ["location id"]})
+    assert colunas_por_tipo == {"id_localizacao": []}
@@ -0,0 +1,125 @@
+import gc
+import hashlib
+import io
+import os
+import tempfile
+
+import pandas as pd
+
+from normalizacao import CacheNormalizacao
+from processamento import (CacheArquivos, RegistrosEmDisco, chave_arquivo, processar_arquivo, processar_em_paralelo,
+                           tamanho_resultado)
+
+MAP_PRIMARIO = {"telefone": ["telefone", "msisdn"], "imei": ["imei"]}
+
+
+def _resultado(nome, dados):
+    return processar_arquivo(dados, nome, ["telefone", "imei"], MAP_PRIMARIO)
+
+
+def test_cache_arquivos_reaproveita_por_conteudo_e_nome():
+    dados = b"msisdn;imei\n81991234567;356938035643809\n"
+    cache = CacheArquivos()
+    chave = chave_arquivo(dados, "a.csv", "Extratos de ERBs", False)
+    assert cache.obter(chave) is None
+    resultado = _resultado("a.csv", dados)
+    cache.guardar(chave, resultado)
+    assert cache.obter(chave_arquivo(bytes(dados), "a.csv", "Extratos de ERBs", False)) is resultado
+    # O nome do arquivo vai para os registros: mesmo conteúdo com outro nome não reaproveita
+    assert cache.obter(chave_arquivo(dados, "b.csv", "Extratos de ERBs", False)) is None
+    assert cache.obter(chave_arquivo(dados, "a.csv", "Extratos de ERBs", True)) is None
+    assert (cache.acertos, cache.falhas) == (1, 3)
+
+
+def test_cache_arquivos_respeita_orcamento():
+    resultados = {nome: _resultado(f"{nome}.csv", f"msisdn\n8199123456{i}\n".encode()) for i, nome in enumerate("abc")}
+    cache = CacheArquivos(memoria_maxima=2 * max(tamanho_resultado(r) for r in resultados.values()))
+    cache.guardar("a", resultados["a"])
+    cache.guardar("b", resultados["b"])
+    cache.obter("a")  # "a" passa a ser o usado mais recentemente
+    cache.guardar("c", resultados["c"])
+    assert len(cache) == 2 and cache.memoria <= cache.memoria_maxima
+    assert cache.obter("b") is None and cache.obter("a") is not None
+
+    # Resultados com erro não são guardados
+    cache.guardar("x", dict(resultados["a"], erro="falha"))
+    assert cache.obter("x") is None
+
+
+def test_cada_aba_e_uma_fonte_com_chave_propria():
+    saida = io.BytesIO()
+    with pd.ExcelWriter(saida, engine="xlsxwriter") as writer:
+        pd.DataFrame({"msisdn": ["81991234567"]}).to_excel(writer, sheet_name="Jan", index=False)
+        pd.DataFrame({"imei": ["356938035643809"]}).to_excel(writer, sheet_name="Fev", index=False)
+    dados = saida.getvalue()
+
+    fev = processar_arquivo(dados, "m.xlsx", ["telefone", "imei"], MAP_PRIMARIO, aba="Fev")
+    assert fev["nome"] == "m.xlsx [Fev]" and fev["erro"] is None
+    assert fev["estado"][["valor", "arquivo"]].values.tolist() == [["356938035643809", "m.xlsx [Fev]"]]
+    assert chave_arquivo(dados, "m.xlsx", "Extratos de ERBs", False, aba="Jan") != \
+        chave_arquivo(dados, "m.xlsx", "Extratos de ERBs", False, aba="Fev")
+
+
+def test_arquivo_em_disco_lido_pelo_caminho(tmp_path):
+    dados = b"msisdn;imei\n81991234567;356938035643809\n"
+    caminho = tmp_path / "00001.csv"
+    caminho.write_bytes(dados)
+    assert _resultado("a.csv", str(caminho))["estado"].equals(_resultado("a.csv", dados)["estado"])
+    assert _resultado("a.csv", str(tmp_path / "sumiu.csv"))["erro"]
+
+    # Hash calculado na gravação do upload: mesma chave sem reler o conteúdo
+    sha256 = hashlib.sha256(dados).hexdigest()
+    for aba in (None, "Fev"):
+        assert chave_arquivo(None, "a.csv", "Extratos de ERBs", False, aba=aba, sha256=sha256) == \
+            chave_arquivo(dados, "a.csv", "Extratos de ERBs", False, aba=aba)
+
+
+def test_arquivo_interrompido_nao_devolve_dados_parciais():
+    def _interromper(numero_bloco):
+        raise RuntimeError("interrompido")
+
+    dados = b"msisdn;imei\n81991234567;356938035643809\n"
+    for gravar_registros in (False, True):
+        resultado = processar_arquivo(dados, "a.csv", ["telefone", "imei"], MAP_PRIMARIO, gravar_registros=gravar_registros,
+                                      ao_ler_bloco=_interromper)
+        assert resultado["erro"] == "interrompido" and resultado["estado"] is None
+        assert resultado["registros"].registros == 0 and resultado["arquivo_registros"] is None
+        assert resultado["total_registros"] == 0
+
+
+def test_registros_em_disco_apagados_com_o_objeto(tmp_path):
+    caminho = tmp_path / "registros.csv.gz"
+    caminho.write_bytes(b"dados")
+    registros = RegistrosEmDisco(str(caminho))
+    with registros.abrir() as arquivo:
+        assert arquivo.read() == b"dados" and registros.tamanho == 5
+    del registros
+    gc.collect()
+    assert not os.path.exists(caminho)
+
+
+def test_cache_de_normalizacao_compartilhado_entre_arquivos():
+    dados = b"msisdn;imei\n81991234567;356938035643809\n"
+    cache = CacheNormalizacao()
+    primeiro = processar_arquivo(dados, "a.csv", ["telefone", "imei"], MAP_PRIMARIO, cache=cache)
+    segundo = processar_arquivo(dados, "b.csv", ["telefone", "imei"], MAP_PRIMARIO, cache=cache)
+    # Contadores por arquivo; no segundo, os valores repetidos já vêm do cache
+    assert primeiro["celulas"] == segundo["celulas"] > 0
+    assert primeiro["normalizados"] > 0 and segundo["normalizados"] == 0
+    assert (cache.celulas, cache.normalizados) == (primeiro["celulas"] * 2, primeiro["normalizados"])
+
+
+def test_paralelo_interrompido_apaga_os_registros_nao_entregues(tmp_path, monkeypatch):
+    # Os processos do pool gravam os registros no TMPDIR herdado
+    monkeypatch.setenv("TMPDIR", str(tmp_path))
+    monkeypatch.setattr(tempfile, "tempdir", None)
+    tarefas = []
+    for i in range(4):
+        caminho = tmp_path / f"{i}.csv"
+        caminho.write_bytes(b"msisdn\n" + b"8199123456%d\n" % i * 20_000)
+        tarefas.append({"file": str(caminho), "nome_arquivo": caminho.name, "tipos": ["telefone"],
+                        "map_primario": MAP_PRIMARIO, "gravar_registros": True})
+    execucao = processar_em_paralelo(tarefas, max_workers=2)
+    entregue = next(execucao)["arquivo_registros"]
+    execucao.close()
+    assert [nome for nome in os.listdir(tmp_path) if nome.endswith(".csv.gz")] == [os.path.basename(entregue)]
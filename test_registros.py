@@ -0,0 +1,53 @@
+import io
+
+import pandas as pd
+
+from normalizacao import COLUNAS_REGISTRO
+from registros import ArmazemRegistros, desempacotar_valores, empacotar_valores
+
+
+def _registros(valores, arquivo):
+    return pd.DataFrame({
+        "valor": valores,
+        "tipo": "telefone",
+        "confianca": ["alta", "baixa"] * (len(valores) // 2) + ["alta"] * (len(valores) % 2),
+        "arquivo": arquivo,
+        "valor_original": [f"orig {v}" for v in valores],
+        "coluna_fonte": "msisdn",
+    }, columns=COLUNAS_REGISTRO)
+
+
+def test_empacotar_valores_ida_e_volta():
+    valores = ["+5581991234567", "356938035643809", "081991234567", "+0123", "fulano@gmail.com",
+               "1234567890123456789", "991234567", "+5581991234567"]
+    numeros, textos = empacotar_valores(valores)
+    assert numeros[0] == -5581991234567 and numeros[1] == 356938035643809
+    # Zeros à esquerda, texto e números longos demais continuam como texto
+    assert list(textos.index) == [2, 3, 4, 5]
+    assert list(desempacotar_valores(numeros, textos)) == valores
+
+
+def test_armazem_devolve_os_mesmos_registros_com_menos_memoria():
+    blocos = [
+        _registros(["+5581991234567", "356938035643809", "fulano@gmail.com", "+5581991234567"] * 500, "a.csv"),
+        _registros(["+558131234567", "081991234567"] * 300, "b.xlsx"),
+    ]
+    armazem, outro = ArmazemRegistros(), ArmazemRegistros()
+    armazem.adicionar(blocos[0])
+    outro.adicionar(blocos[1])
+    armazem.incorporar(outro)
+
+    df = armazem.dataframe()
+    esperado = pd.concat(blocos, ignore_index=True)
+    assert armazem.registros == len(esperado)
+    assert df["arquivo"].dtype == "category" and df["confianca"].dtype == "category"
+    assert df.astype(object).equals(esperado.astype(object))
+    # Referência: colunas object, como extrair_registros as produz
+    assert armazem.memoria() < esperado.astype(object).memory_usage(index=False, deep=True).sum() / 3
+
+    # Colunas categóricas seguem exportáveis
+    df.to_excel(io.BytesIO(), index=False, engine="xlsxwriter")
+
+
+def test_armazem_vazio():
+    assert list(ArmazemRegistros().dataframe().columns) == COLUNAS_REGISTRO
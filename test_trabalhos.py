@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pytest
+
+from trabalhos import CANCELADO, CONCLUIDO, EXECUTANDO, FALHOU, NA_FILA, GerenciadorTrabalhos
+
+
+def _esperar(trabalho, limite=5):
+    fim = time.time() + limite
+    while not trabalho.encerrado and time.time() < fim:
+        time.sleep(0.01)
+    assert trabalho.encerrado
+
+
+@pytest.fixture
+def gerenciador():
+    gerenciador = GerenciadorTrabalhos(simultaneos=1)
+    yield gerenciador
+    gerenciador.encerrar()
+
+
+def test_trabalho_informa_progresso_e_devolve_resultado(gerenciador):
+    def somar(trabalho, valores):
+        for i, _ in enumerate(valores, 1):
+            trabalho.informar(i / len(valores), f"{i}/{len(valores)}")
+        return sum(valores)
+
+    trabalho = gerenciador.submeter(somar, descricao="soma", valores=[1, 2, 3])
+    _esperar(trabalho)
+    assert (trabalho.estado, trabalho.resultado, trabalho.progresso, trabalho.mensagem) == (CONCLUIDO, 6, 1.0, "3/3")
+    assert gerenciador.obter(trabalho.id) is trabalho
+
+    falho = gerenciador.submeter(lambda trabalho: 1 / 0)
+    _esperar(falho)
+    assert falho.estado == FALHOU and "division by zero" in falho.erro and "ZeroDivisionError" in falho.detalhe
+
+    gerenciador.descartar(trabalho.id)
+    assert gerenciador.obter(trabalho.id) is None
+
+
+def test_limite_de_trabalhos_simultaneos_e_cancelamento(gerenciador):
+    liberar = threading.Event()
+
+    def esperar(trabalho):
+        while not liberar.wait(0.01):
+            trabalho.verificar()
+        return "ok"
+
+    primeiro = gerenciador.submeter(esperar)
+    segundo, terceiro = gerenciador.submeter(esperar), gerenciador.submeter(esperar)
+    while primeiro.estado != EXECUTANDO:
+        time.sleep(0.01)
+    # Um trabalho por vez: os outros aguardam na fila, em ordem de chegada
+    assert (segundo.estado, terceiro.estado) == (NA_FILA, NA_FILA)
+    assert (gerenciador.posicao_na_fila(segundo), gerenciador.posicao_na_fila(terceiro)) == (1, 2)
+    assert gerenciador.contagem() == {EXECUTANDO: 1, NA_FILA: 2}
+
+    # Cancelado na fila não chega a executar; em execução, para no próximo ponto de verificação
+    gerenciador.cancelar(segundo.id)
+    gerenciador.cancelar(primeiro.id)
+    _esperar(primeiro)
+    _esperar(segundo)
+    assert (primeiro.estado, segundo.estado, segundo.inicio) == (CANCELADO, CANCELADO, None)
+    liberar.set()
+    _esperar(terceiro)
+    assert terceiro.resultado == "ok"
+
+    # Encerrados há mais tempo que a retenção saem do registro
+    gerenciador.retencao_segundos = -1
+    gerenciador.limpar()
+    assert gerenciador.contagem() == {}
@@ -0,0 +1,151 @@
+# trabalhos.py
+
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Trabalhos em Segundo Plano ---
+
+# Trabalhos executados ao mesmo tempo no servidor; os demais aguardam na fila, por ordem de chegada
+TRABALHOS_SIMULTANEOS = int(os.environ.get("COMPARADOR_TRABALHOS_SIMULTANEOS", "2"))
+RETENCAO_SEGUNDOS = 3600  # trabalhos encerrados que nenhuma sessão recolheu são descartados depois disso
+
+NA_FILA, EXECUTANDO, CONCLUIDO, CANCELADO, FALHOU = "na fila", "executando", "concluído", "cancelado", "falhou"
+ENCERRADOS = (CONCLUIDO, CANCELADO, FALHOU)
+
+
+class TrabalhoCancelado(Exception):
+    """Interrompe o trabalho no próximo ponto de verificação depois de pedido o cancelamento."""
+
+
+class Trabalho:
+    """
+    Um trabalho e o seu estado, lido pelas sessões enquanto outra thread o executa: progresso
+    (0 a 1) e mensagem, pedido de cancelamento e, ao final, o resultado ou o erro. O cancelamento
+    é cooperativo: a função do trabalho chama `verificar()` entre as etapas.
+    """
+
+    def __init__(self, descricao=""):
+        self.id = uuid.uuid4().hex
+        self.descricao = descricao
+        self.estado = NA_FILA
+        self.progresso, self.mensagem = 0.0, "Aguardando na fila"
+        self.resultado = self.erro = self.detalhe = None
+        self.criado, self.inicio, self.fim = time.time(), None, None
+        self._cancelar = threading.Event()
+
+    def informar(self, progresso=None, mensagem=None):
+        if progresso is not None:
+            self.progresso = min(max(float(progresso), 0.0), 1.0)
+        if mensagem is not None:
+            self.mensagem = mensagem
+
+    def cancelar(self):
+        self._cancelar.set()
+
+    @property
+    def cancelamento_pedido(self):
+        return self._cancelar.is_set()
+
+    def verificar(self):
+        if self._cancelar.is_set():
+            raise TrabalhoCancelado("Trabalho cancelado")
+
+    @property
+    def encerrado(self):
+        return self.estado in ENCERRADOS
+
+    def segundos(self):
+        """Tempo de execução até agora (ou até o fim); zero enquanto está na fila."""
+        if self.inicio is None:
+            return 0.0
+        return (self.fim or time.time()) - self.inicio
+
+    def _executar(self, funcao, argumentos):
+        if self._cancelar.is_set():
+            self.fim, self.estado = time.time(), CANCELADO
+            return
+        self.inicio, self.estado = time.time(), EXECUTANDO
+        try:
+            self.resultado = funcao(self, **argumentos)
+            estado = CONCLUIDO
+        except TrabalhoCancelado:
+            estado = CANCELADO
+        except Exception as e:
+            self.erro, self.detalhe = f"{e}", traceback.format_exc()
+            estado = FALHOU
+        # O estado é o último a mudar: quem o vê encerrado já encontra o resultado (ou o erro)
+        self.fim = time.time()
+        self.estado = estado
+
+
+class GerenciadorTrabalhos:
+    """
+    Registro dos trabalhos do servidor, mantido fora da sessão do Streamlit: sobrevive às
+    reexecuções do script e é compartilhado pelas sessões dos analistas. No máximo `simultaneos`
+    trabalhos executam ao mesmo tempo, numa pool de threads; os outros esperam na fila.
+    """
+
+    def __init__(self, simultaneos=TRABALHOS_SIMULTANEOS, retencao_segundos=RETENCAO_SEGUNDOS):
+        self.simultaneos = max(1, int(simultaneos))
+        self.retencao_segundos = retencao_segundos
+        self._pool = ThreadPoolExecutor(max_workers=self.simultaneos, thread_name_prefix="trabalho")
+        self._trabalhos = {}
+        self._lock = threading.Lock()
+
+    def submeter(self, funcao, descricao="", **argumentos):
+        """Enfileira `funcao(trabalho, **argumentos)` e devolve o Trabalho (use o `id` para consultá-lo)."""
+        self.limpar()
+        trabalho = Trabalho(descricao)
+        with self._lock:
+            self._trabalhos[trabalho.id] = trabalho
+        self._pool.submit(trabalho._executar, funcao, argumentos)
+        return trabalho
+
+    def obter(self, trabalho_id):
+        with self._lock:
+            return self._trabalhos.get(trabalho_id)
+
+    def cancelar(self, trabalho_id):
+        trabalho = self.obter(trabalho_id)
+        if trabalho is not None:
+            trabalho.cancelar()
+        return trabalho
+
+    def descartar(self, trabalho_id):
+        """Remove do registro um trabalho já recolhido (ou cancela e remove um ainda em andamento)."""
+        with self._lock:
+            trabalho = self._trabalhos.pop(trabalho_id, None)
+        if trabalho is not None and not trabalho.encerrado:
+            trabalho.cancelar()
+
+    def posicao_na_fila(self, trabalho):
+        """Posição (1 = o próximo a executar) de um trabalho na fila; 0 se já não está nela."""
+        if trabalho.estado != NA_FILA:
+            return 0
+        with self._lock:
+            return sum(1 for t in self._trabalhos.values() if t.estado == NA_FILA and t.criado <= trabalho.criado)
+
+    def contagem(self):
+        """Número de trabalhos por estado (executando, na fila, ...)."""
+        with self._lock:
+            estados = [t.estado for t in self._trabalhos.values()]
+        return {estado: estados.count(estado) for estado in (EXECUTANDO, NA_FILA) + ENCERRADOS if estado in estados}
+
+    def limpar(self):
+        """Descarta os trabalhos encerrados há mais de `retencao_segundos` (sessões que não voltaram)."""
+        limite = time.time() - self.retencao_segundos
+        with self._lock:
+            for trabalho_id in [i for i, t in self._trabalhos.items() if t.encerrado and t.fim < limite]:
+                del self._trabalhos[trabalho_id]
+
+    def encerrar(self, esperar=True):
+        """Cancela todos os trabalhos e desliga a pool (fim do servidor ou dos testes)."""
+        with self._lock:
+            trabalhos = list(self._trabalhos.values())
+        for trabalho in trabalhos:
+            trabalho.cancelar()
+        self._pool.shutdown(wait=esperar)